@@ -0,0 +1,390 @@
+"""
+Compare the throughput of the read endpoints under WSGI and ASGI.
+
+Seeds a throwaway database, then serves the same read traffic (catalog,
+book detail, borrowings list and detail, profile) from many concurrent
+connections, once per server model, each in its own process:
+
+* wsgi: the sync views behind a pool of --threads worker threads, like
+  gunicorn's gthread worker;
+* asgi: the async views (ASYNC_VIEWS on) on a single event loop.
+
+Every response then takes --client-latency-ms to reach its client. A
+WSGI worker is held for that time, an ASGI connection only waits for
+it, which is where the two models part ways. Django's handlers are
+called in process, so only the network itself is left out:
+
+    python -m benchmarks.asgi_vs_wsgi --connections 64 --threads 8
+    python -m benchmarks.asgi_vs_wsgi --client-latency-ms 0
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.harness import (
+    BASE_DIR,
+    boot,
+    load_results,
+    save_results,
+    summarize
+)
+
+SERVERS = ("wsgi", "asgi")
+
+# Endpoint name and its relative weight in the traffic mix.
+WORKLOAD = (
+    ("books-list", 30),
+    ("books-detail", 30),
+    ("borrowings-list", 15),
+    ("borrowings-detail", 10),
+    ("users-me", 15),
+)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--borrowings", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=8,
+        help="Worker threads of the WSGI server."
+    )
+    parser.add_argument(
+        "--client-latency-ms",
+        type=float,
+        default=100.0,
+        help="Time every response takes to reach its client."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare", help="Print the changes against a saved result file."
+    )
+    # Internal: run a single server against a seeded database.
+    parser.add_argument("--serve", choices=SERVERS, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    parser.add_argument("--plan", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def build_plan(options: argparse.Namespace) -> list[dict]:
+    """Seed the database and draw the requests every server replays."""
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from benchmarks.loadtest import seed
+    from borrowings.models import Borrowing
+
+    users, _, book_ids = seed(options)
+    tokens = {
+        user.id: f"Bearer {RefreshToken.for_user(user).access_token}"
+        for user in users
+    }
+    borrowings = list(Borrowing.objects.values_list("id", "user_id"))
+
+    rng = random.Random(options.seed)
+    names = [name for name, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    plan = []
+    for name in rng.choices(names, weights, k=options.requests):
+        user_id = rng.choice(users).id
+        query = ""
+        if name == "books-list":
+            path, user_id = "/api/v1/books/", None
+        elif name == "books-detail":
+            path = f"/api/v1/books/{rng.choice(book_ids)}/"
+            user_id = None
+        elif name == "borrowings-list":
+            path, query = "/api/v1/borrowings/", "page_size=20"
+        elif name == "borrowings-detail":
+            borrowing_id, user_id = rng.choice(borrowings)
+            path = f"/api/v1/borrowings/{borrowing_id}/"
+        else:
+            path = "/api/v1/users/me/"
+
+        plan.append(
+            {
+                "name": name,
+                "path": path,
+                "query": query,
+                "token": tokens[user_id] if user_id else None,
+            }
+        )
+    return plan
+
+
+def wsgi_environ(request: dict) -> dict:
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": request["path"],
+        "QUERY_STRING": request["query"],
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": "127.0.0.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if request["token"]:
+        environ["HTTP_AUTHORIZE"] = request["token"]
+    return environ
+
+
+def asgi_scope(request: dict) -> dict:
+    headers = [(b"host", b"testserver")]
+    if request["token"]:
+        headers.append((b"authorize", request["token"].encode()))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": request["path"],
+        "raw_path": request["path"].encode(),
+        "query_string": request["query"].encode(),
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+
+
+def serve_wsgi(
+    connections: list[list[dict]], options: argparse.Namespace
+) -> list[tuple[str, float, int]]:
+    from django.core.handlers.wsgi import WSGIHandler
+
+    application = WSGIHandler()
+    latency = options.client_latency_ms / 1000
+
+    def handle(request: dict) -> int:
+        status = []
+        response = application(
+            wsgi_environ(request),
+            lambda code, headers: status.append(int(code.split()[0]))
+        )
+        try:
+            b"".join(response)
+        finally:
+            response.close()
+        # Writing to the client holds the worker.
+        time.sleep(latency)
+        return status[0]
+
+    results = []
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(options.threads) as workers:
+        def connect(requests: list[dict]) -> None:
+            for request in requests:
+                started = time.perf_counter()
+                status = workers.submit(handle, request).result()
+                with lock:
+                    results.append((
+                        request["name"],
+                        time.perf_counter() - started,
+                        status
+                    ))
+
+        clients = [
+            threading.Thread(target=connect, args=(requests,))
+            for requests in connections
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+    return results
+
+
+def serve_asgi(
+    connections: list[list[dict]], options: argparse.Namespace
+) -> list[tuple[str, float, int]]:
+    from django.core.handlers.asgi import ASGIHandler
+
+    application = ASGIHandler()
+    latency = options.client_latency_ms / 1000
+    results = []
+
+    async def handle(request: dict) -> int:
+        status = []
+        messages = [{"type": "http.request", "body": b""}]
+
+        async def receive() -> dict:
+            if messages:
+                return messages.pop()
+            # The client stays connected until the response is sent.
+            return await asyncio.Future()
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            elif not message.get("more_body"):
+                # Writing to the client only suspends the connection.
+                await asyncio.sleep(latency)
+
+        await application(asgi_scope(request), receive, send)
+        return status[0]
+
+    async def connect(requests: list[dict]) -> None:
+        for request in requests:
+            started = time.perf_counter()
+            status = await handle(request)
+            results.append(
+                (request["name"], time.perf_counter() - started, status)
+            )
+
+    async def main() -> None:
+        await asyncio.gather(*(connect(requests) for requests in connections))
+
+    asyncio.run(main())
+    return results
+
+
+def serve(options: argparse.Namespace) -> None:
+    """Run one server over the plan and print its results as JSON."""
+    boot(options.database, ASYNC_VIEWS=options.serve == "asgi")
+    plan = json.loads(Path(options.plan).read_text())
+    connections = [
+        plan[index::options.connections]
+        for index in range(options.connections)
+    ]
+
+    server = serve_asgi if options.serve == "asgi" else serve_wsgi
+    started = time.perf_counter()
+    results = server(connections, options)
+    elapsed = time.perf_counter() - started
+
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    for name, latency, status in results:
+        latencies[name].append(latency)
+        failures[name] += status >= 400
+
+    report = {"elapsed_s": round(elapsed, 3), "endpoints": {}}
+    for name, _ in WORKLOAD:
+        report["endpoints"][name] = {
+            **summarize(latencies[name], elapsed),
+            "failures": failures[name],
+        }
+    report["total"] = {
+        **summarize([latency for _, latency, _ in results], elapsed),
+        "failures": sum(failures.values()),
+    }
+    print(json.dumps(report))
+
+
+def run(options: argparse.Namespace, database: Path) -> dict:
+    from django.db import connection
+
+    plan = build_plan(options)
+    connection.close()
+
+    with tempfile.NamedTemporaryFile(
+        "w", prefix="benchmark-plan-", suffix=".json"
+    ) as plan_file:
+        json.dump(plan, plan_file)
+        plan_file.flush()
+
+        results = {}
+        for server in SERVERS:
+            completed = subprocess.run(
+                (
+                    sys.executable, "-m", "benchmarks.asgi_vs_wsgi",
+                    "--serve", server,
+                    "--database", str(database),
+                    "--plan", plan_file.name,
+                    "--connections", str(options.connections),
+                    "--threads", str(options.threads),
+                    "--client-latency-ms", str(options.client_latency_ms),
+                ),
+                cwd=BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            results[server] = json.loads(completed.stdout.splitlines()[-1])
+    return results
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    header = (
+        f"{'server':<8}{'endpoint':<20}{'reqs':>7}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fail':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    for server, report in results.items():
+        rows = [*report["endpoints"].items(), ("total", report["total"])]
+        for name, row in rows:
+            print(
+                f"{server:<8}{name:<20}{row['requests']:>7}"
+                f"{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.2f}"
+                f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+                f"{row['failures']:>6}"
+            )
+        if baseline and server in baseline["results"]:
+            before = baseline["results"][server]["total"]["throughput_rps"]
+            after = report["total"]["throughput_rps"]
+            print(
+                f"{'':<8}{'vs ' + str(baseline['revision']):<20}{'':>7}"
+                f"{(after - before) / before if before else 0:>+10.1%}"
+            )
+
+    wsgi, asgi = (results[server]["total"] for server in SERVERS)
+    if wsgi["throughput_rps"]:
+        print(
+            f"\nASGI throughput is "
+            f"{asgi['throughput_rps'] / wsgi['throughput_rps']:.2f}x WSGI"
+        )
+
+
+def main(argv: list[str]) -> None:
+    options = parse_args(argv)
+    if options.serve:
+        serve(options)
+        return
+
+    database = boot()
+    print(f"Database: {database}")
+
+    try:
+        results = run(options, database)
+    finally:
+        database.unlink(missing_ok=True)
+    baseline = load_results(options.compare) if options.compare else None
+    print_results(results, baseline)
+
+    if options.output:
+        options_dict = {
+            key: value
+            for key, value in vars(options).items()
+            if key not in ("serve", "database", "plan")
+        }
+        save_results(options.output, "asgi_vs_wsgi", options_dict, results)
+        print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
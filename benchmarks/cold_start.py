@@ -0,0 +1,288 @@
+"""
+Measure the cold start of the WSGI and ASGI applications and of
+management commands, and check it against the cold-start budget.
+
+Every run spawns a fresh interpreter. For wsgi and asgi it imports the
+application module (settings, app loading, middleware) and serves one
+request (URL configuration, views, first query), reporting the time of
+each phase and the total from spawn to the first response. Management
+commands are timed from spawn to exit. Each target runs --runs times
+and the median is kept:
+
+    python -m benchmarks.cold_start --runs 10
+    python -m benchmarks.cold_start --check
+
+With --check the exit status is 1 when a median total is over its
+budget in BUDGETS_MS. The test suite runs it that way (ColdStartTests)
+when COLD_START_CHECK is set, it is left out of the default run as it
+depends on the speed of the machine.
+"""
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APPLICATIONS = ("wsgi", "asgi")
+COMMANDS = ("check", "migrate --check")
+
+# Median milliseconds from spawn to the first response (or the exit of
+# the command), with the API docs enabled: about a third above what a
+# single CPU development machine measures.
+BUDGETS_MS = {
+    "wsgi": 900,
+    "asgi": 900,
+    "manage.py check": 1_200,
+    "manage.py migrate --check": 1_200,
+}
+
+FIRST_REQUEST = "/api/v1/books/"
+
+# benchmarks.harness isn't imported here, it would add to the startup
+# of the spawned applications.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with status 1 when a target is over its budget."
+    )
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare", help="Print the changes against a saved result file."
+    )
+    # Internal: start one application and serve its first request.
+    parser.add_argument(
+        "--serve", choices=APPLICATIONS, help=argparse.SUPPRESS
+    )
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def serve_wsgi() -> tuple[float, int]:
+    import io
+
+    from library_service_api.wsgi import application
+
+    imported = time.time()
+    status = []
+    response = application(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": FIRST_REQUEST,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "127.0.0.1",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        },
+        lambda code, headers: status.append(int(code.split()[0]))
+    )
+    try:
+        b"".join(response)
+    finally:
+        response.close()
+    return imported, status[0]
+
+
+def serve_asgi() -> tuple[float, int]:
+    import asyncio
+
+    from library_service_api.asgi import application
+
+    imported = time.time()
+    status = []
+    messages = [{"type": "http.request", "body": b""}]
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop()
+        # The client stays connected until the response is sent.
+        return await asyncio.Future()
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    asyncio.run(
+        application(
+            {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": FIRST_REQUEST,
+                "raw_path": FIRST_REQUEST.encode(),
+                "query_string": b"",
+                "root_path": "",
+                "headers": [(b"host", b"127.0.0.1")],
+                "client": ("127.0.0.1", 0),
+                "server": ("127.0.0.1", 80),
+            },
+            receive,
+            send
+        )
+    )
+    return imported, status[0]
+
+
+def serve(options: argparse.Namespace) -> None:
+    """Start the application, serve one request and print the timings."""
+    started = time.time()
+    server = serve_asgi if options.serve == "asgi" else serve_wsgi
+    imported, status = server()
+    responded = time.time()
+    print(json.dumps({
+        "interpreter_ms": (started - options.spawned_at) * 1000,
+        "import_ms": (imported - started) * 1000,
+        "first_request_ms": (responded - imported) * 1000,
+        "total_ms": (responded - options.spawned_at) * 1000,
+        "status": status,
+    }))
+
+
+def spawn_application(name: str) -> dict:
+    spawned_at = time.time()
+    completed = subprocess.run(
+        (
+            sys.executable, "-m", "benchmarks.cold_start",
+            "--serve", name,
+            "--spawned-at", repr(spawned_at),
+        ),
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def spawn_command(command: str) -> dict:
+    spawned_at = time.time()
+    subprocess.run(
+        (sys.executable, "manage.py", *shlex.split(command)),
+        cwd=BASE_DIR,
+        capture_output=True,
+        check=True
+    )
+    return {"total_ms": (time.time() - spawned_at) * 1000}
+
+
+def measure(runs: int) -> dict:
+    targets = {
+        **{name: (spawn_application, name) for name in APPLICATIONS},
+        **{
+            f"manage.py {command}": (spawn_command, command)
+            for command in COMMANDS
+        },
+    }
+    # Round robin, so that a slower stretch of the machine doesn't land
+    # on a single target.
+    runs_by_target = {target: [] for target in targets}
+    for _ in range(runs):
+        for target, (spawn, argument) in targets.items():
+            runs_by_target[target].append(spawn(argument))
+
+    results = {}
+    for target, samples in runs_by_target.items():
+        results[target] = {
+            phase: round(
+                statistics.median(sample[phase] for sample in samples), 1
+            )
+            for phase in samples[0]
+            if phase != "status"
+        }
+        results[target]["max_total_ms"] = round(
+            max(sample["total_ms"] for sample in samples), 1
+        )
+        if "status" in samples[0]:
+            results[target]["status"] = samples[0]["status"]
+    return results
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    header = (
+        f"{'target':<28}{'python':>9}{'import':>9}{'request':>9}"
+        f"{'total':>9}{'max':>9}{'budget':>9}"
+    )
+    print(f"{header}\n{'(median ms)':<28}")
+    print("-" * len(header))
+    for target, row in results.items():
+        phases = "".join(
+            f"{row[phase]:>9.1f}" if phase in row else f"{'':>9}"
+            for phase in ("interpreter_ms", "import_ms", "first_request_ms")
+        )
+        print(
+            f"{target:<28}{phases}{row['total_ms']:>9.1f}"
+            f"{row['max_total_ms']:>9.1f}{BUDGETS_MS[target]:>9}"
+        )
+        if baseline and target in baseline["results"]:
+            before = baseline["results"][target]["total_ms"]
+            print(
+                f"{'  vs ' + str(baseline['revision']):<55}"
+                f"{(row['total_ms'] - before) / before:>+9.1%}"
+            )
+
+
+def over_budget(results: dict) -> list[str]:
+    return [
+        f"{target}: {row['total_ms']:.0f} ms > {BUDGETS_MS[target]} ms"
+        for target, row in results.items()
+        if row["total_ms"] > BUDGETS_MS[target]
+    ]
+
+
+def main(argv: list[str]) -> None:
+    options = parse_args(argv)
+    if options.serve:
+        serve(options)
+        return
+
+    from benchmarks.harness import boot, load_results, save_results
+
+    # The applications connect to a migrated throwaway database.
+    database = boot()
+    os.environ["DATABASE_PATH"] = str(database)
+    print(f"Database: {database}")
+
+    try:
+        results = measure(options.runs)
+    finally:
+        database.unlink(missing_ok=True)
+    baseline = load_results(options.compare) if options.compare else None
+    print_results(results, baseline)
+
+    if options.output:
+        options_dict = {
+            key: value
+            for key, value in vars(options).items()
+            if key not in ("serve", "spawned_at")
+        }
+        save_results(options.output, "cold_start", options_dict, results)
+        print(f"Results written to {options.output}")
+
+    if options.check:
+        failures = over_budget(results)
+        if failures:
+            sys.exit("Over the cold-start budget:\n" + "\n".join(failures))
+        print("Within the cold-start budget")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+"""
+Shared plumbing of the benchmark scripts.
+
+The scripts run outside of ``manage.py``: ``boot`` points the project at
+a throwaway database (a fresh SQLite file unless one is given) before
+Django is set up, so benchmarking never touches the development data.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def boot(database: str | None = None, **overrides: Any) -> Path:
+    """
+    Configure settings for a benchmark run, set Django up and migrate.
+
+    ``overrides`` replace settings values before the apps are loaded.
+    Returns the path of the database file.
+    """
+    sys.path.insert(0, str(BASE_DIR))
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "library_service_api.settings"
+    )
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DJANGO_DEBUG", "false")
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    path = Path(
+        database or tempfile.mkstemp(prefix="benchmark-", suffix=".sqlite3")[1]
+    )
+    settings.DATABASES["default"]["NAME"] = path
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    return path
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (
+        ordered[upper] - ordered[lower]
+    ) * (position - lower)
+
+
+def summarize(latencies: Iterable[float], elapsed: float) -> dict:
+    """Throughput and latency percentiles (in milliseconds) of a run."""
+    ordered = sorted(latencies)
+    count = len(ordered)
+    return {
+        "requests": count,
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path: str, name: str, options: dict, results: dict) -> None:
+    """Write results as JSON, with enough context to compare commits."""
+    import django
+
+    document = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "options": options,
+        "results": results,
+    }
+    Path(path).write_text(json.dumps(document, indent=2, default=str))
+
+
+def load_results(path: str) -> dict:
+    return json.loads(Path(path).read_text())
@@ -0,0 +1,167 @@
+"""
+Compare the serializer and the values() fast path of the list endpoints.
+
+Seeds a throwaway database, then builds the full book list and a large
+borrowing list both ways, stage by stage: fetching the rows (model
+instances or the ``.values()`` projection the views read), turning them
+into response data (serializer or ``RowMapper``) and rendering the JSON
+(``JSONRenderer`` or ``FastJSONRenderer``). Both paths are checked to
+render the same bytes:
+
+    python -m benchmarks.list_serialization --borrowings 100000
+"""
+import argparse
+import sys
+import time
+
+from benchmarks.harness import boot, load_results, save_results
+
+STAGES = ("fetch", "serialize", "render")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=5_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--borrowings", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare", help="Print the changes against a saved result file."
+    )
+    return parser.parse_args(argv)
+
+
+def timed(function, repeat: int) -> tuple[float, object]:
+    """Best time of ``repeat`` calls, and the result of the last one."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def measure(queryset, serializer_class, version_fields, repeat: int) -> dict:
+    from rest_framework.renderers import JSONRenderer
+
+    from library_service_api.fastpath import RowMapper
+    from library_service_api.renderers import FastJSONRenderer
+
+    mapper = RowMapper.of(serializer_class)
+    projection = queryset.values(
+        *dict.fromkeys((*mapper.lookups, *version_fields))
+    )
+
+    paths = {
+        "serializer": (
+            lambda: list(queryset.all()),
+            lambda rows: serializer_class(rows, many=True).data,
+            JSONRenderer().render,
+        ),
+        "fast path": (
+            lambda: list(projection.all()),
+            mapper,
+            FastJSONRenderer().render,
+        ),
+    }
+
+    results = {}
+    rendered = {}
+    for name, (fetch, serialize, render) in paths.items():
+        fetch_s, rows = timed(fetch, repeat)
+        serialize_s, data = timed(lambda: serialize(rows), repeat)
+        render_s, rendered[name] = timed(lambda: render(data), repeat)
+        total = fetch_s + serialize_s + render_s
+        results[name] = {
+            "rows": len(rows),
+            "fetch_ms": round(fetch_s * 1000, 2),
+            "serialize_ms": round(serialize_s * 1000, 2),
+            "render_ms": round(render_s * 1000, 2),
+            "rows_per_s": round(len(rows) / total),
+        }
+
+    if rendered["serializer"] != rendered["fast path"]:
+        raise AssertionError("The fast path renders different bytes.")
+    return results
+
+
+def run(options: argparse.Namespace) -> dict:
+    from benchmarks.loadtest import seed
+    from books.models import Book
+    from books.serializers import BookSerializer
+    from borrowings.models import Borrowing
+    from borrowings.serializers import BorrowingListSerializer
+    from borrowings.views import BorrowingQuerysetMixin
+    from library_service_api.conditional import ConditionalGetMixin
+
+    seed(options)
+    return {
+        "books-list": measure(
+            Book.objects.all(),
+            BookSerializer,
+            ConditionalGetMixin.version_fields,
+            options.repeat
+        ),
+        "borrowings-list": measure(
+            Borrowing.objects.select_related("book", "user").order_by("-id"),
+            BorrowingListSerializer,
+            BorrowingQuerysetMixin.version_fields,
+            options.repeat
+        ),
+    }
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    header = (
+        f"{'list':<18}{'path':<12}{'rows':>8}{'fetch ms':>10}"
+        f"{'ser. ms':>10}{'render ms':>11}{'rows/s':>11}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, paths in results.items():
+        for path, row in paths.items():
+            print(
+                f"{name:<18}{path:<12}{row['rows']:>8}{row['fetch_ms']:>10}"
+                f"{row['serialize_ms']:>10}{row['render_ms']:>11}"
+                f"{row['rows_per_s']:>11,}"
+            )
+            before = (
+                baseline["results"].get(name, {}).get(path)
+                if baseline else None
+            )
+            if before and before["rows_per_s"]:
+                change = row["rows_per_s"] / before["rows_per_s"] - 1
+                print(
+                    f"{'  vs ' + str(baseline['revision']):<38}"
+                    f"{change:>+43.1%}"
+                )
+        speedup = paths["fast path"]["rows_per_s"] / max(
+            paths["serializer"]["rows_per_s"], 1
+        )
+        print(f"{name:<18}{'speedup':<12}{speedup:>61.2f}x")
+
+
+def main(argv: list[str]) -> None:
+    options = parse_args(argv)
+    database = boot()
+    print(f"Database: {database}")
+
+    try:
+        results = run(options)
+    finally:
+        database.unlink(missing_ok=True)
+    baseline = load_results(options.compare) if options.compare else None
+    print_results(results, baseline)
+
+    if options.output:
+        save_results(
+            options.output, "list_serialization", vars(options), results
+        )
+        print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
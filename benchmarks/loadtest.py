@@ -0,0 +1,364 @@
+"""
+Replay a mixed library workload through the real URL conf.
+
+Seeds a throwaway database, then every worker thread drives its share
+of the virtual readers through catalog browsing, searches, token
+fetches, borrowing and returning books, while a librarian lists all
+borrowings. Requests go through the full middleware, authentication and
+serialization stack via Django's test client, so only the network is
+left out. Throughput and p50/p95/p99 latency are reported per endpoint
+and can be saved as JSON to compare runs between commits:
+
+    python -m benchmarks.loadtest --requests 5000 --output before.json
+    python -m benchmarks.loadtest --requests 5000 --compare before.json
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from benchmarks.harness import boot, load_results, save_results, summarize
+
+PASSWORD = "benchmark-password"
+
+# Share of the seeded borrowings still out, and of those the share past
+# their expected return date.
+ACTIVE_RATIO = 0.25
+OVERDUE_RATIO = 0.5
+
+# Endpoint name and its relative weight in the traffic mix.
+WORKLOAD = (
+    ("books-list", 30),
+    ("books-detail", 20),
+    ("books-search", 8),
+    ("token", 4),
+    ("borrow", 14),
+    ("return", 12),
+    ("borrowings-list", 6),
+    ("staff-borrowings-list", 6),
+)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=500)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument(
+        "--borrowings",
+        type=int,
+        default=2_000,
+        help=(
+            "Borrowings seeded before the run, a quarter of them still "
+            "out (half of those overdue)."
+        )
+    )
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database",
+        help="SQLite file to run against (default: a new temporary file)."
+    )
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare", help="Print the changes against a saved result file."
+    )
+    return parser.parse_args(argv)
+
+
+def seed(options: argparse.Namespace) -> tuple[list, object, list[int]]:
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+
+    from books.models import Book
+    from borrowings.models import Borrowing
+
+    rng = random.Random(options.seed)
+    password = make_password(PASSWORD)
+    user_model = get_user_model()
+
+    books = Book.objects.bulk_create(
+        Book(
+            title=f"Load test book {index}",
+            author=f"Author {index % 97}",
+            cover=rng.choice(("HARD", "SOFT")),
+            inventory=rng.randint(1, 10),
+            daily_fee=rng.randint(50, 500) / 100
+        )
+        for index in range(options.books)
+    )
+    users = user_model.objects.bulk_create(
+        user_model(email=f"reader{index}@example.com", password=password)
+        for index in range(options.users)
+    )
+    staff = user_model.objects.create_user(
+        email="librarian@example.com", password=PASSWORD, is_staff=True
+    )
+
+    # borrow_date is auto_now_add, so the drawn dates are applied with a
+    # bulk_update once the rows exist.
+    today = timezone.now().date()
+    borrowings, borrow_dates = [], []
+    for _ in range(options.borrowings):
+        book = rng.choice(books)
+        if rng.random() < ACTIVE_RATIO and book.inventory:
+            book.inventory -= 1
+            if rng.random() < OVERDUE_RATIO:
+                borrowed = today - timedelta(days=rng.randint(31, 90))
+            else:
+                borrowed = today - timedelta(days=rng.randint(0, 13))
+            returned = None
+        else:
+            borrowed = today - timedelta(days=rng.randint(1, 60))
+            returned = borrowed + timedelta(
+                days=rng.randint(0, (today - borrowed).days)
+            )
+        borrow_dates.append(borrowed)
+        borrowings.append(
+            Borrowing(
+                book=book,
+                user=rng.choice(users),
+                expected_return_date=(
+                    borrowed + timedelta(days=rng.randint(14, 30))
+                ),
+                actual_return_date=returned
+            )
+        )
+
+    borrowings = Borrowing.objects.bulk_create(borrowings, batch_size=1_000)
+    for borrowing, borrowed in zip(borrowings, borrow_dates):
+        borrowing.borrow_date = borrowed
+    Borrowing.objects.bulk_update(
+        borrowings, ["borrow_date"], batch_size=1_000
+    )
+    # Book.inventory is the number of copies left on the shelf.
+    Book.objects.bulk_update(books, ["inventory"], batch_size=1_000)
+    return users, staff, [book.id for book in books]
+
+
+class Reader:
+    """A virtual user with its own client, token and open borrowings."""
+
+    def __init__(self, user) -> None:
+        from django.test import Client
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.email = user.email
+        self.client = Client(
+            HTTP_AUTHORIZE=f"Bearer {RefreshToken.for_user(user).access_token}"
+        )
+        self.anonymous = Client()
+        self.borrowing_ids: list[int] = []
+
+
+class Worker(threading.Thread):
+    def __init__(
+        self,
+        readers: list[Reader],
+        librarian: Reader,
+        book_ids: list[int],
+        requests: int,
+        warmup: int,
+        seed: int
+    ) -> None:
+        super().__init__()
+        self.readers = readers
+        self.librarian = librarian
+        self.book_ids = book_ids
+        self.requests = requests
+        self.warmup = warmup
+        self.rng = random.Random(seed)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.failures: dict[str, int] = defaultdict(int)
+        self.error: BaseException | None = None
+
+    def run(self) -> None:
+        from django.db import connection
+
+        names = [name for name, _ in WORKLOAD]
+        weights = [weight for _, weight in WORKLOAD]
+        try:
+            for index in range(self.warmup + self.requests):
+                name = self.rng.choices(names, weights)[0]
+                reader = self.rng.choice(self.readers)
+                if name == "return" and not reader.borrowing_ids:
+                    name = "borrow"
+
+                start = time.perf_counter()
+                response = self.send(name, reader)
+                latency = time.perf_counter() - start
+
+                if index < self.warmup:
+                    continue
+                self.latencies[name].append(latency)
+                if response.status_code >= 400:
+                    self.failures[name] += 1
+        except BaseException as error:
+            self.error = error
+        finally:
+            connection.close()
+
+    def send(self, name: str, reader: Reader):
+        from django.utils import timezone
+
+        if name == "books-list":
+            return reader.anonymous.get("/api/v1/books/")
+        if name == "books-detail":
+            book_id = self.rng.choice(self.book_ids)
+            return reader.anonymous.get(f"/api/v1/books/{book_id}/")
+        if name == "books-search":
+            return reader.anonymous.get(
+                "/api/v1/books/",
+                {"search": f"author {self.rng.randint(0, 96)}"}
+            )
+        if name == "token":
+            return reader.anonymous.post(
+                "/api/v1/users/token/",
+                {"email": reader.email, "password": PASSWORD},
+                content_type="application/json"
+            )
+        if name == "borrow":
+            response = reader.client.post(
+                "/api/v1/borrowings/",
+                {
+                    "book": self.rng.choice(self.book_ids),
+                    "expected_return_date": str(
+                        timezone.now().date() + timedelta(days=14)
+                    ),
+                },
+                content_type="application/json"
+            )
+            if response.status_code == 201:
+                reader.borrowing_ids.append(response.json()["id"])
+            return response
+        if name == "return":
+            borrowing_id = reader.borrowing_ids.pop(
+                self.rng.randrange(len(reader.borrowing_ids))
+            )
+            return reader.client.post(
+                f"/api/v1/borrowings/{borrowing_id}/return/",
+                content_type="application/json"
+            )
+        if name == "borrowings-list":
+            return reader.client.get(
+                "/api/v1/borrowings/", {"is_active": "true"}
+            )
+        if name == "staff-borrowings-list":
+            return self.librarian.client.get("/api/v1/borrowings/")
+        raise ValueError(f"Unknown endpoint {name!r}")
+
+
+def run(options: argparse.Namespace) -> dict:
+    from borrowings.models import Borrowing
+
+    users, staff, book_ids = seed(options)
+    readers = [Reader(user) for user in users]
+    librarian = Reader(staff)
+
+    # Returns start with the seeded loans, overdue ones included.
+    by_user = {user.id: reader for user, reader in zip(users, readers)}
+    for borrowing_id, user_id in Borrowing.objects.filter(
+        actual_return_date__isnull=True
+    ).values_list("id", "user_id"):
+        by_user[user_id].borrowing_ids.append(borrowing_id)
+
+    workers = [
+        Worker(
+            readers[index::options.concurrency],
+            librarian,
+            book_ids,
+            options.requests // options.concurrency,
+            options.warmup // options.concurrency,
+            options.seed + index
+        )
+        for index in range(options.concurrency)
+    ]
+
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    for worker in workers:
+        if worker.error is not None:
+            raise worker.error
+
+    results = {"elapsed_s": round(elapsed, 3), "endpoints": {}}
+    everything = []
+    for name, _ in WORKLOAD:
+        latencies = [
+            latency
+            for worker in workers
+            for latency in worker.latencies[name]
+        ]
+        everything.extend(latencies)
+        results["endpoints"][name] = {
+            **summarize(latencies, elapsed),
+            "failures": sum(worker.failures[name] for worker in workers),
+        }
+    results["total"] = summarize(everything, elapsed)
+    return results
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    header = (
+        f"{'endpoint':<24}{'reqs':>7}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fail':>6}"
+    )
+    print(header)
+    print("-" * len(header))
+    rows = [*results["endpoints"].items(), ("total", results["total"])]
+    for name, row in rows:
+        print(
+            f"{name:<24}{row['requests']:>7}{row['throughput_rps']:>10.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row.get('failures', ''):>6}"
+        )
+        if baseline is None:
+            continue
+        before = baseline["results"]["endpoints"].get(
+            name, baseline["results"]["total"] if name == "total" else None
+        )
+        if before:
+            print(
+                f"{'  vs ' + str(baseline['revision']):<24}{'':>7}"
+                + "".join(
+                    f"{_change(before[key], row[key]):>10}"
+                    for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+                )
+            )
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before:+.1%}"
+
+
+def main(argv: list[str]) -> None:
+    options = parse_args(argv)
+    database = boot(options.database)
+    print(f"Database: {database}")
+
+    try:
+        results = run(options)
+    finally:
+        if options.database is None:
+            database.unlink(missing_ok=True)
+    baseline = load_results(options.compare) if options.compare else None
+    print_results(results, baseline)
+
+    if options.output:
+        save_results(options.output, "loadtest", vars(options), results)
+        print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
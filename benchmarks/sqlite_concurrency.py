@@ -0,0 +1,312 @@
+"""
+Compare concurrent borrowing under the default and production SQLite
+profiles.
+
+Seeds a throwaway database, then runs the same traffic against a copy of
+it once per profile (SQLITE_PROFILE), each in its own process: --workers
+forked worker processes, like a pre-fork server, with --threads threads
+each. Every thread repeatedly borrows a book, lists its active
+borrowings and returns the book for --duration seconds. Failed requests
+(mostly "database is locked") are counted apart:
+
+    python -m benchmarks.sqlite_concurrency --workers 4 --threads 4
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from pathlib import Path
+
+from benchmarks.harness import (
+    BASE_DIR,
+    boot,
+    load_results,
+    save_results,
+    summarize
+)
+
+PROFILES = ("default", "production")
+OPERATIONS = ("borrow", "list", "return")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=200)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument(
+        "--borrowings",
+        type=int,
+        default=5_000,
+        help="Historical (returned) borrowings seeded before the run."
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this file.")
+    parser.add_argument(
+        "--compare", help="Print the changes against a saved result file."
+    )
+    # Internal: run a single profile against a seeded database.
+    parser.add_argument("--serve", choices=PROFILES, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    parser.add_argument("--plan", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def build_plan(options: argparse.Namespace) -> dict:
+    """Seed the database and issue a token to every reader."""
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from benchmarks.loadtest import seed
+    from books.models import Book
+
+    users, _, book_ids = seed(options)
+    # Borrows must only ever fail on locks, never on an empty shelf.
+    Book.objects.update(inventory=1_000_000)
+    return {
+        "tokens": [
+            f"Bearer {RefreshToken.for_user(user).access_token}"
+            for user in users
+        ],
+        "book_ids": book_ids,
+    }
+
+
+def borrow_cycles(
+    plan: dict, seed: int, deadline: float
+) -> list[tuple[str, float, int]]:
+    """Borrow, list and return books until ``deadline``."""
+    from django.db import connection
+    from django.test import Client
+    from django.utils import timezone
+
+    rng = random.Random(seed)
+    client = Client(
+        HTTP_AUTHORIZE=rng.choice(plan["tokens"]),
+        raise_request_exception=False
+    )
+    expected_return_date = str(timezone.now().date() + timedelta(days=14))
+    results = []
+
+    def send(name: str, method: str, path: str, data=None):
+        started = time.perf_counter()
+        if method == "post":
+            response = client.post(
+                path, data, content_type="application/json"
+            )
+        else:
+            response = client.get(path, data)
+        results.append(
+            (name, time.perf_counter() - started, response.status_code)
+        )
+        return response
+
+    try:
+        while time.perf_counter() < deadline:
+            response = send(
+                "borrow",
+                "post",
+                "/api/v1/borrowings/",
+                {
+                    "book": rng.choice(plan["book_ids"]),
+                    "expected_return_date": expected_return_date,
+                }
+            )
+            send("list", "get", "/api/v1/borrowings/", {"is_active": "true"})
+            if response.status_code == 201:
+                borrowing_id = response.json()["id"]
+                send(
+                    "return",
+                    "post",
+                    f"/api/v1/borrowings/{borrowing_id}/return/"
+                )
+    finally:
+        connection.close()
+    return results
+
+
+def work(plan: dict, options: argparse.Namespace, index: int, queue) -> None:
+    """One worker process: --threads threads of borrow cycles."""
+    deadline = time.perf_counter() + options.duration
+    results = []
+    lock = threading.Lock()
+
+    def run(seed: int) -> None:
+        cycles = borrow_cycles(plan, seed, deadline)
+        with lock:
+            results.extend(cycles)
+
+    threads = [
+        threading.Thread(
+            target=run, args=(options.seed + index * options.threads + n,)
+        )
+        for n in range(options.threads)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.put(results)
+
+
+def serve(options: argparse.Namespace) -> None:
+    """Run one profile over the plan and print its results as JSON."""
+    boot(options.database)
+    from django.db import connections
+
+    # Failures are counted, their tracebacks would only be noise.
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    plan = json.loads(Path(options.plan).read_text())
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=work, args=(plan, options, index, queue))
+        for index in range(options.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    results = [row for _ in processes for row in queue.get()]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    # Only successful requests count towards the throughput.
+    latencies = defaultdict(list)
+    failures = defaultdict(int)
+    for name, latency, status in results:
+        if status >= 400:
+            failures[name] += 1
+        else:
+            latencies[name].append(latency)
+
+    report = {"elapsed_s": round(elapsed, 3), "operations": {}}
+    for name in OPERATIONS:
+        report["operations"][name] = {
+            **summarize(latencies[name], elapsed),
+            "failures": failures[name],
+        }
+    report["total"] = {
+        **summarize(
+            [latency for name in OPERATIONS for latency in latencies[name]],
+            elapsed
+        ),
+        "failures": sum(failures.values()),
+    }
+    print(json.dumps(report))
+
+
+def run(options: argparse.Namespace, database: Path) -> dict:
+    from django.db import connection
+
+    plan = build_plan(options)
+    connection.close()
+
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as directory:
+        plan_path = Path(directory) / "plan.json"
+        plan_path.write_text(json.dumps(plan))
+
+        results = {}
+        for profile in PROFILES:
+            # Every profile starts from the same data.
+            copy = Path(directory) / f"{profile}.sqlite3"
+            shutil.copyfile(database, copy)
+            completed = subprocess.run(
+                (
+                    sys.executable, "-m", "benchmarks.sqlite_concurrency",
+                    "--serve", profile,
+                    "--database", str(copy),
+                    "--plan", str(plan_path),
+                    "--workers", str(options.workers),
+                    "--threads", str(options.threads),
+                    "--duration", str(options.duration),
+                    "--seed", str(options.seed),
+                ),
+                cwd=BASE_DIR,
+                env={**os.environ, "SQLITE_PROFILE": profile},
+                capture_output=True,
+                text=True,
+                check=True
+            )
+            results[profile] = json.loads(completed.stdout.splitlines()[-1])
+    return results
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    header = (
+        f"{'profile':<12}{'operation':<11}{'reqs':>9}{'rps':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fail':>7}"
+    )
+    print(header)
+    print("-" * len(header))
+    for profile, report in results.items():
+        rows = [*report["operations"].items(), ("total", report["total"])]
+        for name, row in rows:
+            print(
+                f"{profile:<12}{name:<11}{row['requests']:>9}"
+                f"{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.2f}"
+                f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+                f"{row['failures']:>7}"
+            )
+        if baseline and profile in baseline["results"]:
+            before = baseline["results"][profile]["total"]["throughput_rps"]
+            after = report["total"]["throughput_rps"]
+            print(
+                f"{'':<12}{'vs ' + str(baseline['revision']):<11}{'':>9}"
+                f"{(after - before) / before if before else 0:>+10.1%}"
+            )
+
+    default, production = (
+        results[profile]["total"] for profile in PROFILES
+    )
+    if default["throughput_rps"]:
+        print(
+            f"\nProduction profile: "
+            f"{production['throughput_rps'] / default['throughput_rps']:.2f}x "
+            f"the successful requests per second of the default one"
+        )
+
+
+def main(argv: list[str]) -> None:
+    options = parse_args(argv)
+    if options.serve:
+        serve(options)
+        return
+
+    database = boot()
+    print(f"Database: {database}")
+
+    try:
+        results = run(options, database)
+    finally:
+        database.unlink(missing_ok=True)
+    baseline = load_results(options.compare) if options.compare else None
+    print_results(results, baseline)
+
+    if options.output:
+        options_dict = {
+            key: value
+            for key, value in vars(options).items()
+            if key not in ("serve", "database", "plan")
+        }
+        save_results(
+            options.output, "sqlite_concurrency", options_dict, results
+        )
+        print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
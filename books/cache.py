@@ -0,0 +1,159 @@
+"""
+Read-through cache for the book list and detail responses.
+
+Entries are never deleted, they are made unreachable instead: every key
+embeds a version number and invalidating a book bumps the version of its
+detail entry and of the catalog list. A response computed from data read
+before a concurrent write is therefore stored under a version nobody
+asks for any more, so a stale copy can never outlive the invalidation.
+For the same reason entries are always computed from the primary
+database, never from a read replica that may lag behind the write.
+
+The versions are kept in the default cache, next to the entries. Only a
+cache shared by the workers (CACHE_BACKEND) carries an invalidation to
+all of them; with the per-process default the other workers keep their
+copy for up to BOOK_CACHE_TIMEOUT.
+"""
+import threading
+import time
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from library_service_api import replicas
+
+LIST_VERSION_KEY = "books:list:version"
+CATALOG_VERSION_KEY = "books:catalog:version"
+
+
+class CacheStats:
+    """Process-wide hit/miss counters of the book cache."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def _detail_version_key(book_id: int) -> str:
+    return f"books:detail:{book_id}:version"
+
+
+def _get_version(key: str) -> int:
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than from 1, so a version key that
+        # was evicted can't come back pointing at entries it already
+        # invalidated.
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key: str) -> int:
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def book_list_key() -> str:
+    return f"books:list:{_get_version(LIST_VERSION_KEY)}"
+
+
+def book_detail_key(book_id: int) -> str:
+    catalog_version = _get_version(CATALOG_VERSION_KEY)
+    version = _get_version(_detail_version_key(book_id))
+    return f"books:detail:{book_id}:{catalog_version}:{version}"
+
+
+async def abook_list_key() -> str:
+    return f"books:list:{await _aget_version(LIST_VERSION_KEY)}"
+
+
+async def abook_detail_key(book_id: int) -> str:
+    catalog_version = await _aget_version(CATALOG_VERSION_KEY)
+    version = await _aget_version(_detail_version_key(book_id))
+    return f"books:detail:{book_id}:{catalog_version}:{version}"
+
+
+def get_or_set(key: str, compute: Callable[[], Any]) -> Any:
+    data = cache.get(key)
+    stats.record(hit=data is not None)
+
+    if data is None:
+        with replicas.use_primary():
+            data = compute()
+        cache.set(key, data, settings.BOOK_CACHE_TIMEOUT)
+
+    return data
+
+
+async def aget_or_set(key: str, compute: Callable[[], Awaitable]) -> Any:
+    data = await cache.aget(key)
+    stats.record(hit=data is not None)
+
+    if data is None:
+        with replicas.use_primary():
+            data = await compute()
+        await cache.aset(key, data, settings.BOOK_CACHE_TIMEOUT)
+
+    return data
+
+
+def invalidate_book(book_id: int) -> None:
+    """
+    Drop the cached detail of a book and the cached catalog list.
+
+    The versions are bumped right away, so reads later in the same
+    transaction see the change, and once more after commit, so nothing
+    cached by concurrent readers in between survives.
+    """
+    _bump_version(LIST_VERSION_KEY)
+    _bump_version(_detail_version_key(book_id))
+    transaction.on_commit(partial(_bump_version, LIST_VERSION_KEY))
+    transaction.on_commit(
+        partial(_bump_version, _detail_version_key(book_id))
+    )
+
+
+def invalidate_catalog() -> None:
+    """
+    Drop every cached book response at once, for bulk writes that don't
+    go through Book.save().
+    """
+    _bump_version(LIST_VERSION_KEY)
+    _bump_version(CATALOG_VERSION_KEY)
+    transaction.on_commit(partial(_bump_version, LIST_VERSION_KEY))
+    transaction.on_commit(partial(_bump_version, CATALOG_VERSION_KEY))
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import READERS, import_books
+
+
+class Command(BaseCommand):
+    help = (
+        "Import or refresh the book catalog from a CSV or JSON lines file "
+        "with title, author, cover, inventory and daily_fee columns. "
+        "Existing books (same title and author) are updated; inventory is "
+        "the number of copies available to borrow, without those on loan."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "path",
+            help="File to import, or - to read from standard input."
+        )
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=tuple(READERS),
+            help="Input format, guessed from the file extension by default."
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options) -> None:
+        path = options["path"]
+        file_format = options["file_format"] or Path(path).suffix[1:]
+        if file_format not in READERS:
+            raise CommandError(
+                "Can't guess the input format, use --format "
+                f"({' or '.join(READERS)})."
+            )
+
+        if path == "-":
+            report = import_books(
+                sys.stdin, file_format, options["batch_size"]
+            )
+        else:
+            with open(path, encoding="utf-8-sig", newline="") as stream:
+                report = import_books(
+                    stream, file_format, options["batch_size"]
+                )
+
+        for row in report.rejected_rows:
+            self.stderr.write(f"Line {row['line']}: {row['errors']}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {report.processed} rows in "
+                f"{report.elapsed:.1f}s ({report.rows_per_second:.0f} "
+                f"rows/s): {report.upserted} books upserted, "
+                f"{report.rejected} rows rejected."
+            )
+        )
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# The SQL is frozen here rather than imported from books.search, so later
+# changes to that module can't change what this migration does.
+INSTALL_SQL = {
+    "sqlite": (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS books_book_fts USING fts5("
+        "title, author, content='books_book', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS books_book_fts_ai "
+        "AFTER INSERT ON books_book BEGIN "
+        "INSERT INTO books_book_fts(rowid, title, author) "
+        "VALUES (new.id, new.title, new.author); END",
+        "CREATE TRIGGER IF NOT EXISTS books_book_fts_ad "
+        "AFTER DELETE ON books_book BEGIN "
+        "INSERT INTO books_book_fts(books_book_fts, rowid, title, author) "
+        "VALUES ('delete', old.id, old.title, old.author); END",
+        "CREATE TRIGGER IF NOT EXISTS books_book_fts_au "
+        "AFTER UPDATE OF title, author ON books_book BEGIN "
+        "INSERT INTO books_book_fts(books_book_fts, rowid, title, author) "
+        "VALUES ('delete', old.id, old.title, old.author); "
+        "INSERT INTO books_book_fts(rowid, title, author) "
+        "VALUES (new.id, new.title, new.author); END",
+        "INSERT INTO books_book_fts(books_book_fts) VALUES ('rebuild')",
+    ),
+    "postgresql": (
+        "CREATE INDEX IF NOT EXISTS books_book_search_idx ON books_book "
+        "USING GIN ((to_tsvector('simple', title || ' ' || author)))",
+    ),
+    "mysql": (
+        "CREATE FULLTEXT INDEX books_book_search_idx "
+        "ON books_book (title, author)",
+    ),
+}
+
+REMOVE_SQL = {
+    "sqlite": (
+        "DROP TRIGGER IF EXISTS books_book_fts_ai",
+        "DROP TRIGGER IF EXISTS books_book_fts_ad",
+        "DROP TRIGGER IF EXISTS books_book_fts_au",
+        "DROP TABLE IF EXISTS books_book_fts",
+    ),
+    "postgresql": (
+        "DROP INDEX IF EXISTS books_book_search_idx",
+    ),
+    "mysql": (
+        "DROP INDEX books_book_search_idx ON books_book",
+    ),
+}
+
+
+def install_search_index(apps, schema_editor):
+    for statement in INSTALL_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+def remove_search_index(apps, schema_editor):
+    for statement in REMOVE_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
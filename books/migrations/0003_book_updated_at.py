@@ -0,0 +1,49 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+# Copied from 0002 rather than imported, so that migration can change
+# without changing this one.
+SQLITE_TRIGGERS_SQL = (
+    "CREATE TRIGGER IF NOT EXISTS books_book_fts_ai "
+    "AFTER INSERT ON books_book BEGIN "
+    "INSERT INTO books_book_fts(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_book_fts_ad "
+    "AFTER DELETE ON books_book BEGIN "
+    "INSERT INTO books_book_fts(books_book_fts, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); END",
+    "CREATE TRIGGER IF NOT EXISTS books_book_fts_au "
+    "AFTER UPDATE OF title, author ON books_book BEGIN "
+    "INSERT INTO books_book_fts(books_book_fts, rowid, title, author) "
+    "VALUES ('delete', old.id, old.title, old.author); "
+    "INSERT INTO books_book_fts(rowid, title, author) "
+    "VALUES (new.id, new.title, new.author); END",
+    "INSERT INTO books_book_fts(books_book_fts) VALUES ('rebuild')",
+)
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in SQLITE_TRIGGERS_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        # Adding the column rebuilds books_book on SQLite, which drops the
+        # triggers keeping the full-text index in sync.
+        migrations.RunPython(
+            reinstall_search_triggers, migrations.RunPython.noop
+        ),
+    ]
@@ -1,9 +1,31 @@
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import UniqueConstraint
+from django.db.models import F, UniqueConstraint
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 
+class BookQuerySet(models.QuerySet):
+    def decrement_inventory(self, amount: int = 1) -> int:
+        """
+        Take ``amount`` copies of every book in the queryset that still
+        has them, in a single conditional UPDATE.
+
+        Returns the number of books whose inventory was decremented.
+        """
+        return self.filter(inventory__gte=amount).update(
+            inventory=F("inventory") - amount,
+            updated_at=timezone.now()
+        )
+
+    def increment_inventory(self, amount: int = 1) -> int:
+        """Put ``amount`` copies of every book in the queryset back."""
+        return self.update(
+            inventory=F("inventory") + amount,
+            updated_at=timezone.now()
+        )
+
+
 class Book(models.Model):
     class CoverChoices(models.TextChoices):
         HARD = "HARD", _("Hard")
@@ -22,6 +44,9 @@ class Book(models.Model):
         decimal_places=2,
         validators=(MinValueValidator(0),)
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = BookQuerySet.as_manager()
 
     class Meta:
         constraints = (
@@ -0,0 +1,87 @@
+"""
+Full-text search over the book catalog.
+
+Every supported database backend keeps its own text index in sync with
+``books_book`` without any application code being involved:
+
+* SQLite - an external-content FTS5 table maintained by triggers;
+* PostgreSQL - a GIN index over a ``to_tsvector`` expression;
+* MySQL - a FULLTEXT index.
+
+Searches always go through that index, never through a LIKE scan. The
+index is created by the ``books`` migrations (0002). On SQLite, any later
+migration that rebuilds ``books_book`` drops the triggers and has to
+create them again, as 0003 does; ``BookSearchTests`` fails otherwise.
+"""
+import re
+
+from django.db import NotSupportedError, connections
+from django.db.models import BooleanField, FloatField, QuerySet
+from django.db.models.expressions import RawSQL
+
+BOOK_TABLE = "books_book"
+FTS_TABLE = "books_book_fts"
+TS_VECTOR = "to_tsvector('simple', title || ' ' || author)"
+
+
+def search_books(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Restrict ``queryset`` to books whose title or author match every word
+    of ``query`` (as a prefix) and order them by relevance.
+
+    The relevance is exposed as the ``search_rank`` annotation, higher is
+    better on every backend.
+    """
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "sqlite":
+        expression = " ".join(f'"{term}"*' for term in terms)
+        matches = RawSQL(
+            f"{BOOK_TABLE}.id IN (SELECT rowid FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s)",
+            (expression,),
+            output_field=BooleanField()
+        )
+        # FTS5 bm25() scores are negative, the best match is the lowest.
+        rank = RawSQL(
+            f"(SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND rowid = {BOOK_TABLE}.id)",
+            (expression,),
+            output_field=FloatField()
+        )
+    elif vendor == "postgresql":
+        expression = " & ".join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            f"{TS_VECTOR} @@ to_tsquery('simple', %s)",
+            (expression,),
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f"ts_rank({TS_VECTOR}, to_tsquery('simple', %s))",
+            (expression,),
+            output_field=FloatField()
+        )
+    elif vendor == "mysql":
+        expression = " ".join(f"+{term}*" for term in terms)
+        matches = RawSQL(
+            "MATCH (title, author) AGAINST (%s IN BOOLEAN MODE)",
+            (expression,),
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            "MATCH (title, author) AGAINST (%s IN BOOLEAN MODE)",
+            (expression,),
+            output_field=FloatField()
+        )
+    else:
+        raise NotSupportedError(
+            f"Full-text book search is not supported on {vendor}."
+        )
+
+    return queryset.filter(matches).annotate(
+        search_rank=rank
+    ).order_by("-search_rank", "id")
@@ -1,9 +1,34 @@
+from pathlib import Path
+
 from rest_framework import serializers
 
+from books.importer import READERS
 from books.models import Book
+from library_service_api.fieldsets import FieldsetSerializerMixin
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ("id", "title", "author", "cover", "inventory", "daily_fee")
+
+
+class BookImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(
+        choices=tuple(READERS), required=False
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        if "file_format" not in attrs:
+            extension = Path(attrs["file"].name).suffix[1:].lower()
+            if extension not in READERS:
+                raise serializers.ValidationError(
+                    {
+                        "file_format": "Can't guess the format from the "
+                                       "file name, please set it."
+                    }
+                )
+            attrs["file_format"] = extension
+
+        return attrs
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from books.cache import invalidate_book
+from books.models import Book
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_cached_book(sender: type[Book], instance: Book, **kwargs):
+    invalidate_book(instance.pk)
@@ -0,0 +1,351 @@
+import datetime
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from books.cache import stats
+from books.importer import BookImporter
+from books.models import Book
+from books.search import BOOK_TABLE, FTS_TABLE
+
+FILE_CACHE = "django.core.cache.backends.filebased.FileBasedCache"
+
+
+class BookSearchTests(APITestCase):
+    def setUp(self) -> None:
+        self.hobbit = Book.objects.create(
+            title="The Hobbit",
+            author="J. R. R. Tolkien",
+            inventory=3,
+            daily_fee=1.50
+        )
+        self.silmarillion = Book.objects.create(
+            title="The Silmarillion",
+            author="J. R. R. Tolkien",
+            inventory=1,
+            daily_fee=2.00
+        )
+        self.dune = Book.objects.create(
+            title="Dune",
+            author="Frank Herbert",
+            inventory=2,
+            daily_fee=1.00
+        )
+        self.url = reverse("books:book-list")
+
+    def search(self, query: str) -> list[int]:
+        response = self.client.get(self.url, {"search": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [book["id"] for book in response.data["results"]]
+
+    def test_search_by_author_and_title_prefix(self):
+        """Test search matches every word as a prefix of title or author"""
+        self.assertCountEqual(
+            self.search("tolkien"),
+            [self.hobbit.id, self.silmarillion.id]
+        )
+        self.assertEqual(self.search("tolk hobb"), [self.hobbit.id])
+        self.assertEqual(self.search("\"dune\" OR"), [])
+
+    def test_search_index_follows_book_changes(self):
+        """Test updated and deleted books are reflected in search results"""
+        self.dune.title = "Children of Dune"
+        self.dune.save()
+        self.assertEqual(self.search("children"), [self.dune.id])
+
+        Book.objects.filter(pk=self.hobbit.pk).update(title="There and Back")
+        self.assertEqual(self.search("hobbit"), [])
+        self.assertEqual(self.search("back"), [self.hobbit.id])
+
+        self.silmarillion.delete()
+        self.assertEqual(self.search("tolkien"), [self.hobbit.id])
+
+    def test_migrations_install_search_triggers(self):
+        """Test the FTS triggers exist once every migration has run"""
+        if connection.vendor != "sqlite":
+            self.skipTest("The FTS triggers are SQLite only.")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s",
+                (BOOK_TABLE,)
+            )
+            triggers = {name for name, in cursor.fetchall()}
+
+        self.assertEqual(
+            triggers,
+            {f"{FTS_TABLE}_ai", f"{FTS_TABLE}_ad", f"{FTS_TABLE}_au"}
+        )
+
+    def test_search_results_are_paginated(self):
+        """Test search results are returned in pages, unlike the plain list"""
+        response = self.client.get(
+            self.url, {"search": "tolkien", "page_size": 1}
+        )
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+
+class BookCacheTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        stats.reset()
+
+        self.book = Book.objects.create(
+            title="Dune",
+            author="Frank Herbert",
+            inventory=2,
+            daily_fee=1.00
+        )
+        self.list_url = reverse("books:book-list")
+        self.detail_url = reverse(
+            "books:book-detail", kwargs={"pk": self.book.id}
+        )
+
+    def test_list_and_detail_are_served_from_cache(self):
+        """Test repeated reads hit the cache without touching the database"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        with self.assertNumQueries(0):
+            list_response = self.client.get(self.list_url)
+            detail_response = self.client.get(self.detail_url)
+
+        self.assertEqual(list_response.data[0]["title"], "Dune")
+        self.assertEqual(detail_response.data["title"], "Dune")
+        self.assertEqual((stats.hits, stats.misses), (2, 2))
+
+    def test_saving_book_invalidates_cache(self):
+        """Test a saved book is re-read on both list and detail"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url)
+
+        self.book.title = "Dune Messiah"
+        self.book.save()
+
+        self.assertEqual(
+            self.client.get(self.list_url).data[0]["title"], "Dune Messiah"
+        )
+        self.assertEqual(
+            self.client.get(self.detail_url).data["title"], "Dune Messiah"
+        )
+
+    def test_borrow_and_return_invalidate_cache(self):
+        """Test inventory changes from borrowings are visible right away"""
+        user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.client.force_authenticate(user=user)
+        self.client.get(self.detail_url)
+
+        response = self.client.post(
+            reverse("borrowings:borrowings-list"),
+            {
+                "book": self.book.id,
+                "expected_return_date": (
+                    timezone.now().date() + datetime.timedelta(days=7)
+                ),
+            },
+            format="json"
+        )
+        self.assertEqual(
+            self.client.get(self.detail_url).data["inventory"], 1
+        )
+
+        self.client.post(
+            reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": response.data["id"]}
+            )
+        )
+        self.assertEqual(
+            self.client.get(self.detail_url).data["inventory"], 2
+        )
+
+    def test_shared_cache_invalidates_other_workers(self):
+        """Test a write through one worker is seen by another one"""
+        with tempfile.TemporaryDirectory() as location, self.settings(
+            CACHES={"default": {"BACKEND": FILE_CACHE, "LOCATION": location}}
+        ):
+            self.client.get(self.detail_url)
+
+            # Another worker, with its own connection to the same cache.
+            with patch("books.cache.cache", FileBasedCache(location, {})):
+                self.book.title = "Dune Messiah"
+                self.book.save()
+
+            self.assertEqual(
+                self.client.get(self.detail_url).data["title"], "Dune Messiah"
+            )
+
+    def test_conditional_get_returns_not_modified(self):
+        """Test matching validators are answered with 304 until a change"""
+        response = self.client.get(self.detail_url)
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(
+            self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        list_etag = self.client.get(self.list_url).headers["ETag"]
+        self.book.inventory = 1
+        self.book.save()
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["inventory"], 1)
+        response = self.client.get(
+            self.list_url, HTTP_IF_NONE_MATCH=list_etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_sparse_fields_are_cached_per_fieldset(self):
+        """Test every fieldset is cached apart from the full response"""
+        self.client.get(self.list_url)
+        self.client.get(self.detail_url, {"fields": "title"})
+
+        with self.assertNumQueries(1):
+            list_response = self.client.get(
+                self.list_url, {"fields": "title,id"}
+            )
+        with self.assertNumQueries(0):
+            detail_response = self.client.get(
+                self.detail_url, {"fields": "title"}
+            )
+
+        self.assertEqual(
+            list_response.data, [{"id": self.book.id, "title": "Dune"}]
+        )
+        self.assertEqual(detail_response.data, {"title": "Dune"})
+
+        response = self.client.get(self.list_url, {"expand": "author"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BookImportTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.dune = Book.objects.create(
+            title="Dune",
+            author="Frank Herbert",
+            inventory=2,
+            daily_fee=1.00
+        )
+        self.url = reverse("books:book-book-import")
+
+    def test_import_upserts_and_reports_rejected_rows(self):
+        """Test CSV import inserts, updates, merges and rejects rows"""
+        self.client.force_authenticate(user=self.staff_user)
+        self.client.get(
+            reverse("books:book-detail", kwargs={"pk": self.dune.id})
+        )
+
+        upload = SimpleUploadedFile(
+            "catalog.csv",
+            (
+                "title,author,cover,inventory,daily_fee\n"
+                "Dune,Frank Herbert,HARD,7,2.50\n"
+                "Emma,Jane Austen,soft,1,0.75\n"
+                "Emma,Jane Austen,soft,2,0.75\n"
+                ",Nobody,SOFT,-1,abc\n"
+            ).encode()
+        )
+
+        response = self.client.post(
+            self.url, {"file": upload}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["processed"], 4)
+        self.assertEqual(response.data["upserted"], 2)
+        self.assertEqual(response.data["rejected"], 1)
+        self.assertEqual(response.data["rejected_rows"][0]["line"], 5)
+        self.assertEqual(
+            set(response.data["rejected_rows"][0]["errors"]),
+            {"title", "inventory", "daily_fee"}
+        )
+
+        self.dune.refresh_from_db()
+        self.assertEqual(
+            (self.dune.cover, self.dune.inventory, str(self.dune.daily_fee)),
+            ("HARD", 7, "2.50")
+        )
+        self.assertEqual(Book.objects.get(title="Emma").inventory, 3)
+        self.assertEqual(
+            self.client.get(
+                reverse("books:book-detail", kwargs={"pk": self.dune.id})
+            ).data["inventory"],
+            7
+        )
+
+    def test_import_sums_duplicates_across_batches(self):
+        """Test duplicates are summed whatever the batch size"""
+        rows = [
+            (1, {"title": "Emma", "author": "Jane Austen",
+                 "inventory": "1", "daily_fee": "0.75"}),
+            (2, {"title": "Dune", "author": "Frank Herbert",
+                 "inventory": "3", "daily_fee": "1.00"}),
+            (3, {"title": "Emma", "author": "Jane Austen",
+                 "inventory": "2", "daily_fee": "0.75"}),
+        ]
+
+        for batch_size in (1, 5000):
+            report = BookImporter(batch_size).run(rows)
+
+            self.assertEqual(report.upserted, 2)
+            self.assertEqual(Book.objects.get(title="Emma").inventory, 3)
+            self.assertEqual(Book.objects.get(title="Dune").inventory, 3)
+
+    def test_import_staff_only(self):
+        """Test regular users can't import books"""
+        upload = SimpleUploadedFile("catalog.jsonl", b"")
+
+        response = self.client.post(
+            self.url, {"file": upload}, format="multipart"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_import_command(self):
+        """Test the import_books command streams JSON lines files"""
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as source:
+            source.write(
+                '{"title": "Emma", "author": "Jane Austen", '
+                '"inventory": 4, "daily_fee": "0.75"}\n'
+                "not json\n"
+            )
+            source.flush()
+
+            out, err = StringIO(), StringIO()
+            call_command("import_books", source.name, stdout=out, stderr=err)
+
+        self.assertIn("1 books upserted, 1 rows rejected", out.getvalue())
+        self.assertIn("Line 2", err.getvalue())
+        self.assertEqual(Book.objects.get(title="Emma").cover, "SOFT")
@@ -1,14 +1,26 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from books.views import BookViewSet
+from books.views import AsyncBookDetailView, AsyncBookListView, BookViewSet
+from library_service_api.async_views import async_routes
 
 router = routers.DefaultRouter()
 
 router.register("books", BookViewSet)
 
 urlpatterns = [
-    path("", include(router.urls)),
+    path(
+        "",
+        include(
+            async_routes(
+                router.urls,
+                {
+                    "book-list": AsyncBookListView,
+                    "book-detail": AsyncBookDetailView,
+                }
+            )
+        )
+    ),
 ]
 
 app_name = "books"
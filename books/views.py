@@ -1,26 +1,142 @@
-from rest_framework import viewsets
+import io
 
+from django.db.models import QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import BasePagination
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from books.cache import (
+    abook_detail_key,
+    abook_list_key,
+    aget_or_set,
+    book_detail_key,
+    book_list_key,
+    get_or_set
+)
+from books.importer import import_books
 from books.models import Book
+from books.pagination import BookSearchPagination
 from books.permissions import IsAdminOrReadOnly
-from books.serializers import BookSerializer
+from books.search import search_books
+from books.serializers import BookImportSerializer, BookSerializer
+from library_service_api.async_views import AsyncGenericAPIView
+from library_service_api.conditional import ConditionalGetMixin
+from library_service_api.fieldsets import FieldsetMixin
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    FieldsetMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for managing book resources.
     """
-    serializer_class = BookSerializer
     queryset = Book.objects.all()
     permission_classes = (IsAdminOrReadOnly,)
+    row_actions = ("list",)
+
+    def get_serializer_class(self) -> type(serializers.Serializer):
+        if self.action == "book_import":
+            return BookImportSerializer
+        return BookSerializer
+
+    @property
+    def search_query(self) -> str | None:
+        if self.action != "list":
+            return None
+        return self.request.query_params.get("search") or None
+
+    @property
+    def paginator(self) -> BasePagination | None:
+        """
+        Only search results are paginated, the plain catalog list keeps
+        returning every book.
+        """
+        if self.search_query is None:
+            return None
+        if not hasattr(self, "_search_paginator"):
+            self._search_paginator = BookSearchPagination()
+        return self._search_paginator
+
+    def get_queryset(self) -> QuerySet:
+        queryset = super().get_queryset()
+
+        if self.search_query is not None:
+            queryset = search_books(queryset, self.search_query)
+
+        return queryset
 
+    def get_list_cache_entry(self) -> dict:
+        books = list(self.project(self.filter_queryset(self.get_queryset())))
+        etag, _ = self.get_validators(books)
+        return {
+            "data": self.get_list_data(books),
+            "etag": etag,
+            "last_modified": None,
+        }
+
+    def get_detail_cache_entry(self) -> dict:
+        book = self.get_object()
+        etag, last_modified = self.get_validators((book,))
+        return {
+            "data": self.get_detail_data(book),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="search",
+                description="Full-text search by title and author, ranked "
+                            "by relevance and paginated "
+                            "(ex. ?search=tolkien ring).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="page",
+                description="Page of search results (ex. ?page=2).",
+                required=False,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="page_size",
+                description="Number of search results per page "
+                            "(default 20, max 100) (ex. ?page_size=50).",
+                required=False,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="fields",
+                description="Comma separated fields to return "
+                            "(ex. ?fields=id,title).",
+                required=False,
+                type=str,
+            ),
+        ]
+    )
     def list(self, request, *args, **kwargs):
         """
         List all books.
 
         Lists all available books in the database.
+        With the search parameter, returns a page of books matching
+        the words in their title or author, best matches first.
         This action is available to all users.
         """
-        return super().list(request, *args, **kwargs)
+        if self.search_query is not None:
+            return super().list(request, *args, **kwargs)
+
+        entry = get_or_set(
+            book_list_key() + self.get_fieldset_key(),
+            self.get_list_cache_entry
+        )
+        return self.get_cached_response(entry)
 
     def create(self, request, *args, **kwargs):
         """
@@ -31,6 +147,17 @@ class BookViewSet(viewsets.ModelViewSet):
         """
         return super().create(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="fields",
+                description="Comma separated fields to return "
+                            "(ex. ?fields=id,title).",
+                required=False,
+                type=str,
+            ),
+        ]
+    )
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve a specific book.
@@ -38,7 +165,16 @@ class BookViewSet(viewsets.ModelViewSet):
         Fetches and returns details of a specific book by its ID.
         This action is available to all users.
         """
-        return super().retrieve(request, *args, **kwargs)
+        try:
+            book_id = int(kwargs["pk"])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+
+        entry = get_or_set(
+            book_detail_key(book_id) + self.get_fieldset_key(),
+            self.get_detail_cache_entry
+        )
+        return self.get_cached_response(entry)
 
     def update(self, request, *args, **kwargs):
         """
@@ -66,3 +202,103 @@ class BookViewSet(viewsets.ModelViewSet):
         This action is restricted to admin users only.
         """
         return super().destroy(request, *args, **kwargs)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        parser_classes=(MultiPartParser,),
+        url_path="import"
+    )
+    def book_import(self, request, *args, **kwargs):
+        """
+        Import or refresh books from a CSV or JSON lines file (staff only).
+
+        Each row has title, author, cover, inventory and daily_fee.
+        Books with an existing title and author are updated, repeated
+        rows are merged with their inventories added up. Responds with
+        the number of processed, upserted and rejected rows and the
+        errors of the first rejected ones.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        stream = io.TextIOWrapper(
+            serializer.validated_data["file"].file,
+            encoding="utf-8-sig",
+            newline=""
+        )
+        report = import_books(
+            stream, serializer.validated_data["file_format"]
+        )
+
+        return Response(report.as_dict(), status=status.HTTP_200_OK)
+
+
+class AsyncBookView(
+    FieldsetMixin, ConditionalGetMixin, AsyncGenericAPIView
+):
+    queryset = Book.objects.all()
+    serializer_class = BookSerializer
+    permission_classes = (IsAdminOrReadOnly,)
+
+
+class AsyncBookListView(AsyncBookView):
+    """
+    Async catalog list, sharing its cache entries with BookViewSet.
+
+    Searches are left to BookViewSet.
+    """
+    action = "list"
+    row_actions = ("list",)
+
+    def is_async_request(self, request: HttpRequest) -> bool:
+        return super().is_async_request(request) and not request.GET.get(
+            "search"
+        )
+
+    async def get_list_cache_entry(self) -> dict:
+        books = [
+            book async for book in self.project(
+                self.filter_queryset(self.get_queryset())
+            )
+        ]
+        etag, _ = self.get_validators(books)
+        return {
+            "data": self.get_list_data(books),
+            "etag": etag,
+            "last_modified": None,
+        }
+
+    async def get(self, request, *args, **kwargs):
+        entry = await aget_or_set(
+            await abook_list_key() + self.get_fieldset_key(),
+            self.get_list_cache_entry
+        )
+        return self.get_cached_response(entry)
+
+
+class AsyncBookDetailView(AsyncBookView):
+    """Async book detail, sharing its cache entries with BookViewSet."""
+    action = "retrieve"
+
+    async def get_detail_cache_entry(self) -> dict:
+        book = await self.aget_object()
+        etag, last_modified = self.get_validators((book,))
+        return {
+            "data": self.get_detail_data(book),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            book_id = int(kwargs["pk"])
+        except ValueError:
+            raise Http404
+
+        entry = await aget_or_set(
+            await abook_detail_key(book_id) + self.get_fieldset_key(),
+            self.get_detail_cache_entry
+        )
+        return self.get_cached_response(entry)
@@ -1,8 +1,28 @@
 from django.contrib import admin
 
-from borrowings.models import Borrowing
+from borrowings.models import (
+    Borrowing,
+    BorrowingDailyStat,
+    OverdueNotice,
+    OverdueScan
+)
 
 
 @admin.register(Borrowing)
 class BorrowingAdmin(admin.ModelAdmin):
     pass
+
+
+@admin.register(OverdueScan)
+class OverdueScanAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(OverdueNotice)
+class OverdueNoticeAdmin(admin.ModelAdmin):
+    pass
+
+
+@admin.register(BorrowingDailyStat)
+class BorrowingDailyStatAdmin(admin.ModelAdmin):
+    pass
@@ -0,0 +1,39 @@
+from django.db import NotSupportedError
+from django.db.models import Func, IntegerField
+
+
+class DaysBetween(Func):
+    """
+    Whole days from the second date expression to the first one,
+    computed by the database (negative when the first one is earlier).
+    """
+    arity = 2
+    output_field = IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"DaysBetween is not supported on {connection.vendor}."
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="CAST(julianday(%(expressions)s) AS INTEGER)",
+            arg_joiner=") - julianday(",
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="(%(expressions)s::date)",
+            arg_joiner="::date - ",
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function="DATEDIFF", **extra_context
+        )
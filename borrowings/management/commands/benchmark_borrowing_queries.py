@@ -0,0 +1,187 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from books.models import Book
+from borrowings.models import Borrowing
+from borrowings.pagination import BorrowingCursorPagination
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic borrowing history and report query plans and "
+        "timings for every borrowings list filter combination. The seeded "
+        "rows are rolled back afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--users", type=int, default=1_000)
+        parser.add_argument("--books", type=int, default=1_000)
+        parser.add_argument("--borrowings", type=int, default=100_000)
+        parser.add_argument(
+            "--active-ratio",
+            type=float,
+            default=0.1,
+            help="Share of seeded borrowings that are not returned yet."
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="How many times each query is timed."
+        )
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Commit the seeded rows instead of rolling them back."
+        )
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            started = time.perf_counter()
+            user_ids = self.seed(options)
+            self.stdout.write(
+                f"Seeded {options['borrowings']} borrowings in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            sample_user_id = user_ids[len(user_ids) // 2]
+            for label, queryset in self.get_list_querysets(sample_user_id):
+                self.report(label, queryset, options["repeat"])
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def seed(self, options: dict) -> list[int]:
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        run = uuid.uuid4().hex[:8]
+        password = make_password(None)
+
+        users = get_user_model().objects.bulk_create(
+            (
+                get_user_model()(
+                    email=f"bench-{run}-{i}@example.com",
+                    password=password
+                )
+                for i in range(options["users"])
+            ),
+            batch_size=batch_size
+        )
+        books = Book.objects.bulk_create(
+            (
+                Book(
+                    title=f"Benchmark book {run}-{i}",
+                    author=f"Author {i % 100}",
+                    inventory=rng.randint(0, 10),
+                    daily_fee=rng.randint(1, 500) / 100
+                )
+                for i in range(options["books"])
+            ),
+            batch_size=batch_size
+        )
+        user_ids = [user.id for user in users]
+        book_ids = [book.id for book in books]
+
+        today = timezone.now().date()
+        pending = []
+        for _ in range(options["borrowings"]):
+            is_active = rng.random() < options["active_ratio"]
+            pending.append(
+                Borrowing(
+                    book_id=rng.choice(book_ids),
+                    user_id=rng.choice(user_ids),
+                    expected_return_date=today + timedelta(
+                        days=rng.randint(-30, 30)
+                    ),
+                    actual_return_date=None if is_active else today
+                )
+            )
+            if len(pending) == batch_size:
+                Borrowing.objects.bulk_create(pending)
+                pending = []
+        Borrowing.objects.bulk_create(pending)
+
+        return user_ids
+
+    @staticmethod
+    def get_list_querysets(user_id: int) -> list[tuple[str, QuerySet]]:
+        """
+        Mirror ``BorrowingViewSet.get_queryset`` plus the first and a
+        following cursor page for every combination of the ``user_id``
+        and ``is_active`` filters.
+        """
+        base = Borrowing.objects.select_related("book", "user")
+        active_filters = (
+            ("all", {}),
+            ("active", {"actual_return_date__isnull": True}),
+            ("returned", {"actual_return_date__isnull": False}),
+        )
+        page = BorrowingCursorPagination.page_size
+        ordering = BorrowingCursorPagination.ordering
+        cursor = Borrowing.objects.order_by("-id").values_list(
+            "id", flat=True
+        )[:1].get() // 2
+
+        querysets = []
+        for active_label, active_filter in active_filters:
+            for scope_label, scope_filter in (
+                ("staff", {}),
+                ("user", {"user_id": user_id}),
+            ):
+                queryset = base.filter(**active_filter, **scope_filter)
+                label = f"{scope_label}, {active_label}"
+                querysets.append(
+                    (f"list {label}", queryset.order_by(ordering)[:page])
+                )
+                querysets.append(
+                    (
+                        f"next page {label}",
+                        queryset.filter(id__lt=cursor).order_by(
+                            ordering
+                        )[:page]
+                    )
+                )
+                querysets.append(
+                    (
+                        f"count {label}",
+                        queryset.select_related(None).values("id")
+                    )
+                )
+        return querysets
+
+    def report(self, label: str, queryset: QuerySet, repeat: int) -> None:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if label.startswith("count"):
+                queryset.count()
+            else:
+                list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        plan_queryset = queryset
+        if label.startswith("count"):
+            plan_queryset = queryset.values("id")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  median {statistics.median(timings):.3f} ms, "
+            f"max {max(timings):.3f} ms over {repeat} runs"
+        )
+        for line in plan_queryset.explain().splitlines():
+            self.stdout.write(f"  {line}")
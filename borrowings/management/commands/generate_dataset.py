@@ -0,0 +1,293 @@
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from books.cache import invalidate_catalog
+from books.models import Book
+from borrowings.models import Borrowing
+
+
+def zipf_cum_weights(size: int, exponent: float) -> list[float]:
+    """Cumulative weights making rank ``i`` proportional to 1 / i^s."""
+    return list(
+        accumulate(1 / rank ** exponent for rank in range(1, size + 1))
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset of users, books and "
+        "borrowings for scale testing. Popularity of books and activity of "
+        "users follow Zipf distributions, every active borrowing holds a "
+        "copy of its book and Book.inventory is the number of copies left."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--books", type=int, default=5_000)
+        parser.add_argument("--borrowings", type=int, default=200_000)
+        parser.add_argument(
+            "--active-ratio",
+            type=float,
+            default=0.05,
+            help="Share of borrowings that are not returned yet."
+        )
+        parser.add_argument(
+            "--overdue-ratio",
+            type=float,
+            default=0.3,
+            help="Share of active borrowings past their expected return date."
+        )
+        parser.add_argument(
+            "--history-days",
+            type=int,
+            default=730,
+            help="How far back borrow dates of returned borrowings go."
+        )
+        parser.add_argument(
+            "--book-skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of book popularity (0 is uniform)."
+        )
+        parser.add_argument(
+            "--user-skew",
+            type=float,
+            default=0.8,
+            help="Zipf exponent of user activity (0 is uniform)."
+        )
+        parser.add_argument("--chunk-size", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="synthetic",
+            help="Prefix of the generated emails and titles, change it to "
+                 "generate another dataset next to an existing one."
+        )
+
+    def handle(self, *args, **options) -> None:
+        if get_user_model().objects.filter(
+            email=f"{options['prefix']}-0@example.com"
+        ).exists():
+            raise CommandError(
+                f"A dataset with the prefix {options['prefix']!r} already "
+                f"exists, pass another --prefix."
+            )
+
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        user_ids = self.generate_users(options)
+        book_ids, copies = self.generate_books(rng, options)
+        remaining = self.generate_borrowings(
+            rng, options, user_ids, book_ids, copies
+        )
+        self.update_inventory(book_ids, copies, remaining)
+        invalidate_catalog()
+
+        elapsed = time.perf_counter() - started
+        total = options["users"] + options["books"] + options["borrowings"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {total} rows in {elapsed:.1f}s "
+                f"({total / elapsed:,.0f} rows/s)"
+            )
+        )
+
+    def report(self, label: str, rows: int, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label}: {rows} rows in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+        )
+
+    def generate_users(self, options: dict) -> list[int]:
+        user_model = get_user_model()
+        # Hashing once instead of per row, every user shares the password.
+        password = make_password("synthetic-password")
+        prefix = options["prefix"]
+        chunk_size = options["chunk_size"]
+
+        started = time.perf_counter()
+        user_ids = []
+        for offset in range(0, options["users"], chunk_size):
+            with transaction.atomic():
+                user_ids.extend(
+                    user.id
+                    for user in user_model.objects.bulk_create(
+                        user_model(
+                            email=f"{prefix}-{index}@example.com",
+                            password=password
+                        )
+                        for index in range(
+                            offset, min(offset + chunk_size, options["users"])
+                        )
+                    )
+                )
+        self.report("Users", len(user_ids), started)
+        return user_ids
+
+    def generate_books(
+        self, rng: random.Random, options: dict
+    ) -> tuple[list[int], list[int]]:
+        prefix = options["prefix"]
+        chunk_size = options["chunk_size"]
+
+        started = time.perf_counter()
+        book_ids = []
+        copies = []
+        for offset in range(0, options["books"], chunk_size):
+            chunk = []
+            for index in range(
+                offset, min(offset + chunk_size, options["books"])
+            ):
+                copies.append(rng.randint(1, 10))
+                chunk.append(
+                    Book(
+                        title=f"{prefix.title()} book {index}",
+                        author=f"{prefix.title()} author {index % 5_000}",
+                        cover=rng.choice(("HARD", "SOFT")),
+                        inventory=copies[-1],
+                        daily_fee=rng.randint(10, 500) / 100
+                    )
+                )
+            with transaction.atomic():
+                book_ids.extend(
+                    book.id for book in Book.objects.bulk_create(chunk)
+                )
+        self.report("Books", len(book_ids), started)
+        return book_ids, copies
+
+    def generate_borrowings(
+        self,
+        rng: random.Random,
+        options: dict,
+        user_ids: list[int],
+        book_ids: list[int],
+        copies: list[int]
+    ) -> list[int]:
+        """
+        Create the borrowings and return the copies left of every book.
+
+        An active borrowing drawn for a book with no copy left goes to a
+        few uniformly drawn books instead, like a reader settling for
+        something else, and ends up returned if none of them is
+        available, so inventories never go negative.
+
+        Borrowings are inserted with ``executemany`` of the statement
+        ``bulk_create`` would build: preparing model instances field by
+        field is what caps ``bulk_create`` at a few thousand rows per
+        second, while the table is meant to hold tens of millions.
+        """
+        history = options["history_days"]
+        chunk_size = options["chunk_size"]
+        remaining = list(copies)
+
+        # Popularity ranks are shuffled so the most borrowed books and
+        # the most active users aren't simply the first ones created.
+        book_order = list(range(len(book_ids)))
+        user_order = list(range(len(user_ids)))
+        rng.shuffle(book_order)
+        rng.shuffle(user_order)
+        book_weights = zipf_cum_weights(len(book_ids), options["book_skew"])
+        user_weights = zipf_cum_weights(len(user_ids), options["user_skew"])
+
+        # Dates are adapted once per day offset (positive is in the past)
+        # rather than once per value.
+        today = timezone.now().date()
+        adapt = connection.ops.adapt_datefield_value
+        days = {
+            offset: adapt(today - timedelta(days=offset))
+            for offset in range(-30, max(history, 90) + 1)
+        }
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        fields = [
+            Borrowing._meta.get_field(name)
+            for name in (
+                "book",
+                "user",
+                "borrow_date",
+                "expected_return_date",
+                "actual_return_date",
+                "updated_at",
+            )
+        ]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(Borrowing._meta.db_table),
+            ", ".join(
+                connection.ops.quote_name(field.column) for field in fields
+            ),
+            ", ".join(["%s"] * len(fields))
+        )
+
+        started = time.perf_counter()
+        created = 0
+        while created < options["borrowings"]:
+            size = min(chunk_size, options["borrowings"] - created)
+            books = rng.choices(book_order, cum_weights=book_weights, k=size)
+            users = rng.choices(user_order, cum_weights=user_weights, k=size)
+
+            rows = []
+            for book, user in zip(books, users):
+                is_active = rng.random() < options["active_ratio"]
+                if is_active:
+                    for _ in range(3):
+                        if remaining[book]:
+                            break
+                        book = rng.randrange(len(book_ids))
+                    is_active = remaining[book] > 0
+
+                if is_active:
+                    remaining[book] -= 1
+                    if rng.random() < options["overdue_ratio"]:
+                        borrowed = rng.randint(31, 90)
+                    else:
+                        borrowed = rng.randint(0, 13)
+                    returned = None
+                else:
+                    borrowed = rng.randint(1, history)
+                    returned = days[max(borrowed - rng.randint(1, 45), 0)]
+
+                rows.append((
+                    book_ids[book],
+                    user_ids[user],
+                    days[borrowed],
+                    days[borrowed - rng.randint(14, 30)],
+                    returned,
+                    updated_at,
+                ))
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            created += size
+            if created % 1_000_000 < chunk_size:
+                self.report("Borrowings", created, started)
+
+        if created % 1_000_000 >= chunk_size:
+            self.report("Borrowings", created, started)
+        return remaining
+
+    def update_inventory(
+        self, book_ids: list[int], copies: list[int], remaining: list[int]
+    ) -> None:
+        """Set the copies left, with one UPDATE per inventory value."""
+        by_inventory = defaultdict(list)
+        for book_id, total, left in zip(book_ids, copies, remaining):
+            if left != total:
+                by_inventory[left].append(book_id)
+
+        with transaction.atomic():
+            for inventory, ids in by_inventory.items():
+                for offset in range(0, len(ids), 10_000):
+                    Book.objects.filter(
+                        id__in=ids[offset:offset + 10_000]
+                    ).update(inventory=inventory, updated_at=timezone.now())
@@ -0,0 +1,35 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from borrowings.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily borrowing rollup from the borrowings, from "
+        "--since on or over the whole history. Use it to backfill the "
+        "rollup and to catch up with borrowings written around the API, "
+        "such as imported or generated data."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="First day to recompute, as YYYY-MM-DD."
+        )
+        parser.add_argument("--batch-size", type=int, default=5_000)
+
+    def handle(self, *args, **options) -> None:
+        started = time.perf_counter()
+        written = rebuild_daily_stats(
+            options["since"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {written} daily rows in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('borrowings', '0003_borrowing_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverdueScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scan_date', models.DateField(unique=True)),
+                ('cursor_date', models.DateField(blank=True, null=True)),
+                ('cursor_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OverdueNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scan_date', models.DateField()),
+                ('days_overdue', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('borrowing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overdue_notices', to='borrowings.borrowing')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('borrowing', 'scan_date'), name='unique_borrowing_scan_date')],
+            },
+        ),
+    ]
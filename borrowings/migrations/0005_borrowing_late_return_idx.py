@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_updated_at'),
+        ('borrowings', '0004_overdue_scan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowing',
+            index=models.Index(condition=models.Q(('actual_return_date__gt', models.F('expected_return_date'))), fields=['actual_return_date'], name='borrowing_late_return_idx'),
+        ),
+    ]
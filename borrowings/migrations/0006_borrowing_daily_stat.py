@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_updated_at'),
+        ('borrowings', '0005_borrowing_late_return_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BorrowingDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('borrows', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('active', models.IntegerField(default=0)),
+                ('book', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='books.book')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'book'], name='borrowing_stat_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('book', 'date'), name='unique_book_stat_date')],
+            },
+        ),
+    ]
@@ -3,14 +3,59 @@ from datetime import date
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 
 from books.models import Book
+from borrowings.functions import DaysBetween
+
+
+class BorrowingQuerySet(models.QuerySet):
+    def overdue(self, as_of: date | None = None) -> "BorrowingQuerySet":
+        """
+        Active borrowings whose expected return date is before ``as_of``
+        (today by default), annotated with ``days_overdue`` and ordered
+        along ``borrowing_active_due_idx``.
+        """
+        as_of = as_of or timezone.now().date()
+        return self.filter(
+            actual_return_date__isnull=True,
+            expected_return_date__lt=as_of
+        ).annotate(
+            days_overdue=DaysBetween(Value(as_of), "expected_return_date")
+        ).order_by("expected_return_date", "id")
+
+    def with_fees(self, as_of: date | None = None) -> "BorrowingQuerySet":
+        """
+        Annotate ``days_late`` and the late ``fee`` (days late times the
+        book's daily fee) of every borrowing.
+
+        Returned borrowings are charged up to their return date, active
+        ones up to ``as_of`` (today by default); borrowings returned on
+        time cost nothing.
+        """
+        as_of = as_of or timezone.now().date()
+        return self.annotate(
+            days_late=Greatest(
+                DaysBetween(
+                    Coalesce("actual_return_date", Value(as_of)),
+                    "expected_return_date"
+                ),
+                Value(0)
+            ),
+            fee=ExpressionWrapper(
+                F("days_late") * F("book__daily_fee"),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
 
 
 class Borrowing(models.Model):
     borrow_date = models.DateField(auto_now_add=True)
     expected_return_date = models.DateField()
     actual_return_date = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     book = models.ForeignKey(
         Book,
         on_delete=models.CASCADE,
@@ -19,9 +64,44 @@ class Borrowing(models.Model):
     user = models.ForeignKey(
         get_user_model(),
         on_delete=models.CASCADE,
-        related_name="borrowings"
+        related_name="borrowings",
+        # Covered by the leading column of borrowing_user_returned_idx.
+        db_index=False
     )
 
+    objects = BorrowingQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("user", "actual_return_date"),
+                name="borrowing_user_returned_idx"
+            ),
+            # A user's borrowings newest first, paged by id, without
+            # sorting them all.
+            models.Index(
+                fields=("user", "id"),
+                name="borrowing_user_id_idx"
+            ),
+            models.Index(
+                fields=("id",),
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_idx"
+            ),
+            models.Index(
+                fields=("expected_return_date", "id"),
+                condition=models.Q(actual_return_date__isnull=True),
+                name="borrowing_active_due_idx"
+            ),
+            models.Index(
+                fields=("actual_return_date",),
+                condition=models.Q(
+                    actual_return_date__gt=F("expected_return_date")
+                ),
+                name="borrowing_late_return_idx"
+            ),
+        )
+
     @staticmethod
     def validate_borrowing_dates(
         borrow_date: date,
@@ -58,3 +138,84 @@ class Borrowing(models.Model):
             f"{self.user.email} borrowed {self.book.title} "
             f"on {self.borrow_date}"
         )
+
+
+class OverdueScan(models.Model):
+    """
+    Progress of the overdue scan of one day.
+
+    The cursor is the ``(expected_return_date, id)`` of the last
+    borrowing recorded, an interrupted scan resumes right after it.
+    """
+    scan_date = models.DateField(unique=True)
+    cursor_date = models.DateField(blank=True, null=True)
+    cursor_id = models.PositiveBigIntegerField(blank=True, null=True)
+    processed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"Overdue scan of {self.scan_date}"
+
+
+class OverdueNotice(models.Model):
+    borrowing = models.ForeignKey(
+        Borrowing,
+        on_delete=models.CASCADE,
+        related_name="overdue_notices"
+    )
+    scan_date = models.DateField()
+    days_overdue = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("borrowing", "scan_date"),
+                name="unique_borrowing_scan_date"
+            ),
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"Borrowing {self.borrowing_id} overdue by "
+            f"{self.days_overdue} days on {self.scan_date}"
+        )
+
+
+class BorrowingDailyStat(models.Model):
+    """
+    Borrowing activity of one book on one day.
+
+    ``active`` is the number of the book's borrowings still out at the
+    end of that day. Days without any borrow or return have no row, the
+    count carries over from the previous row.
+    """
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="daily_stats",
+        # Covered by the leading column of unique_book_stat_date.
+        db_index=False
+    )
+    date = models.DateField()
+    borrows = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    active = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("book", "date"),
+                name="unique_book_stat_date"
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=("date", "book"),
+                name="borrowing_stat_date_idx"
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f"Book {self.book_id} on {self.date}"
@@ -0,0 +1,18 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class CSVRenderer(JSONRenderer):
+    """
+    Negotiates the CSV export format.
+
+    The export rows are streamed by the view itself, this renderer only
+    ever renders error responses, which stay JSON encoded.
+    """
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(JSONRenderer):
+    """Negotiates the newline-delimited JSON export format."""
+    media_type = "application/x-ndjson"
+    format = "ndjson"
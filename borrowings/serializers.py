@@ -1,10 +1,28 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from books.cache import invalidate_book
 from books.models import Book
 from books.serializers import BookSerializer
 from borrowings.models import Borrowing
+from borrowings.stats import record_activity
+from library_service_api.fieldsets import FieldsetSerializerMixin
+from users.serializers import UserSerializer
+
+BOOK_NOT_AVAILABLE_ERROR = "This book is not available - inventory is 0."
+
+
+def group_by_quantity(copies: Counter) -> dict[int, list[int]]:
+    """Map each quantity to the ids of the books it applies to."""
+    books_by_quantity = defaultdict(list)
+    for book_id, quantity in copies.items():
+        books_by_quantity[quantity].append(book_id)
+    return books_by_quantity
 
 
 class BorrowingSerializer(serializers.ModelSerializer):
@@ -14,9 +32,7 @@ class BorrowingSerializer(serializers.ModelSerializer):
 
     def validate_book(self, book: Book) -> Book:
         if book.inventory < 1:
-            raise serializers.ValidationError(
-                "This book is not available - inventory is 0."
-            )
+            raise serializers.ValidationError(BOOK_NOT_AVAILABLE_ERROR)
         return book
 
     def validate(self, attrs: dict) -> dict:
@@ -34,16 +50,322 @@ class BorrowingSerializer(serializers.ModelSerializer):
         return attrs
 
     def create(self, validated_data: dict) -> Borrowing:
-        validated_data["user"] = self.context["request"].user
+        validated_data["user_id"] = self.context["request"].user.pk
 
         book = validated_data["book"]
-        book.inventory -= 1
-        book.save()
 
-        return super().create(validated_data)
+        with transaction.atomic():
+            taken = Book.objects.filter(pk=book.pk).decrement_inventory()
+            if not taken:
+                raise serializers.ValidationError(
+                    {"book": [BOOK_NOT_AVAILABLE_ERROR]}
+                )
+            invalidate_book(book.pk)
+
+            borrowing = super().create(validated_data)
+            record_activity(
+                borrowing.borrow_date, borrows=Counter({book.pk: 1})
+            )
+            return borrowing
+
+
+class BorrowingBulkItemSerializer(serializers.Serializer):
+    book = serializers.IntegerField(min_value=1)
+    expected_return_date = serializers.DateField()
+
+
+class BorrowingBulkCreateSerializer(serializers.Serializer):
+    """
+    Borrow several books at once.
+
+    Items are validated together, every book's inventory is decremented
+    with one conditional UPDATE per distinct requested quantity and the
+    borrowings are inserted with a single bulk_create. In all-or-nothing
+    mode any failed item rejects the whole basket, otherwise the valid
+    items are borrowed and the others are reported with their errors.
+    """
+    MAX_ITEMS = 20
 
+    items = BorrowingBulkItemSerializer(
+        many=True, allow_empty=False, max_length=MAX_ITEMS
+    )
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    def create(self, validated_data: dict) -> list[dict]:
+        items = validated_data["items"]
+        all_or_nothing = validated_data["all_or_nothing"]
+        errors = self.check_items(items)
+
+        if errors and all_or_nothing:
+            raise ValidationError({"items": self.format_errors(items, errors)})
+
+        requested = Counter(
+            item["book"]
+            for index, item in enumerate(items)
+            if index not in errors
+        )
+
+        with transaction.atomic():
+            unavailable = self.take_books(requested)
+            for index, item in enumerate(items):
+                if index not in errors and item["book"] in unavailable:
+                    errors[index] = {"book": [BOOK_NOT_AVAILABLE_ERROR]}
+
+            if errors and all_or_nothing:
+                raise ValidationError(
+                    {"items": self.format_errors(items, errors)}
+                )
+
+            user_id = self.context["request"].user.pk
+            borrowings = Borrowing.objects.bulk_create(
+                Borrowing(
+                    book_id=item["book"],
+                    user_id=user_id,
+                    expected_return_date=item["expected_return_date"]
+                )
+                for index, item in enumerate(items)
+                if index not in errors
+            )
+            for book_id in set(requested) - unavailable:
+                invalidate_book(book_id)
+            if borrowings:
+                record_activity(
+                    borrowings[0].borrow_date,
+                    borrows=Counter(
+                        borrowing.book_id for borrowing in borrowings
+                    )
+                )
+
+        created = iter(borrowings)
+        return [
+            {
+                "book": item["book"],
+                "status": "failed",
+                "errors": errors[index],
+            }
+            if index in errors
+            else {
+                "book": item["book"],
+                "status": "created",
+                "borrowing": BorrowingSerializer(next(created)).data,
+            }
+            for index, item in enumerate(items)
+        ]
+
+    @staticmethod
+    def check_items(items: list[dict]) -> dict[int, dict]:
+        """
+        Check every item against a single read of the requested books and
+        return the errors by item index.
+        """
+        books = Book.objects.in_bulk({item["book"] for item in items})
+        borrow_date = timezone.now().date()
+        allocated = Counter()
+        errors = {}
+
+        for index, item in enumerate(items):
+            book = books.get(item["book"])
+            if book is None:
+                errors[index] = {
+                    "book": [f"Invalid pk \"{item['book']}\" - "
+                             "object does not exist."]
+                }
+                continue
+
+            try:
+                Borrowing.validate_borrowing_dates(
+                    borrow_date=borrow_date,
+                    expected_return_date=item["expected_return_date"],
+                    actual_return_date=None,
+                    error_to_raise=ValidationError
+                )
+            except ValidationError as error:
+                errors[index] = error.detail
+                continue
+
+            if allocated[book.pk] >= book.inventory:
+                errors[index] = {"book": [BOOK_NOT_AVAILABLE_ERROR]}
+                continue
+            allocated[book.pk] += 1
+
+        return errors
+
+    @staticmethod
+    def take_books(requested: Counter) -> set[int]:
+        """
+        Decrement the inventory of the requested books and return the ids
+        of the books that no longer have enough copies.
+
+        Books borrowed in the same quantity share one UPDATE. Only when a
+        concurrent borrow made that UPDATE miss some of them, it is undone
+        and retried book by book to find out which ones.
+        """
+        unavailable = set()
+        for quantity, book_ids in group_by_quantity(requested).items():
+            if len(book_ids) > 1:
+                savepoint = transaction.savepoint()
+                taken = Book.objects.filter(
+                    pk__in=book_ids
+                ).decrement_inventory(quantity)
+
+                if taken == len(book_ids):
+                    transaction.savepoint_commit(savepoint)
+                    continue
+                transaction.savepoint_rollback(savepoint)
+
+            for book_id in book_ids:
+                if not Book.objects.filter(
+                    pk=book_id
+                ).decrement_inventory(quantity):
+                    unavailable.add(book_id)
+
+        return unavailable
+
+    @staticmethod
+    def format_errors(items: list[dict], errors: dict[int, dict]) -> list:
+        return [errors.get(index, {}) for index in range(len(items))]
+
+
+class BorrowingBulkReturnSerializer(serializers.Serializer):
+    """
+    Return many borrowings at once.
+
+    The borrowings that are still out are marked as returned with a
+    single UPDATE and every book gets its copies back with one increment,
+    books returned in the same quantity sharing one UPDATE. Ids that are
+    already returned or don't exist are reported without failing the
+    batch.
+    """
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_IDS
+    )
+
+    def create(self, validated_data: dict) -> dict:
+        ids = list(dict.fromkeys(validated_data["ids"]))
+        now = timezone.now()
+
+        with transaction.atomic():
+            rows = {
+                borrowing_id: (book_id, actual_return_date)
+                for borrowing_id, book_id, actual_return_date in (
+                    Borrowing.objects.select_for_update()
+                    .filter(pk__in=ids)
+                    .values_list("id", "book_id", "actual_return_date")
+                )
+            }
+            to_return = [
+                borrowing_id
+                for borrowing_id, (_, actual_return_date) in rows.items()
+                if actual_return_date is None
+            ]
+
+            Borrowing.objects.filter(pk__in=to_return).update(
+                actual_return_date=now.date(),
+                updated_at=now
+            )
+
+            returned_copies = Counter(
+                rows[borrowing_id][0] for borrowing_id in to_return
+            )
+            for quantity, book_ids in group_by_quantity(
+                returned_copies
+            ).items():
+                Book.objects.filter(
+                    pk__in=book_ids
+                ).increment_inventory(quantity)
+
+            for book_id in returned_copies:
+                invalidate_book(book_id)
+            record_activity(now.date(), returns=returned_copies)
+
+        return {
+            "returned": to_return,
+            "already_returned": [
+                {
+                    "id": borrowing_id,
+                    "actual_return_date": actual_return_date,
+                }
+                for borrowing_id, (_, actual_return_date) in rows.items()
+                if actual_return_date is not None
+            ],
+            "not_found": [
+                borrowing_id for borrowing_id in ids
+                if borrowing_id not in rows
+            ],
+        }
 
-class BorrowingListSerializer(serializers.ModelSerializer):
+
+class BorrowingExportFilterSerializer(serializers.Serializer):
+    borrowed_from = serializers.DateField(required=False)
+    borrowed_to = serializers.DateField(required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        borrowed_from = attrs.get("borrowed_from")
+        borrowed_to = attrs.get("borrowed_to")
+
+        if borrowed_from and borrowed_to and borrowed_to < borrowed_from:
+            raise serializers.ValidationError(
+                {"borrowed_to": "Must not be before borrowed_from."}
+            )
+
+        return attrs
+
+
+class BorrowingBillingPeriodSerializer(serializers.Serializer):
+    period_start = serializers.DateField(required=False)
+    period_end = serializers.DateField(required=False)
+
+    def validate(self, attrs: dict) -> dict:
+        today = timezone.now().date()
+        attrs.setdefault("period_start", today.replace(day=1))
+        attrs.setdefault("period_end", today)
+
+        if attrs["period_end"] < attrs["period_start"]:
+            raise serializers.ValidationError(
+                {"period_end": "Must not be before period_start."}
+            )
+
+        return attrs
+
+
+class BorrowingAnalyticsFilterSerializer(serializers.Serializer):
+    MAX_RANGE_DAYS = 366
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1, max_value=100, default=10
+    )
+
+    def validate(self, attrs: dict) -> dict:
+        attrs.setdefault("date_to", timezone.now().date())
+        attrs.setdefault(
+            "date_from", attrs["date_to"] - timedelta(days=29)
+        )
+
+        span = attrs["date_to"] - attrs["date_from"]
+        if span.days < 0:
+            raise serializers.ValidationError(
+                {"date_to": "Must not be before date_from."}
+            )
+        if span.days >= self.MAX_RANGE_DAYS:
+            raise serializers.ValidationError(
+                {
+                    "date_to": f"The range can't span more than "
+                               f"{self.MAX_RANGE_DAYS} days."
+                }
+            )
+
+        return attrs
+
+
+class BorrowingListSerializer(
+    FieldsetSerializerMixin, serializers.ModelSerializer
+):
     book = serializers.SlugRelatedField(
         many=False,
         read_only=True,
@@ -61,34 +383,56 @@ class BorrowingListSerializer(serializers.ModelSerializer):
             "id", "borrow_date", "expected_return_date",
             "actual_return_date", "book", "user"
         )
+        expandable_fields = {"book": BookSerializer, "user": UserSerializer}
+
+
+class BorrowingOverdueSerializer(BorrowingListSerializer):
+    days_overdue = serializers.IntegerField(read_only=True)
+
+    class Meta(BorrowingListSerializer.Meta):
+        fields = BorrowingListSerializer.Meta.fields + ("days_overdue",)
 
 
 class BorrowingRetrieveSerializer(BorrowingListSerializer):
     book = BookSerializer(read_only=True, many=False)
+    fee = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+
+    class Meta(BorrowingListSerializer.Meta):
+        fields = BorrowingListSerializer.Meta.fields + ("fee",)
 
 
 class BorrowingReturnSerializer(BorrowingListSerializer):
+    fee = serializers.DecimalField(
+        max_digits=12, decimal_places=2, read_only=True
+    )
+
     class Meta:
         model = Borrowing
         fields = (
             "id", "book", "borrow_date",
-            "expected_return_date", "actual_return_date",
+            "expected_return_date", "actual_return_date", "fee",
         )
         read_only_fields = (
             "id", "book", "borrow_date", "expected_return_date",
             "actual_return_date"
         )
 
+    @staticmethod
+    def already_returned_error(borrowing: Borrowing) -> ValidationError:
+        return ValidationError(
+            {
+                "error": f"The book {borrowing.book.title} has already been "
+                         f"returned on {borrowing.actual_return_date}."
+            },
+        )
+
     def validate(self, attrs: dict) -> dict:
         borrowing = self.instance
 
         if borrowing.actual_return_date is not None:
-            raise ValidationError(
-                {
-                    "error": f"The book {borrowing.book.title} has already been "
-                             f"returned on {borrowing.actual_return_date}."
-                },
-            )
+            raise self.already_returned_error(borrowing)
 
         Borrowing.validate_borrowing_dates(
             borrow_date=borrowing.borrow_date,
@@ -100,12 +444,38 @@ class BorrowingReturnSerializer(BorrowingListSerializer):
         return attrs
 
     def update(self, instance: Borrowing, validated_data: dict) -> Borrowing:
-        instance.actual_return_date = validated_data.get(
-            "actual_return_date",
-            timezone.now().date()
+        """
+        Mark the borrowing returned and put its copy back.
+
+        ``validate`` only saw the borrowing as it was loaded: the return is
+        a conditional UPDATE on it still being out, so of two concurrent
+        returns only one restores a copy, and the copy is added in the
+        database rather than written back from the loaded book.
+        """
+        now = timezone.now()
+        actual_return_date = validated_data.get(
+            "actual_return_date", now.date()
         )
-        instance.book.inventory += 1
-        instance.book.save(update_fields=["inventory"])
-        instance.save(update_fields=["actual_return_date"])
 
+        # No savepoint: the view already runs in a transaction.
+        with transaction.atomic(savepoint=False):
+            returned = Borrowing.objects.filter(
+                pk=instance.pk, actual_return_date__isnull=True
+            ).update(actual_return_date=actual_return_date, updated_at=now)
+            if returned:
+                Book.objects.filter(
+                    pk=instance.book_id
+                ).increment_inventory()
+                invalidate_book(instance.book_id)
+                record_activity(
+                    actual_return_date,
+                    returns=Counter({instance.book_id: 1})
+                )
+
+        if not returned:
+            instance.refresh_from_db(fields=("actual_return_date",))
+            raise self.already_returned_error(instance)
+
+        instance.actual_return_date = actual_return_date
+        instance.updated_at = now
         return instance
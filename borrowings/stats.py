@@ -0,0 +1,290 @@
+"""
+Daily borrowing rollup behind the staff analytics.
+
+Every borrow and return adds to the ``BorrowingDailyStat`` row of its
+book and day with one upsert statement, so the analytics only ever read
+the rollup rows of the requested date range instead of grouping the
+whole borrowing history. ``rebuild_daily_stats`` recomputes the rollup
+from the borrowings, for backfills and for data written around the
+borrow and return code paths.
+"""
+import heapq
+from collections import Counter
+from datetime import date, timedelta
+from itertools import groupby
+from typing import Iterable, Iterator
+
+from django.db import connections, router, transaction
+from django.db.models import (
+    Count,
+    F,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Window
+)
+from django.db.models.functions import Coalesce
+
+from borrowings.models import Borrowing, BorrowingDailyStat
+
+# Vendors supporting INSERT ... ON CONFLICT DO UPDATE. On the others the
+# rollup is only maintained by rebuild_daily_stats.
+UPSERT_VENDORS = ("sqlite", "postgresql")
+
+
+def _upsert_sql(connection) -> str:
+    table = connection.ops.quote_name(BorrowingDailyStat._meta.db_table)
+    book, day, borrows, returns, active = (
+        connection.ops.quote_name(
+            BorrowingDailyStat._meta.get_field(name).column
+        )
+        for name in ("book", "date", "borrows", "returns", "active")
+    )
+    # A new row starts from the active count of the book's previous row.
+    return (
+        f"INSERT INTO {table} ({book}, {day}, {borrows}, {returns}, "
+        f"{active}) VALUES (%s, %s, %s, %s, COALESCE(("
+        f"SELECT previous.{active} FROM {table} previous "
+        f"WHERE previous.{book} = %s AND previous.{day} < %s "
+        f"ORDER BY previous.{day} DESC LIMIT 1), 0) + %s) "
+        f"ON CONFLICT ({book}, {day}) DO UPDATE SET "
+        f"{borrows} = {table}.{borrows} + excluded.{borrows}, "
+        f"{returns} = {table}.{returns} + excluded.{returns}, "
+        f"{active} = {table}.{active} + excluded.{borrows} "
+        f"- excluded.{returns}"
+    )
+
+
+def record_activity(
+    day: date,
+    borrows: Counter | None = None,
+    returns: Counter | None = None
+) -> None:
+    """
+    Add the borrows and returns of ``day``, counted by book id, to the
+    rollup with one statement.
+    """
+    borrows = borrows or Counter()
+    returns = returns or Counter()
+    connection = connections[router.db_for_write(BorrowingDailyStat)]
+    if connection.vendor not in UPSERT_VENDORS or not (borrows or returns):
+        return
+
+    day = connection.ops.adapt_datefield_value(day)
+    rows = [
+        (
+            book_id,
+            day,
+            borrows[book_id],
+            returns[book_id],
+            book_id,
+            day,
+            borrows[book_id] - returns[book_id],
+        )
+        # Sorted so concurrent upserts lock the rows in the same order.
+        for book_id in sorted(borrows.keys() | returns.keys())
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(_upsert_sql(connection), rows)
+
+
+def _activity(since: date) -> Iterator[tuple[int, date, int, int]]:
+    """
+    ``(book_id, date, borrows, returns)`` from ``since`` on, ordered by
+    book and date, merged from one grouped query per kind of event.
+    """
+    borrows = Borrowing.objects.filter(borrow_date__gte=since).values_list(
+        "book_id", "borrow_date"
+    ).annotate(count=Count("id")).order_by("book_id", "borrow_date")
+    returns = Borrowing.objects.filter(
+        actual_return_date__gte=since
+    ).values_list(
+        "book_id", "actual_return_date"
+    ).annotate(count=Count("id")).order_by("book_id", "actual_return_date")
+
+    events = heapq.merge(
+        ((book, day, count, 0) for book, day, count in borrows.iterator()),
+        ((book, day, 0, count) for book, day, count in returns.iterator()),
+    )
+    for (book_id, day), group in groupby(
+        events, key=lambda event: event[:2]
+    ):
+        group = list(group)
+        yield (
+            book_id,
+            day,
+            sum(event[2] for event in group),
+            sum(event[3] for event in group),
+        )
+
+
+def rebuild_daily_stats(
+    since: date | None = None, batch_size: int = 5_000
+) -> int:
+    """
+    Recompute the rollup from ``since`` (the whole history by default)
+    and return the number of rows written.
+    """
+    if since is None:
+        first = Borrowing.objects.order_by("borrow_date").values_list(
+            "borrow_date", flat=True
+        ).first()
+        if first is None:
+            BorrowingDailyStat.objects.all().delete()
+            return 0
+        since = first
+
+    with transaction.atomic():
+        BorrowingDailyStat.objects.filter(date__gte=since).delete()
+
+        # Borrowings still out at the end of the day before ``since``.
+        active = dict(
+            Borrowing.objects.filter(borrow_date__lt=since).filter(
+                Q(actual_return_date__isnull=True)
+                | Q(actual_return_date__gte=since)
+            ).values_list("book_id").annotate(count=Count("id")).order_by()
+        )
+
+        written = 0
+        batch = []
+        for book_id, day, borrows, returns in _activity(since):
+            active[book_id] = active.get(book_id, 0) + borrows - returns
+            batch.append(
+                BorrowingDailyStat(
+                    book_id=book_id,
+                    date=day,
+                    borrows=borrows,
+                    returns=returns,
+                    active=active[book_id]
+                )
+            )
+            if len(batch) == batch_size:
+                written += len(BorrowingDailyStat.objects.bulk_create(batch))
+                batch = []
+        written += len(BorrowingDailyStat.objects.bulk_create(batch))
+
+    return written
+
+
+def _days(date_from: date, date_to: date) -> Iterable[date]:
+    for offset in range((date_to - date_from).days + 1):
+        yield date_from + timedelta(days=offset)
+
+
+def most_borrowed(date_from: date, date_to: date, limit: int) -> list[dict]:
+    return list(
+        BorrowingDailyStat.objects.filter(
+            date__range=(date_from, date_to)
+        ).values(
+            "book_id", "book__title", "book__author"
+        ).annotate(
+            borrows=Sum("borrows"), returns=Sum("returns")
+        ).order_by("-borrows", "book_id")[:limit]
+    )
+
+
+def daily_activity(date_from: date, date_to: date) -> list[dict]:
+    """
+    Borrows, returns and loans out at the end of every day of the range.
+
+    The loans out start from the sum of every book's ``active`` count in
+    its last rollup row before the range, found with one window over the
+    rollup rows before ``date_from``, and move with the net borrows of
+    each day. Only the rollup is read, never the catalog.
+    """
+    active = BorrowingDailyStat.objects.filter(date__lt=date_from).annotate(
+        last_date=Window(Max("date"), partition_by=F("book_id"))
+    ).filter(date=F("last_date")).aggregate(
+        active=Coalesce(Sum("active"), 0)
+    )["active"]
+
+    per_day = {
+        day: (borrows, returns)
+        for day, borrows, returns in BorrowingDailyStat.objects.filter(
+            date__range=(date_from, date_to)
+        ).values_list("date").annotate(
+            borrows=Sum("borrows"), returns=Sum("returns")
+        ).order_by()
+    }
+
+    series = []
+    for day in _days(date_from, date_to):
+        borrows, returns = per_day.get(day, (0, 0))
+        active += borrows - returns
+        series.append(
+            {
+                "date": day,
+                "borrows": borrows,
+                "returns": returns,
+                "active": active,
+            }
+        )
+    return series
+
+
+def utilization(date_from: date, date_to: date, limit: int) -> list[dict]:
+    """
+    Share of each title's copies that were out over the range, for the
+    titles borrowed or returned in it, highest first.
+
+    Loan-days are summed from the rollup rows of the range, each row's
+    active count carrying over to the next one, starting from the book's
+    last row before the range. Copies are what is on the shelf plus the
+    book's loans out according to its latest row.
+    """
+    previous = BorrowingDailyStat.objects.filter(
+        book_id=OuterRef("book_id"), date__lt=date_from
+    ).order_by("-date").values("active")[:1]
+    latest = BorrowingDailyStat.objects.filter(
+        book_id=OuterRef("book_id")
+    ).order_by("-date").values("active")[:1]
+
+    books = {
+        row["book_id"]: row
+        for row in BorrowingDailyStat.objects.filter(
+            date__range=(date_from, date_to)
+        ).values(
+            "book_id", "book__title", "book__author", "book__inventory"
+        ).annotate(
+            borrows=Sum("borrows"),
+            returns=Sum("returns"),
+            previous_active=Subquery(previous),
+            latest_active=Subquery(latest)
+        ).order_by()
+    }
+    rows = BorrowingDailyStat.objects.filter(
+        date__range=(date_from, date_to)
+    ).values_list("book_id", "date", "active").order_by("book_id", "date")
+
+    days = (date_to - date_from).days + 1
+    results = []
+    for book_id, book_rows in groupby(rows.iterator(), key=lambda r: r[0]):
+        book = books[book_id]
+        active = book["previous_active"] or 0
+        loan_days = 0
+        day = date_from
+        for _, row_date, row_active in book_rows:
+            loan_days += active * (row_date - day).days
+            active, day = row_active, row_date
+        loan_days += active * ((date_to - day).days + 1)
+
+        copies = book["book__inventory"] + max(book["latest_active"], 0)
+        results.append(
+            {
+                "book": book_id,
+                "title": book["book__title"],
+                "author": book["book__author"],
+                "copies": copies,
+                "borrows": book["borrows"],
+                "returns": book["returns"],
+                "loan_days": loan_days,
+                "utilization": round(
+                    loan_days / (copies * days), 4
+                ) if copies else 0.0,
+            }
+        )
+
+    results.sort(key=lambda row: (-row["utilization"], row["book"]))
+    return results[:limit]
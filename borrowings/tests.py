@@ -1,12 +1,36 @@
 import datetime
+import json
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F, Q
+from django.http import HttpResponse
+from django.test import AsyncClient
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import http_date
 from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
-from rest_framework.test import APITestCase, APIClient
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase, APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from books.models import Book
-from borrowings.models import Borrowing
+from borrowings.models import (
+    Borrowing,
+    BorrowingDailyStat,
+    OverdueNotice,
+    OverdueScan
+)
+from borrowings.serializers import (
+    BorrowingReturnSerializer,
+    BorrowingSerializer
+)
 
 
 class BorrowingViewSetTests(APITestCase):
@@ -97,6 +121,28 @@ class BorrowingViewSetTests(APITestCase):
         self.assertIn("book", response.data)
         self.assertEqual(Borrowing.objects.count(), 2)
 
+    def test_create_borrowing_stale_inventory(self):
+        """Test borrowing is rejected when the last copy was taken meanwhile"""
+        request = APIRequestFactory().post("/")
+        request.user = self.user
+        serializer = BorrowingSerializer(context={"request": request})
+
+        stale_book = Book.objects.get(pk=self.book1.pk)
+        Book.objects.filter(pk=self.book1.pk).update(inventory=0)
+
+        with self.assertRaises(ValidationError) as error:
+            serializer.create(
+                {
+                    "book": stale_book,
+                    "expected_return_date": timezone.now().date(),
+                }
+            )
+
+        self.assertIn("book", error.exception.detail)
+        self.assertEqual(Borrowing.objects.count(), 2)
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 0)
+
     def test_borrowing_return_success(self):
         """Test successful return of a borrowed book"""
         self.client.force_authenticate(user=self.user)
@@ -128,6 +174,51 @@ class BorrowingViewSetTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("error", response.data)
 
+    def test_borrowing_return_adds_copy_in_database(self):
+        """Test a return doesn't write back the inventory it loaded"""
+        self.client.force_authenticate(user=self.user)
+        validate = BorrowingReturnSerializer.validate
+
+        def validate_then_borrow(serializer, attrs):
+            attrs = validate(serializer, attrs)
+            # Another patron borrows the book after it was loaded.
+            Book.objects.filter(pk=self.book1.pk).decrement_inventory()
+            return attrs
+
+        with patch.object(
+            BorrowingReturnSerializer, "validate", validate_then_borrow
+        ):
+            response = self.client.post(
+                reverse(
+                    "borrowings:borrowings-borrowing-return",
+                    kwargs={"pk": self.borrowing.id}
+                )
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 4)
+
+    def test_concurrent_returns_restore_one_copy(self):
+        """Test two returns validated together put back a single copy"""
+        first, second = (
+            BorrowingReturnSerializer(
+                Borrowing.objects.get(pk=self.borrowing.pk),
+                data={},
+                partial=True
+            )
+            for _ in range(2)
+        )
+        self.assertTrue(first.is_valid())
+        self.assertTrue(second.is_valid())
+
+        first.save()
+        with self.assertRaises(ValidationError):
+            second.save()
+
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 5)
+
     def test_filter_by_is_active_true(self):
         """Test filtering borrowings by is_active=true"""
         self.client.force_authenticate(user=self.user)
@@ -136,8 +227,8 @@ class BorrowingViewSetTests(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.borrowing.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], self.borrowing.id)
 
     def test_filter_by_is_active_false(self):
         """Test filtering borrowings by is_active=false"""
@@ -147,21 +238,26 @@ class BorrowingViewSetTests(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], self.returned_borrowing.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            response.data["results"][0]["id"], self.returned_borrowing.id
+        )
 
     def test_filter_by_user_id_as_staff(self):
         """Test staff user can filter borrowings by user_id"""
         self.client.force_authenticate(user=self.staff_user)
 
-        url = reverse("borrowings:borrowings-list") + f"?user_id={self.user.id}"
+        url = (
+            reverse("borrowings:borrowings-list")
+            + f"?user_id={self.user.id}"
+        )
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_filter_by_user_id_as_non_staff(self):
-        """Test non-staff user can only see their own borrowings regardless of filter"""
+        """Test non-staff users see only their own borrowings, any user_id"""
         self.client.force_authenticate(user=self.another_user)
 
         tomorrow = timezone.now().date() + datetime.timedelta(days=1)
@@ -171,9 +267,868 @@ class BorrowingViewSetTests(APITestCase):
             expected_return_date=tomorrow
         )
 
-        url = reverse("borrowings:borrowings-list") + f"?user_id={self.user.id}"
+        url = (
+            reverse("borrowings:borrowings-list")
+            + f"?user_id={self.user.id}"
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            response.data["results"][0]["id"], another_borrowing.id
+        )
+
+    def test_list_is_cursor_paginated(self):
+        """Test borrowings list is split into cursor pages, newest first"""
+        self.client.force_authenticate(user=self.staff_user)
+
+        tomorrow = timezone.now().date() + datetime.timedelta(days=1)
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                book=self.book1,
+                user=self.another_user,
+                expected_return_date=tomorrow
+            )
+            for _ in range(3)
+        )
+
+        url = reverse("borrowings:borrowings-list") + "?page_size=2"
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_page = [row["id"] for row in response.data["results"]]
+        self.assertEqual(len(first_page), 2)
+        self.assertIsNone(response.data["previous"])
+
+        seen = list(first_page)
+        next_url = response.data["next"]
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(row["id"] for row in response.data["results"])
+            next_url = response.data["next"]
+
+        self.assertEqual(
+            seen,
+            list(
+                Borrowing.objects.order_by("-id").values_list("id", flat=True)
+            )
+        )
+
+    def test_list_conditional_get(self):
+        """Test an unchanged list is answered with 304 until a return"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-list") + "?is_active=true"
+        etag = self.client.get(url).headers["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(
+            reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": self.borrowing.id}
+            )
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    def test_list_ignores_if_modified_since(self):
+        """Test a row leaving the list isn't hidden by If-Modified-Since"""
+        self.client.force_authenticate(user=self.user)
+        Borrowing.objects.create(
+            book=self.book1,
+            user=self.user,
+            expected_return_date=self.borrowing.expected_return_date
+        )
+
+        url = reverse("borrowings:borrowings-list") + "?is_active=true"
         response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response.headers)
+        self.assertEqual(len(response.data["results"]), 2)
+
+        self.client.post(
+            reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": self.borrowing.id}
+            )
+        )
 
+        response = self.client.get(
+            url,
+            HTTP_IF_MODIFIED_SINCE=http_date(
+                (timezone.now() + datetime.timedelta(days=1)).timestamp()
+            )
+        )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], another_borrowing.id)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_bulk_create_borrows_available_books(self):
+        """Test a basket borrows what is available and reports the rest"""
+        self.client.force_authenticate(user=self.user)
+
+        expected_return_date = timezone.now().date() + datetime.timedelta(
+            days=7
+        )
+        url = reverse("borrowings:borrowings-borrowing-bulk-create")
+        data = {
+            "items": [
+                {"book": self.book1.id, "expected_return_date": date}
+                for date in (expected_return_date,) * 2
+            ] + [
+                {
+                    "book": self.book2.id,
+                    "expected_return_date": expected_return_date
+                },
+            ]
+        }
+
+        with self.assertNumQueries(6):
+            response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["created", "created", "failed"]
+        )
+        self.assertIn("book", response.data["results"][2]["errors"])
+        self.assertEqual(Borrowing.objects.count(), 4)
+
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 2)
+
+    def test_bulk_create_all_or_nothing(self):
+        """Test a failed item rejects the whole basket in atomic mode"""
+        self.client.force_authenticate(user=self.user)
+
+        expected_return_date = timezone.now().date() + datetime.timedelta(
+            days=7
+        )
+        url = reverse("borrowings:borrowings-borrowing-bulk-create")
+        data = {
+            "all_or_nothing": True,
+            "items": [
+                {
+                    "book": book.id,
+                    "expected_return_date": expected_return_date
+                }
+                for book in (self.book1, self.book2)
+            ],
+        }
+
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["items"][0], {})
+        self.assertIn("book", response.data["items"][1])
+        self.assertEqual(Borrowing.objects.count(), 2)
+
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 4)
+
+    def test_bulk_return(self):
+        """Test staff return many borrowings with grouped book updates"""
+        self.client.force_authenticate(user=self.staff_user)
+
+        tomorrow = timezone.now().date() + datetime.timedelta(days=1)
+        second = Borrowing.objects.create(
+            book=self.book1,
+            user=self.another_user,
+            expected_return_date=tomorrow
+        )
+        Book.objects.filter(pk=self.book1.pk).decrement_inventory()
+
+        url = reverse("borrowings:borrowings-borrowing-bulk-return")
+        data = {
+            "ids": [
+                self.borrowing.id,
+                second.id,
+                self.returned_borrowing.id,
+                9999,
+            ]
+        }
+
+        response = self.client.post(url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            response.data["returned"], [self.borrowing.id, second.id]
+        )
+        self.assertEqual(
+            [row["id"] for row in response.data["already_returned"]],
+            [self.returned_borrowing.id]
+        )
+        self.assertEqual(response.data["not_found"], [9999])
+
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.inventory, 5)
+        self.assertFalse(
+            Borrowing.objects.filter(actual_return_date__isnull=True).exists()
+        )
+
+    def test_bulk_return_staff_only(self):
+        """Test regular users can't use bulk return"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-borrowing-bulk-return")
+        response = self.client.post(
+            url, {"ids": [self.borrowing.id]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_streams_filtered_rows(self):
+        """Test staff can stream borrowings as CSV and NDJSON"""
+        self.client.force_authenticate(user=self.staff_user)
+
+        url = reverse("borrowings:borrowings-borrowing-export")
+        response = self.client.get(url, {"is_active": "true"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0],
+            "id,borrow_date,expected_return_date,actual_return_date,book,user"
+        )
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith(f"{self.borrowing.id},"))
+        self.assertTrue(lines[1].endswith(",Test Book 1,user@test.com"))
+
+        response = self.client.get(
+            url,
+            {
+                "format": "ndjson",
+                "borrowed_from": timezone.now().date().isoformat(),
+            }
+        )
+
+        self.assertEqual(response["Content-Type"], (
+            "application/x-ndjson; charset=utf-8"
+        ))
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [row["id"] for row in rows],
+            [self.borrowing.id, self.returned_borrowing.id]
+        )
+
+    def test_export_streams_under_asgi(self):
+        """Test the export hands an async iterator to ASGI servers"""
+        token = RefreshToken.for_user(self.staff_user).access_token
+
+        async def export() -> tuple[HttpResponse, bytes]:
+            response = await AsyncClient().get(
+                reverse("borrowings:borrowings-borrowing-export"),
+                {"format": "ndjson"},
+                headers={"Authorize": f"Bearer {token}"}
+            )
+            content = b"".join(
+                [chunk async for chunk in response.streaming_content]
+            )
+            return response, content
+
+        response, content = async_to_sync(export)()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.is_async)
+        self.assertEqual(
+            [json.loads(line)["id"] for line in content.splitlines()],
+            [self.borrowing.id, self.returned_borrowing.id]
+        )
+
+    def test_export_rejects_invalid_date_range(self):
+        """Test an inverted date range is rejected"""
+        self.client.force_authenticate(user=self.staff_user)
+
+        url = reverse("borrowings:borrowings-borrowing-export")
+        response = self.client.get(
+            url,
+            {"borrowed_from": "2025-02-01", "borrowed_to": "2025-01-01"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sparse_fields(self):
+        """Test ?fields= keeps the named fields and skips the joins"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": "id,borrow_date"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [set(row) for row in response.data["results"]],
+            [{"id", "borrow_date"}] * 2
+        )
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("JOIN", sql)
+        self.assertNotIn("user_id\" FROM", sql)
+
+    def test_list_expand(self):
+        """Test ?expand= embeds the book and the user in one query"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-list")
+        response = self.client.get(url, {"expand": "book,user"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data["results"][0]
+        self.assertEqual(row["book"]["title"], "Test Book 1")
+        self.assertEqual(row["book"]["daily_fee"], "10.00")
+        self.assertEqual(row["user"]["email"], "user@test.com")
+        self.assertNotIn("password", row["user"])
+
+    def test_retrieve_fields_and_expand(self):
+        """Test ?fields= and ?expand= on the borrowing detail"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse(
+            "borrowings:borrowings-detail", kwargs={"pk": self.borrowing.id}
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, {"fields": "id,user,fee", "expand": "user"}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "id": self.borrowing.id,
+                "user": {
+                    "id": self.user.id,
+                    "email": "user@test.com",
+                    "first_name": "",
+                    "last_name": "",
+                    "is_staff": False,
+                },
+                "fee": "0.00",
+            }
+        )
+
+    def test_unknown_fields_rejected(self):
+        """Test unknown field and expansion names are a 400"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-list")
+        response = self.client.get(
+            url, {"fields": "id,password", "expand": "borrow_date"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("fields", response.data)
+        self.assertIn("expand", response.data)
+
+    def test_sparse_fields_conditional_get(self):
+        """Test a fieldset without the book ignores changes to the book"""
+        self.client.force_authenticate(user=self.user)
+
+        url = reverse("borrowings:borrowings-list")
+        etag = self.client.get(url, {"fields": "id"}).headers["ETag"]
+        full_etag = self.client.get(url).headers["ETag"]
+
+        self.book1.title = "Renamed"
+        self.book1.save()
+
+        response = self.client.get(
+            url, {"fields": "id"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=full_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class GenerateDatasetTests(APITestCase):
+    def generate(self, prefix: str) -> list[tuple]:
+        call_command(
+            "generate_dataset",
+            users=30,
+            books=20,
+            borrowings=500,
+            active_ratio=0.2,
+            chunk_size=64,
+            prefix=prefix,
+            stdout=StringIO()
+        )
+        rows = Borrowing.objects.filter(
+            user__email__startswith=f"{prefix}-"
+        ).order_by("id").values_list(
+            "book__title",
+            "user__email",
+            "borrow_date",
+            "expected_return_date",
+            "actual_return_date"
+        )
+        # Compare by generated index, the prefix is part of the names.
+        return [
+            (title.rsplit(" ", 1)[1], email.split("-")[1], *dates)
+            for title, email, *dates in rows
+        ]
+
+    def test_generate_dataset_is_deterministic(self):
+        """Test the same seed generates the same borrowings"""
+        first = self.generate("first")
+
+        self.assertEqual(len(first), 500)
+        self.assertEqual(first, self.generate("second"))
+
+    def test_generate_dataset_keeps_inventory_consistent(self):
+        """Test active borrowings hold copies and dates are plausible"""
+        self.generate("synthetic")
+        today = timezone.now().date()
+
+        books = Book.objects.annotate(
+            active=Count(
+                "borrowings",
+                filter=Q(borrowings__actual_return_date__isnull=True)
+            )
+        )
+        self.assertTrue(books.filter(active__gt=0).exists())
+        for book in books:
+            self.assertGreaterEqual(book.inventory, 0)
+            self.assertTrue(1 <= book.inventory + book.active <= 10)
+
+        borrowings = Borrowing.objects.all()
+        self.assertFalse(borrowings.filter(borrow_date__gt=today).exists())
+        self.assertFalse(
+            borrowings.filter(
+                actual_return_date__lt=F("borrow_date")
+            ).exists()
+        )
+        self.assertFalse(
+            borrowings.filter(
+                expected_return_date__lt=F("borrow_date")
+            ).exists()
+        )
+
+
+class OverdueBorrowingTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            inventory=10,
+            daily_fee=1.00
+        )
+        self.today = timezone.now().date()
+
+        self.overdue = [
+            self.borrow(self.user, days_overdue=days)
+            for days in (3, 10, 10, 1)
+        ]
+        self.borrow(self.user, days_overdue=-2)
+        self.borrow(self.staff_user, days_overdue=5)
+        returned = self.borrow(self.user, days_overdue=20)
+        returned.actual_return_date = self.today
+        returned.save()
+
+        self.url = reverse("borrowings:borrowings-borrowing-overdue")
+
+    def borrow(self, user, days_overdue: int) -> Borrowing:
+        return Borrowing.objects.create(
+            book=self.book,
+            user=user,
+            expected_return_date=(
+                self.today - datetime.timedelta(days=days_overdue)
+            )
+        )
+
+    def test_overdue_lists_longest_overdue_first(self):
+        """Test users see their overdue borrowings with days overdue"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row["id"], row["days_overdue"])
+                for row in response.data["results"]
+            ],
+            [
+                (self.overdue[1].id, 10),
+                (self.overdue[2].id, 10),
+                (self.overdue[0].id, 3),
+                (self.overdue[3].id, 1),
+            ]
+        )
+
+    def test_overdue_staff_sees_everyone(self):
+        """Test staff see every overdue borrowing across pages"""
+        self.client.force_authenticate(user=self.staff_user)
+
+        response = self.client.get(self.url, {"page_size": 3})
+        ids = [row["id"] for row in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        ids += [row["id"] for row in response.data["results"]]
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+
+    def test_overdue_pages_through_same_day_by_keyset(self):
+        """Test pages seek past borrowings due the same day, both ways"""
+        self.client.force_authenticate(user=self.user)
+        expected = [self.overdue[index].id for index in (1, 2, 0, 3)]
+
+        ids, url = [], f"{self.url}?page_size=1"
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertNotIn("OFFSET", queries.captured_queries[-1]["sql"])
+            ids += [row["id"] for row in response.data["results"]]
+            last_page, url = response.data, response.data["next"]
+        self.assertEqual(ids, expected)
+
+        ids, url = [], last_page["previous"]
+        while url:
+            response = self.client.get(url)
+            ids = [row["id"] for row in response.data["results"]] + ids
+            url = response.data["previous"]
+        self.assertEqual(ids, expected[:-1])
+
+        response = self.client.get(self.url, {"cursor": "cD1ub3Bl"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_scan_overdue_resumes_from_cursor(self):
+        """Test the scanner records notices chunk by chunk and resumes"""
+        out = StringIO()
+        call_command(
+            "scan_overdue", chunk_size=2, max_chunks=1, stdout=out
+        )
+
+        scan = OverdueScan.objects.get(scan_date=self.today)
+        self.assertEqual(scan.processed, 2)
+        self.assertIsNone(scan.completed_at)
+        self.assertEqual(
+            scan.cursor_id, self.overdue[2].id
+        )
+
+        call_command("scan_overdue", chunk_size=2, stdout=out)
+
+        scan.refresh_from_db()
+        self.assertIsNotNone(scan.completed_at)
+        self.assertEqual(scan.processed, 5)
+        self.assertIn("Resuming the scan", out.getvalue())
+        self.assertEqual(
+            dict(
+                OverdueNotice.objects.filter(
+                    borrowing__user=self.user
+                ).values_list("borrowing_id", "days_overdue")
+            ),
+            {
+                self.overdue[0].id: 3,
+                self.overdue[1].id: 10,
+                self.overdue[2].id: 10,
+                self.overdue[3].id: 1,
+            }
+        )
+
+
+class BorrowingFeeTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.another_user = get_user_model().objects.create_user(
+            email="another@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            inventory=10,
+            daily_fee=1.25
+        )
+        self.today = timezone.now().date()
+
+        # Returned 4 days late, on time, and still out 3 days late.
+        self.late_return = self.borrow(self.user, due=-10, returned=-6)
+        self.on_time_return = self.borrow(self.user, due=-5, returned=-7)
+        self.overdue = self.borrow(self.user, due=-3)
+        self.borrow(self.another_user, due=-20, returned=-18)
+
+    def borrow(
+        self, user, due: int, returned: int | None = None
+    ) -> Borrowing:
+        borrowing = Borrowing.objects.create(
+            book=self.book,
+            user=user,
+            expected_return_date=self.today + datetime.timedelta(days=due),
+            actual_return_date=(
+                None if returned is None
+                else self.today + datetime.timedelta(days=returned)
+            )
+        )
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=self.today - datetime.timedelta(days=30)
+        )
+        return borrowing
+
+    def test_fee_annotation(self):
+        """Test fees are days late times the daily fee"""
+        fees = dict(
+            Borrowing.objects.filter(user=self.user).with_fees().values_list(
+                "id", "fee"
+            )
+        )
+
+        self.assertEqual(fees[self.late_return.id], Decimal("5.00"))
+        self.assertEqual(fees[self.on_time_return.id], Decimal("0.00"))
+        self.assertEqual(fees[self.overdue.id], Decimal("3.75"))
+
+    def test_fee_on_retrieve_and_return(self):
+        """Test retrieve and return report the borrowing's fee"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(
+            reverse(
+                "borrowings:borrowings-detail",
+                kwargs={"pk": self.late_return.id}
+            )
+        )
+        self.assertEqual(response.data["fee"], "5.00")
+
+        response = self.client.post(
+            reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": self.overdue.id}
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["fee"], "3.75")
+
+    def test_balance(self):
+        """Test users see their balance and staff any user's"""
+        url = reverse("borrowings:borrowings-borrowing-balance")
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(url, {"user_id": self.another_user.id})
+
+        self.assertEqual(
+            response.data,
+            {
+                "user": self.user.id,
+                "balance": "8.75",
+                "accruing": "3.75",
+                "late_borrowings": 2,
+            }
+        )
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(url, {"user_id": self.another_user.id})
+
+        self.assertEqual(response.data["balance"], "2.50")
+
+    def test_billing_summary(self):
+        """Test staff get late fees grouped by user for a period"""
+        url = reverse("borrowings:borrowings-borrowing-billing")
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(
+            self.client.get(url).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+        self.client.force_authenticate(user=self.staff_user)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url,
+                {
+                    "period_start": self.today - datetime.timedelta(days=30),
+                    "period_end": self.today,
+                }
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["late_returns"], 2)
+        self.assertEqual(response.data["total"], "7.50")
+        self.assertEqual(
+            [
+                (row["email"], row["days_late"], row["amount"])
+                for row in response.data["results"]
+            ],
+            [("user@test.com", 4, "5.00"), ("another@test.com", 2, "2.50")]
+        )
+
+
+class BorrowingAnalyticsTests(APITestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.book1 = Book.objects.create(
+            title="Test Book 1",
+            author="Test Author",
+            inventory=4,
+            daily_fee=1.00
+        )
+        self.book2 = Book.objects.create(
+            title="Test Book 2",
+            author="Test Author",
+            inventory=4,
+            daily_fee=1.00
+        )
+        self.today = timezone.now().date()
+
+    def borrow_via_api(self, book: Book) -> int:
+        response = self.client.post(
+            reverse("borrowings:borrowings-list"),
+            {
+                "book": book.id,
+                "expected_return_date": self.today + datetime.timedelta(
+                    days=7
+                ),
+            },
+            format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def backdate(self, book: Book, borrowed: int, returned: int | None):
+        """Create a borrowing ``borrowed`` days ago, returned or not."""
+        borrowing = Borrowing.objects.create(
+            book=book,
+            user=self.user,
+            expected_return_date=self.today
+        )
+        Borrowing.objects.filter(pk=borrowing.pk).update(
+            borrow_date=self.today - datetime.timedelta(days=borrowed),
+            actual_return_date=(
+                None if returned is None
+                else self.today - datetime.timedelta(days=returned)
+            )
+        )
+
+    def stat_rows(self) -> list[tuple]:
+        return list(
+            BorrowingDailyStat.objects.order_by("book_id", "date").values_list(
+                "book_id", "date", "borrows", "returns", "active"
+            )
+        )
+
+    def test_rollup_maintained_by_borrow_and_return(self):
+        """Test borrows and returns update the rollup like a rebuild"""
+        self.client.force_authenticate(user=self.user)
+        first = self.borrow_via_api(self.book1)
+        self.borrow_via_api(self.book1)
+        self.client.post(
+            reverse("borrowings:borrowings-borrowing-bulk-create"),
+            {
+                "items": [
+                    {
+                        "book": self.book2.id,
+                        "expected_return_date": (
+                            self.today + datetime.timedelta(days=7)
+                        ),
+                    },
+                ],
+            },
+            format="json"
+        )
+        self.client.post(
+            reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": first}
+            )
+        )
+
+        rows = self.stat_rows()
+        self.assertEqual(
+            rows,
+            [
+                (self.book1.id, self.today, 2, 1, 1),
+                (self.book2.id, self.today, 1, 0, 1),
+            ]
+        )
+
+        call_command("rebuild_borrowing_stats", stdout=StringIO())
+
+        self.assertEqual(self.stat_rows(), rows)
+
+    def test_analytics_served_from_rollup(self):
+        """Test the analytics endpoints over a rebuilt rollup"""
+        self.backdate(self.book1, borrowed=5, returned=2)
+        self.backdate(self.book1, borrowed=4, returned=None)
+        self.backdate(self.book2, borrowed=3, returned=3)
+        self.backdate(self.book1, borrowed=40, returned=None)
+        call_command("rebuild_borrowing_stats", stdout=StringIO())
+
+        self.client.force_authenticate(user=self.staff_user)
+        params = {
+            "date_from": self.today - datetime.timedelta(days=6),
+            "date_to": self.today - datetime.timedelta(days=1),
+        }
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("borrowings:analytics-most-borrowed"), params
+            )
+        self.assertEqual(
+            [
+                (row["book"], row["borrows"], row["returns"])
+                for row in response.data["results"]
+            ],
+            [(self.book1.id, 2, 1), (self.book2.id, 1, 1)]
+        )
+
+        # Out of the rollup until the next rebuild.
+        Borrowing.objects.create(
+            book=self.book2, user=self.user, expected_return_date=self.today
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("borrowings:analytics-active-loans"), params
+            )
+        self.assertEqual(len(queries), 2)
+        # The loans out before the range come from the rollup alone.
+        self.assertNotIn(Book._meta.db_table, queries[0]["sql"])
+        self.assertEqual(
+            [row["active"] for row in response.data["results"]],
+            [1, 2, 3, 3, 2, 2]
+        )
+
+        response = self.client.get(
+            reverse("borrowings:analytics-utilization"), params
+        )
+        book1, book2 = response.data["results"]
+        # Book 1 has 1, 2, 3, 3, 2 and 2 copies out of 4 + 2.
+        self.assertEqual(book1["book"], self.book1.id)
+        self.assertEqual(book1["loan_days"], 13)
+        self.assertEqual(book1["utilization"], round(13 / 36, 4))
+        self.assertEqual(book2["loan_days"], 0)
+
+    def test_analytics_staff_only(self):
+        """Test regular users can't read the analytics"""
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(
+            reverse("borrowings:analytics-most-borrowed")
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -1,14 +1,34 @@
 from django.urls import path, include
 from rest_framework import routers
 
-from borrowings.views import BorrowingViewSet
+from borrowings.views import (
+    AsyncBorrowingDetailView,
+    AsyncBorrowingListView,
+    BorrowingAnalyticsViewSet,
+    BorrowingViewSet
+)
+from library_service_api.async_views import async_routes
 
 router = routers.DefaultRouter()
 
 router.register("borrowings", BorrowingViewSet, basename="borrowings")
+router.register(
+    "analytics", BorrowingAnalyticsViewSet, basename="analytics"
+)
 
 urlpatterns = [
-    path("", include(router.urls)),
+    path(
+        "",
+        include(
+            async_routes(
+                router.urls,
+                {
+                    "borrowings-list": AsyncBorrowingListView,
+                    "borrowings-detail": AsyncBorrowingDetailView,
+                }
+            )
+        )
+    ),
 ]
 
 app_name = "borrowings"
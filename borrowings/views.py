@@ -1,47 +1,127 @@
+from datetime import date, datetime
+
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
-from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.db.models import Count, F, Q, QuerySet, Sum
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import viewsets, mixins, serializers, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from borrowings.export import STREAMERS, as_async
 from borrowings.models import Borrowing
+from borrowings.pagination import (
+    BorrowingCursorPagination,
+    BorrowingOverduePagination
+)
+from borrowings.renderers import CSVRenderer, NDJSONRenderer
+from borrowings import stats
 from borrowings.serializers import (
+    BorrowingAnalyticsFilterSerializer,
+    BorrowingBillingPeriodSerializer,
+    BorrowingBulkCreateSerializer,
+    BorrowingBulkReturnSerializer,
+    BorrowingExportFilterSerializer,
     BorrowingListSerializer,
+    BorrowingOverdueSerializer,
     BorrowingRetrieveSerializer,
     BorrowingSerializer,
     BorrowingReturnSerializer
 )
+from library_service_api.async_views import AsyncGenericAPIView
+from library_service_api.conditional import ConditionalGetMixin
+from library_service_api.fieldsets import FieldsetMixin
+from library_service_api.metrics import time_serialization
 
 
-class BorrowingViewSet(
-    mixins.ListModelMixin,
-    mixins.RetrieveModelMixin,
-    mixins.CreateModelMixin,
-    viewsets.GenericViewSet
-):
+class BorrowingQuerysetMixin:
     """
-    ViewSet for managing borrowing operations.
-
-    Provides functionality to list, retrieve, create borrowings, and return borrowed books.
+    The borrowings a request can see, with the validators of their
+    conditional responses.
     """
     queryset = Borrowing.objects.select_related("book", "user")
-    permission_classes = (IsAuthenticated,)
 
-    def get_serializer_class(self) -> type(serializers.ModelSerializer):
-        if self.action == "list":
-            return BorrowingListSerializer
-        if self.action == "retrieve":
-            return BorrowingRetrieveSerializer
-        if self.action == "borrowing_return":
-            return BorrowingReturnSerializer
-        return BorrowingSerializer
+    row_actions = ("list",)
+    version_fields = (
+        *ConditionalGetMixin.version_fields,
+        "book__updated_at",
+        "user__email",
+        "expected_return_date",
+        "actual_return_date",
+    )
+
+    def get_instance_validators(
+        self, instance: Borrowing
+    ) -> tuple[str, datetime]:
+        token, modified = super().get_instance_validators(instance)
+        # The book and the user are only part of the validators when
+        # the response reads them.
+        version_fields = self.get_version_fields()
+        return self.get_borrowing_validators(
+            token,
+            modified,
+            instance.expected_return_date,
+            instance.actual_return_date,
+            book_modified=(
+                instance.book.updated_at
+                if "book__updated_at" in version_fields else None
+            ),
+            email=(
+                instance.user.email
+                if "user__email" in version_fields else None
+            )
+        )
+
+    def get_row_validators(self, row: dict) -> tuple[str, datetime]:
+        token, modified = super().get_row_validators(row)
+        return self.get_borrowing_validators(
+            token,
+            modified,
+            row["expected_return_date"],
+            row["actual_return_date"],
+            book_modified=row.get("book__updated_at"),
+            email=row.get("user__email")
+        )
+
+    @staticmethod
+    def get_borrowing_validators(
+        token: str,
+        modified: datetime,
+        expected_return_date: date,
+        actual_return_date: date | None,
+        book_modified: datetime | None = None,
+        email: str | None = None
+    ) -> tuple[str, datetime]:
+        token = f"{token}:{book_modified}:{email}"
+        if book_modified is not None:
+            modified = max(modified, book_modified)
+
+        now = timezone.now()
+        if (
+            actual_return_date is None
+            and expected_return_date < now.date()
+        ):
+            # The late fee of an overdue borrowing grows every day.
+            token = f"{token}:{now.date()}"
+            modified = max(
+                modified,
+                now.replace(hour=0, minute=0, second=0, microsecond=0)
+            )
+
+        return token, modified
 
     def get_queryset(self) -> QuerySet:
         queryset = self.queryset
 
+        if self.action in ("retrieve", "borrowing_return"):
+            # A book returned today is charged up to today, so the fee
+            # annotated before the return is also the fee after it.
+            queryset = queryset.with_fees()
+
         user_id = self.request.query_params.get("user_id", None)
         is_active = self.request.query_params.get("is_active", None)
 
@@ -57,10 +137,43 @@ class BorrowingViewSet(
             if user_id:
                 queryset = queryset.filter(user_id=user_id)
         else:
-            queryset = queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user_id=self.request.user.pk)
 
         return queryset
 
+
+class BorrowingViewSet(
+    BorrowingQuerysetMixin,
+    FieldsetMixin,
+    ConditionalGetMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.CreateModelMixin,
+    viewsets.GenericViewSet
+):
+    """
+    ViewSet for managing borrowing operations.
+
+    Provides functionality to list, retrieve, create borrowings, and return borrowed books.
+    """
+    permission_classes = (IsAuthenticated,)
+    pagination_class = BorrowingCursorPagination
+
+    def get_serializer_class(self) -> type(serializers.ModelSerializer):
+        if self.action == "list":
+            return BorrowingListSerializer
+        if self.action == "retrieve":
+            return BorrowingRetrieveSerializer
+        if self.action == "borrowing_return":
+            return BorrowingReturnSerializer
+        if self.action == "borrowing_bulk_create":
+            return BorrowingBulkCreateSerializer
+        if self.action == "borrowing_bulk_return":
+            return BorrowingBulkReturnSerializer
+        if self.action == "borrowing_overdue":
+            return BorrowingOverdueSerializer
+        return BorrowingSerializer
+
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -76,6 +189,27 @@ class BorrowingViewSet(
                 required=False,
                 type=int,
             ),
+            OpenApiParameter(
+                name="page_size",
+                description="Number of borrowings per page "
+                            "(default 20, max 100) (ex. ?page_size=50).",
+                required=False,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="fields",
+                description="Comma separated fields to return "
+                            "(ex. ?fields=id,book).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="expand",
+                description="Comma separated related fields to return as "
+                            "full objects: book, user (ex. ?expand=book).",
+                required=False,
+                type=str,
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
@@ -85,9 +219,30 @@ class BorrowingViewSet(
         Regular users can see only their own borrowings.
         Staff users can see all borrowings and filter by user_id.
         Both can filter by active status using is_active parameter.
+        Results are paginated with an opaque cursor, newest first.
+        Conditional requests (If-None-Match) are answered with 304 Not
+        Modified when the page hasn't changed.
         """
         return super().list(request, *args, **kwargs)
 
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="fields",
+                description="Comma separated fields to return "
+                            "(ex. ?fields=id,book).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="expand",
+                description="Comma separated related fields to return as "
+                            "full objects: book, user (ex. ?expand=book).",
+                required=False,
+                type=str,
+            ),
+        ]
+    )
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieve details of a specific borrowing.
@@ -133,3 +288,445 @@ class BorrowingViewSet(
             serializer.save()
 
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path="bulk"
+    )
+    def borrowing_bulk_create(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Borrow several books in one request.
+
+        Accepts a list of items (book and expected_return_date) and
+        reports the outcome of every item in the same order.
+        By default the available books are borrowed and the others are
+        reported as failed; with all_or_nothing set, a single failed item
+        rejects the whole basket.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = serializer.save()
+
+        if any(result["status"] == "created" for result in results):
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response({"results": results}, status=response_status)
+
+    @action(
+        methods=["POST"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        url_path="bulk-return"
+    )
+    def borrowing_bulk_return(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Return many borrowed books at once (staff only).
+
+        Marks every borrowing in ids that hasn't been returned yet as
+        returned today and puts the copies back into the books' inventory.
+        Ids that were already returned or don't exist are listed in the
+        response without failing the batch.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return Response(serializer.save(), status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="format",
+                description="Export format, csv (default) or ndjson "
+                            "(ex. ?format=ndjson).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="is_active",
+                description="Filter by active status (not returned). "
+                            "Use true/false values (ex. ?is_active=true).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="user_id",
+                description="Filter by user ID (ex. ?user_id=1).",
+                required=False,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="borrowed_from",
+                description="Only borrowings borrowed on or after this date "
+                            "(ex. ?borrowed_from=2025-01-01).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="borrowed_to",
+                description="Only borrowings borrowed on or before this "
+                            "date (ex. ?borrowed_to=2025-12-31).",
+                required=False,
+                type=str,
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        renderer_classes=(CSVRenderer, NDJSONRenderer),
+        url_path="export"
+    )
+    def borrowing_export(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Export borrowings as CSV or NDJSON (staff only).
+
+        Streams every matching borrowing, oldest first, with the same
+        is_active and user_id filters as the list plus a borrow date
+        range. The format is picked with ?format= or the Accept header.
+        """
+        filters = BorrowingExportFilterSerializer(data=request.query_params)
+        filters.is_valid(raise_exception=True)
+
+        queryset = self.get_queryset()
+        if "borrowed_from" in filters.validated_data:
+            queryset = queryset.filter(
+                borrow_date__gte=filters.validated_data["borrowed_from"]
+            )
+        if "borrowed_to" in filters.validated_data:
+            queryset = queryset.filter(
+                borrow_date__lte=filters.validated_data["borrowed_to"]
+            )
+
+        renderer = request.accepted_renderer
+        stream = STREAMERS[renderer.format](queryset)
+        if isinstance(request._request, ASGIRequest):
+            stream = as_async(stream)
+        response = StreamingHttpResponse(
+            stream,
+            content_type=f"{renderer.media_type}; charset=utf-8"
+        )
+        response.headers["Content-Disposition"] = (
+            f'attachment; filename="borrowings.{renderer.format}"'
+        )
+        return response
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="user_id",
+                description="Filter by user ID (staff only) (ex. ?user_id=1).",
+                required=False,
+                type=int,
+            ),
+            OpenApiParameter(
+                name="page_size",
+                description="Number of borrowings per page "
+                            "(default 20, max 100) (ex. ?page_size=50).",
+                required=False,
+                type=int,
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=BorrowingOverduePagination,
+        url_path="overdue"
+    )
+    def borrowing_overdue(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        List active borrowings past their expected return date.
+
+        Longest overdue first, each with the number of days it is
+        overdue. Staff users see every borrowing and can filter by
+        user_id, regular users only see their own.
+        """
+        queryset = self.get_queryset().overdue()
+
+        page = self.paginate_queryset(queryset)
+        with time_serialization(request):
+            data = self.get_serializer(page, many=True).data
+        return self.get_paginated_response(data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="user_id",
+                description="Balance of another user (staff only) "
+                            "(ex. ?user_id=1).",
+                required=False,
+                type=int,
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path="balance"
+    )
+    def borrowing_balance(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Outstanding late fees of the current user.
+
+        The balance adds up the fees of late returns and the fees still
+        accruing on overdue borrowings, in a single aggregate query.
+        Staff users can ask for another user's balance with user_id.
+        """
+        user_id = request.user.pk
+        if request.user.is_staff and request.query_params.get("user_id"):
+            user_id = serializers.IntegerField(min_value=1).run_validation(
+                request.query_params["user_id"]
+            )
+
+        totals = Borrowing.objects.filter(
+            user_id=user_id
+        ).with_fees().aggregate(
+            balance=Sum("fee", default=0),
+            accruing=Sum(
+                "fee",
+                filter=Q(actual_return_date__isnull=True),
+                default=0
+            ),
+            late_borrowings=Count("id", filter=Q(days_late__gt=0))
+        )
+
+        return Response(
+            {
+                "user": user_id,
+                "balance": f"{totals['balance']:.2f}",
+                "accruing": f"{totals['accruing']:.2f}",
+                "late_borrowings": totals["late_borrowings"],
+            }
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="period_start",
+                description="First day of the billing period "
+                            "(default: first day of this month).",
+                required=False,
+                type=str,
+            ),
+            OpenApiParameter(
+                name="period_end",
+                description="Last day of the billing period "
+                            "(default: today).",
+                required=False,
+                type=str,
+            ),
+        ]
+    )
+    @action(
+        methods=["GET"],
+        detail=False,
+        permission_classes=(IsAdminUser,),
+        url_path="billing"
+    )
+    def borrowing_billing(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Late fees per user for a billing period (staff only).
+
+        Bills every late return made during the period, grouped by user
+        in one query over the late return index.
+        """
+        period = BorrowingBillingPeriodSerializer(data=request.query_params)
+        period.is_valid(raise_exception=True)
+        period_start = period.validated_data["period_start"]
+        period_end = period.validated_data["period_end"]
+
+        rows = list(
+            Borrowing.objects.filter(
+                actual_return_date__gt=F("expected_return_date"),
+                actual_return_date__range=(period_start, period_end)
+            ).with_fees().values(
+                "user_id", "user__email"
+            ).annotate(
+                late_returns=Count("id"),
+                total_days_late=Sum("days_late"),
+                amount=Sum("fee")
+            ).order_by("user_id")
+        )
+
+        return Response(
+            {
+                "period_start": period_start,
+                "period_end": period_end,
+                "late_returns": sum(row["late_returns"] for row in rows),
+                "total": f"{sum(row['amount'] for row in rows):.2f}",
+                "results": [
+                    {
+                        "user": row["user_id"],
+                        "email": row["user__email"],
+                        "late_returns": row["late_returns"],
+                        "days_late": row["total_days_late"],
+                        "amount": f"{row['amount']:.2f}",
+                    }
+                    for row in rows
+                ],
+            }
+        )
+
+
+ANALYTICS_PARAMETERS = [
+    OpenApiParameter(
+        name="date_from",
+        description="First day of the range (default: 30 days ago).",
+        required=False,
+        type=str,
+    ),
+    OpenApiParameter(
+        name="date_to",
+        description="Last day of the range (default: today).",
+        required=False,
+        type=str,
+    ),
+]
+LIMIT_PARAMETER = OpenApiParameter(
+    name="limit",
+    description="Number of books to return (default 10, max 100).",
+    required=False,
+    type=int,
+)
+
+
+class BorrowingAnalyticsViewSet(viewsets.ViewSet):
+    """
+    Borrowing analytics for staff.
+
+    Served from the daily borrowing rollup, so the cost of a request
+    depends on the requested date range, not on the borrowing history.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get_filters(self, request: HttpRequest) -> dict:
+        filters = BorrowingAnalyticsFilterSerializer(
+            data=request.query_params
+        )
+        filters.is_valid(raise_exception=True)
+        return filters.validated_data
+
+    @extend_schema(
+        parameters=ANALYTICS_PARAMETERS + [LIMIT_PARAMETER],
+        responses=OpenApiTypes.OBJECT
+    )
+    @action(methods=["GET"], detail=False, url_path="most-borrowed")
+    def most_borrowed(self, request: HttpRequest) -> HttpResponse:
+        """Books borrowed the most times in the range."""
+        filters = self.get_filters(request)
+        rows = stats.most_borrowed(
+            filters["date_from"], filters["date_to"], filters["limit"]
+        )
+        return Response(
+            {
+                "date_from": filters["date_from"],
+                "date_to": filters["date_to"],
+                "results": [
+                    {
+                        "book": row["book_id"],
+                        "title": row["book__title"],
+                        "author": row["book__author"],
+                        "borrows": row["borrows"],
+                        "returns": row["returns"],
+                    }
+                    for row in rows
+                ],
+            }
+        )
+
+    @extend_schema(
+        parameters=ANALYTICS_PARAMETERS, responses=OpenApiTypes.OBJECT
+    )
+    @action(methods=["GET"], detail=False, url_path="active-loans")
+    def active_loans(self, request: HttpRequest) -> HttpResponse:
+        """Borrows, returns and loans out at the end of every day."""
+        filters = self.get_filters(request)
+        return Response(
+            {
+                "date_from": filters["date_from"],
+                "date_to": filters["date_to"],
+                "results": stats.daily_activity(
+                    filters["date_from"], filters["date_to"]
+                ),
+            }
+        )
+
+    @extend_schema(
+        parameters=ANALYTICS_PARAMETERS + [LIMIT_PARAMETER],
+        responses=OpenApiTypes.OBJECT
+    )
+    @action(methods=["GET"], detail=False, url_path="utilization")
+    def utilization(self, request: HttpRequest) -> HttpResponse:
+        """
+        Titles whose copies were out the most over the range.
+
+        Utilization is the number of loan-days divided by copies times
+        days, for the titles borrowed or returned in the range.
+        """
+        filters = self.get_filters(request)
+        return Response(
+            {
+                "date_from": filters["date_from"],
+                "date_to": filters["date_to"],
+                "results": stats.utilization(
+                    filters["date_from"],
+                    filters["date_to"],
+                    filters["limit"]
+                ),
+            }
+        )
+
+
+class AsyncBorrowingView(
+    BorrowingQuerysetMixin,
+    FieldsetMixin,
+    ConditionalGetMixin,
+    AsyncGenericAPIView
+):
+    permission_classes = (IsAuthenticated,)
+
+
+class AsyncBorrowingListView(AsyncBorrowingView):
+    """Async version of the borrowing list of BorrowingViewSet."""
+    action = "list"
+    serializer_class = BorrowingListSerializer
+    pagination_class = BorrowingCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.project(self.filter_queryset(self.get_queryset()))
+        page = await self.apaginate_queryset(queryset)
+
+        if page is None:
+            return self.get_list_response(
+                [borrowing async for borrowing in queryset], paginated=False
+            )
+        return self.get_list_response(page, paginated=True)
+
+
+class AsyncBorrowingDetailView(AsyncBorrowingView):
+    """Async version of the borrowing detail of BorrowingViewSet."""
+    action = "retrieve"
+    serializer_class = BorrowingRetrieveSerializer
+
+    async def get(self, request, *args, **kwargs):
+        return self.get_retrieve_response(await self.aget_object())
@@ -0,0 +1,155 @@
+"""
+Async views for the hot read endpoints, served when ASYNC_VIEWS is on.
+
+Under ASGI a sync view holds a worker thread for the whole request, an
+async view only hands the thread its queries. ``async_routes`` swaps the
+async view in for the GET and HEAD requests of a route and keeps the
+route's own sync view for every other method, so writes, searches and
+anything else not ported go through the exact same code as before.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Model
+from django.http import Http404, HttpRequest, HttpResponse
+from django.urls import URLPattern
+from rest_framework import exceptions, generics
+from rest_framework.request import Request
+
+# Attributes describing the view to the schema generator and metrics.
+VIEW_ATTRIBUTES = ("cls", "initkwargs", "actions")
+
+
+def async_routes(
+    patterns: list[URLPattern],
+    views: dict[str, type["AsyncGenericAPIView"]]
+) -> list[URLPattern]:
+    """
+    Serve the patterns named in ``views`` with their async view when
+    ASYNC_VIEWS is on, falling back to the pattern's own view for the
+    requests the async view doesn't handle.
+    """
+    if not settings.ASYNC_VIEWS:
+        return patterns
+
+    routes = []
+    for pattern in patterns:
+        if pattern.name not in views:
+            routes.append(pattern)
+            continue
+
+        callback = views[pattern.name].as_view(sync_view=pattern.callback)
+        # Documented and measured as the view it stands in for.
+        for attribute in VIEW_ATTRIBUTES:
+            if hasattr(pattern.callback, attribute):
+                setattr(
+                    callback, attribute, getattr(pattern.callback, attribute)
+                )
+        routes.append(
+            URLPattern(
+                pattern.pattern, callback, pattern.default_args, pattern.name
+            )
+        )
+    return routes
+
+
+class AsyncGenericAPIView(generics.GenericAPIView):
+    """
+    A GenericAPIView whose ``get`` is a coroutine.
+
+    The request goes through the same negotiation, authentication,
+    permission and exception handling steps as in APIView.dispatch.
+    Authenticators are awaited through their ``aauthenticate`` when they
+    have one, permission and throttle checks run as is, so they must not
+    touch the database. Requests ``is_async_request`` turns down are
+    handed to ``sync_view``.
+    """
+    view_is_async = True
+    sync_view = None
+
+    def is_async_request(self, request: HttpRequest) -> bool:
+        return request.method in ("GET", "HEAD")
+
+    async def dispatch(
+        self, request: HttpRequest, *args, **kwargs
+    ) -> HttpResponse:
+        if not self.is_async_request(request):
+            return await sync_to_async(self.sync_view)(
+                request, *args, **kwargs
+            )
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request)
+            response = await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+    async def ainitial(self, request: Request) -> None:
+        self.format_kwarg = self.get_format_suffix(**self.kwargs)
+
+        negotiated = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = negotiated
+
+        version, scheme = self.determine_version(
+            request, *self.args, **self.kwargs
+        )
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request: Request) -> None:
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth = await authenticator.aauthenticate(request)
+                else:
+                    user_auth = await sync_to_async(
+                        authenticator.authenticate
+                    )(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth
+                return
+
+        request._not_authenticated()
+
+    async def aget_object(self) -> Model:
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+
+        try:
+            instance = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except queryset.model.DoesNotExist:
+            raise Http404(
+                f"No {queryset.model._meta.object_name} matches the "
+                f"given query."
+            )
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def apaginate_queryset(self, queryset) -> list | None:
+        # The paginator evaluates the page itself, the same way the
+        # async ORM runs a query: on the request's sync thread.
+        return await sync_to_async(self.paginate_queryset)(queryset)
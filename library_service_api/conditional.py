@@ -0,0 +1,189 @@
+import hashlib
+from datetime import datetime
+from typing import Iterable
+
+from django.db.models import Model, QuerySet
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from library_service_api.fastpath import RowMapper
+from library_service_api.metrics import time_serialization
+from library_service_api.renderers import FastJSONRenderer
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional list and retrieve requests (If-None-Match and
+    If-Modified-Since) with 304 Not Modified before anything is
+    serialized.
+
+    Validators are derived from the rows that would be returned: the
+    weak ETag hashes the version of every row (see
+    ``get_instance_validators``) together with the pagination envelope.
+    Retrieve responses also carry Last-Modified, the ``updated_at`` of
+    the row. List responses don't: a row leaving the list (deleted, or
+    no longer matching its filters) changes the ETag but not the newest
+    ``updated_at`` of the rows left in it.
+
+    The actions in ``row_actions`` read their rows with ``.values()`` and
+    build the response with the ``RowMapper`` of their serializer. Such
+    rows also hold the ``get_version_fields`` their validators are made
+    of.
+    """
+    row_actions = ()
+    version_fields = ("id", "updated_at")
+
+    def get_instance_validators(
+        self, instance: Model
+    ) -> tuple[str, datetime | None]:
+        """Version token and last modification time of one row."""
+        return f"{instance.pk}:{instance.updated_at}", instance.updated_at
+
+    def get_row_validators(self, row: dict) -> tuple[str, datetime | None]:
+        """``get_instance_validators`` of a ``.values()`` row."""
+        return f"{row['id']}:{row['updated_at']}", row["updated_at"]
+
+    def get_renderers(self) -> list[BaseRenderer]:
+        renderers = super().get_renderers()
+        if getattr(self, "action", None) not in self.row_actions:
+            return renderers
+        return [
+            FastJSONRenderer() if type(renderer) is JSONRenderer else renderer
+            for renderer in renderers
+        ]
+
+    def get_version_fields(self) -> tuple[str, ...]:
+        return self.version_fields
+
+    def get_serializer_mapper(self) -> RowMapper:
+        return RowMapper.of(self.get_serializer_class())
+
+    def get_row_mapper(self) -> RowMapper | None:
+        if getattr(self, "action", None) not in self.row_actions:
+            return None
+        return self.get_serializer_mapper()
+
+    def project(self, queryset: QuerySet) -> QuerySet:
+        """
+        Restrict ``queryset`` to the columns of the row mapper, if the
+        action has one.
+        """
+        mapper = self.get_row_mapper()
+        if mapper is None:
+            return queryset
+        return queryset.values(
+            *dict.fromkeys((*mapper.lookups, *self.get_version_fields()))
+        )
+
+    def get_list_data(self, instances: list) -> list[dict]:
+        mapper = self.get_row_mapper()
+        with time_serialization(self.request):
+            if mapper is None:
+                return self.get_serializer(instances, many=True).data
+            return mapper(instances)
+
+    def get_detail_data(self, instance: Model) -> dict:
+        with time_serialization(self.request):
+            return self.get_serializer(instance).data
+
+    def get_validators(
+        self, instances: Iterable[Model | dict], *extra: str
+    ) -> tuple[str, datetime | None]:
+        digest = hashlib.md5(usedforsecurity=False)
+        last_modified = None
+
+        for part in extra:
+            digest.update(part.encode())
+            digest.update(b"\0")
+
+        for instance in instances:
+            if isinstance(instance, dict):
+                token, modified = self.get_row_validators(instance)
+            else:
+                token, modified = self.get_instance_validators(instance)
+            digest.update(token.encode())
+            digest.update(b"\0")
+            if modified and (not last_modified or modified > last_modified):
+                last_modified = modified
+
+        return f'W/"{digest.hexdigest()}"', last_modified
+
+    def get_not_modified_response(
+        self, etag: str, last_modified: datetime | None
+    ) -> HttpResponse | None:
+        return get_conditional_response(
+            self.request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp()) if last_modified else None
+            )
+        )
+
+    @staticmethod
+    def set_validators(
+        response: HttpResponse, etag: str, last_modified: datetime | None
+    ) -> HttpResponse:
+        response.headers["ETag"] = etag
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(
+                last_modified.timestamp()
+            )
+        return response
+
+    def get_cached_response(self, entry: dict) -> HttpResponse:
+        """
+        Respond with a cached ``{"data", "etag", "last_modified"}`` entry.
+        """
+        not_modified = self.get_not_modified_response(
+            entry["etag"], entry["last_modified"]
+        )
+        if not_modified is not None:
+            return not_modified
+
+        return self.set_validators(
+            Response(entry["data"]), entry["etag"], entry["last_modified"]
+        )
+
+    def get_list_response(
+        self, instances: list[Model], paginated: bool
+    ) -> HttpResponse:
+        envelope = (
+            repr(self.get_paginated_response([]).data) if paginated else ""
+        )
+
+        etag, _ = self.get_validators(instances, envelope)
+        not_modified = self.get_not_modified_response(etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        data = self.get_list_data(instances)
+        if paginated:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+
+        return self.set_validators(response, etag, None)
+
+    def get_retrieve_response(self, instance: Model) -> HttpResponse:
+        etag, last_modified = self.get_validators((instance,))
+        not_modified = self.get_not_modified_response(etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        return self.set_validators(
+            Response(self.get_detail_data(instance)), etag, last_modified
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+
+        if page is None:
+            return self.get_list_response(list(queryset), paginated=False)
+        return self.get_list_response(page, paginated=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_retrieve_response(self.get_object())
@@ -0,0 +1,215 @@
+"""
+Read-only fast path of the list endpoints.
+
+A serializer spends most of a large list in its field machinery: every
+field of every row goes through ``get_attribute`` and
+``to_representation``, and every related field through the related
+instance. ``RowMapper`` compiles a serializer class once into the
+``.values()`` lookups it reads and a plain function building the same
+dict from one projected row, so a list is a single query returning
+only the serialized columns and one function call per row.
+
+Supported fields are model fields, dotted sources, slug or primary key
+related fields and nested serializers of a non-null relation made of
+such fields. Anything else (many nested serializers, method fields,
+``source="*"``) makes ``RowMapper`` raise, those lists keep using
+their serializer.
+"""
+import decimal
+from datetime import date
+from typing import Any, Callable, Iterable
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models import Model
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.settings import api_settings
+
+# Related fields read from the related row's columns.
+FLAT_RELATED = (relations.PrimaryKeyRelatedField, relations.SlugRelatedField)
+
+# Fields whose representation is the database value itself.
+IDENTITY_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.IntegerField,
+    *FLAT_RELATED,
+)
+
+
+def is_nullable(model: type[Model] | None, lookup: str) -> bool:
+    """Whether a ``.values()`` lookup on ``model`` can be NULL."""
+    if model is None:
+        return True
+
+    for name in lookup.split("__"):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return True
+        if field.null or field.many_to_many or field.one_to_many:
+            return True
+        model = field.related_model
+
+    return False
+
+
+def field_lookup(field: fields.Field) -> tuple[str, Callable | None]:
+    """
+    The ``.values()`` lookup of a serializer field and the function
+    turning its non-null values into their representation (None when
+    the value is used as is).
+    """
+    if (
+        isinstance(
+            field, (serializers.BaseSerializer, relations.ManyRelatedField)
+        )
+        or isinstance(field, relations.RelatedField)
+        and not isinstance(field, FLAT_RELATED)
+        or field.source == "*"
+    ):
+        raise ImproperlyConfigured(
+            f"{field.field_name!r} ({type(field).__name__}) can't be read "
+            f"from a values() row."
+        )
+
+    lookup = "__".join(field.source_attrs)
+    if isinstance(field, relations.SlugRelatedField):
+        lookup = f"{lookup}__{field.slug_field}"
+
+    if isinstance(field, fields.ChoiceField):
+        # Values of string choices are represented as they are.
+        if all(isinstance(choice, str) for choice in field.choices):
+            return lookup, None
+        return lookup, field.to_representation
+    if isinstance(field, IDENTITY_FIELDS):
+        return lookup, None
+    if isinstance(field, fields.DateField) and getattr(
+        field, "format", api_settings.DATE_FORMAT
+    ) == ISO_8601:
+        return lookup, date.isoformat
+    if isinstance(field, fields.DecimalField):
+        return lookup, decimal_converter(field)
+    return lookup, field.to_representation
+
+
+def decimal_converter(field: fields.DecimalField) -> Callable:
+    """
+    ``DecimalField.to_representation`` with its rounding context built
+    once instead of on every value.
+    """
+    if (
+        not getattr(
+            field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING
+        )
+        or field.localize
+        or field.decimal_places is None
+    ):
+        return field.to_representation
+
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    quantum = decimal.Decimal(".1") ** field.decimal_places
+    rounding = field.rounding
+
+    def convert(value: decimal.Decimal) -> str:
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return format(
+            value.quantize(quantum, rounding=rounding, context=context), "f"
+        )
+
+    return convert
+
+
+def is_nested(field: fields.Field) -> bool:
+    """Whether ``field`` is a single nested serializer of a relation."""
+    return (
+        isinstance(field, serializers.BaseSerializer)
+        and not isinstance(field, serializers.ListSerializer)
+        and field.source != "*"
+    )
+
+
+class RowMapper:
+    """
+    Build the representation of a serializer from ``.values()`` rows
+    holding ``lookups``.
+    """
+    _cache: dict[tuple, "RowMapper"] = {}
+
+    def __init__(self, serializer: serializers.Serializer) -> None:
+        self.model = getattr(
+            getattr(serializer, "Meta", None), "model", None
+        )
+        self.namespace = {}
+        lookups = []
+        source = (
+            f"def map_row(row):\n"
+            f"    return {self.compile(serializer, '', lookups)}\n"
+        )
+        exec(
+            compile(source, f"<{type(serializer).__name__} row>", "exec"),
+            self.namespace
+        )
+
+        self.lookups = tuple(dict.fromkeys(lookups))
+        self.map_row = self.namespace["map_row"]
+
+    def compile(
+        self,
+        serializer: serializers.Serializer,
+        prefix: str,
+        lookups: list[str]
+    ) -> str:
+        """
+        The dict expression of ``serializer``, whose lookups start with
+        ``prefix``.
+        """
+        items = []
+        for field in serializer._readable_fields:
+            if is_nested(field):
+                relation = prefix + "__".join(field.source_attrs)
+                if is_nullable(self.model, relation):
+                    raise ImproperlyConfigured(
+                        f"{field.field_name!r} is nested from a nullable "
+                        f"relation."
+                    )
+                value = self.compile(field, f"{relation}__", lookups)
+                items.append(f"{field.field_name!r}: {value}")
+                continue
+
+            lookup, convert = field_lookup(field)
+            lookup = prefix + lookup
+            lookups.append(lookup)
+            value = f"row[{lookup!r}]"
+            if convert is not None:
+                index = len(self.namespace)
+                self.namespace[f"convert_{index}"] = convert
+                if is_nullable(self.model, lookup):
+                    value = (
+                        f"None if (value_{index} := {value}) is None "
+                        f"else convert_{index}(value_{index})"
+                    )
+                else:
+                    value = f"convert_{index}({value})"
+            items.append(f"{field.field_name!r}: {value}")
+
+        return f"{{{', '.join(items)}}}"
+
+    @classmethod
+    def of(
+        cls, serializer_class: type[serializers.Serializer], **options: Any
+    ) -> "RowMapper":
+        """
+        The mapper of ``serializer_class`` instantiated with ``options``,
+        compiled on first use.
+        """
+        key = (serializer_class, *sorted(options.items()))
+        mapper = cls._cache.get(key)
+        if mapper is None:
+            mapper = cls._cache[key] = cls(serializer_class(**options))
+        return mapper
+
+    def __call__(self, rows: Iterable[dict]) -> list[dict[str, Any]]:
+        return list(map(self.map_row, rows))
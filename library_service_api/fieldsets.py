@@ -0,0 +1,169 @@
+"""
+Sparse fieldsets (``?fields=``) and related object expansion
+(``?expand=``) of the list and retrieve endpoints.
+
+``?fields=id,title`` keeps only the named fields of every object and
+``?expand=book,user`` replaces the named related fields by the full
+nested object. The columns read follow the response: list rows are
+projected on the serialized lookups, retrieved objects are loaded with
+``.only()`` those columns, and a related table is joined only when one
+of its columns is part of the response.
+"""
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from library_service_api.fastpath import RowMapper
+
+
+def parse_names(value: str) -> tuple[str, ...]:
+    """Comma separated names, deduplicated and sorted."""
+    return tuple(
+        sorted({name.strip() for name in value.split(",") if name.strip()})
+    )
+
+
+class FieldsetSerializerMixin:
+    """
+    A ModelSerializer taking the ``fields`` to keep and the related
+    fields to ``expand`` into the serializer of ``Meta.expandable_fields``.
+    """
+
+    def __init__(
+        self,
+        *args,
+        fields: tuple[str, ...] | None = None,
+        expand: tuple[str, ...] = (),
+        **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        expandable = self.get_expandable_fields()
+        for name in expand:
+            self.fields[name] = expandable[name](read_only=True)
+
+        if fields is not None:
+            for name in list(self.fields):
+                if name not in fields:
+                    del self.fields[name]
+
+    @classmethod
+    def get_expandable_fields(
+        cls
+    ) -> dict[str, type[serializers.Serializer]]:
+        return getattr(cls.Meta, "expandable_fields", {})
+
+
+class FieldsetMixin:
+    """
+    Apply the ``fields`` and ``expand`` query parameters to the
+    serializer and the queryset of the ``fieldset_actions``.
+
+    Unknown names are rejected with 400 Bad Request.
+    """
+    fieldset_actions = ("list", "retrieve")
+
+    def get_fieldset(self) -> dict[str, tuple[str, ...]]:
+        """The serializer options requested for the current action."""
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self) -> dict[str, tuple[str, ...]]:
+        request = getattr(self, "request", None)
+        if (
+            request is None
+            or getattr(self, "action", None) not in self.fieldset_actions
+        ):
+            return {}
+
+        serializer_class = self.get_serializer_class()
+        params = request.query_params
+        fieldset = {}
+        errors = {}
+
+        expand = parse_names(params.get("expand", ""))
+        expandable = serializer_class.get_expandable_fields()
+        if expand:
+            fieldset["expand"] = expand
+            unknown = [name for name in expand if name not in expandable]
+            if unknown:
+                errors["expand"] = [
+                    f"Can't expand {', '.join(unknown)}; expandable "
+                    f"fields: {', '.join(expandable) or 'none'}."
+                ]
+
+        fields = parse_names(params.get("fields", ""))
+        if fields:
+            fieldset["fields"] = fields
+            available = [
+                field.field_name
+                for field in serializer_class()._readable_fields
+            ]
+            unknown = [name for name in fields if name not in available]
+            if unknown:
+                errors["fields"] = [
+                    f"Unknown fields {', '.join(unknown)}; available "
+                    f"fields: {', '.join(available)}."
+                ]
+
+        if errors:
+            raise ValidationError(errors)
+        return fieldset
+
+    def get_fieldset_key(self) -> str:
+        """Suffix of the cache keys of the requested fieldset."""
+        return "".join(
+            f":{name}={','.join(names)}"
+            for name, names in sorted(self.get_fieldset().items())
+        )
+
+    def get_serializer(self, *args, **kwargs) -> serializers.Serializer:
+        return super().get_serializer(*args, **self.get_fieldset(), **kwargs)
+
+    def get_serializer_mapper(self) -> RowMapper:
+        return RowMapper.of(self.get_serializer_class(), **self.get_fieldset())
+
+    def get_version_fields(self) -> tuple[str, ...]:
+        """
+        The version fields, without those of the relations the response
+        doesn't read.
+        """
+        if getattr(self, "action", None) not in self.fieldset_actions:
+            return super().get_version_fields()
+
+        lookups = self.get_serializer_mapper().lookups
+        relations = {
+            lookup.rsplit("__", 1)[0] for lookup in lookups if "__" in lookup
+        }
+        return tuple(
+            field
+            for field in super().get_version_fields()
+            if "__" not in field or field.rsplit("__", 1)[0] in relations
+        )
+
+    def filter_queryset(self, queryset: QuerySet) -> QuerySet:
+        queryset = super().filter_queryset(queryset)
+        if getattr(self, "action", None) not in self.fieldset_actions:
+            return queryset
+        return self.narrow(queryset)
+
+    def narrow(self, queryset: QuerySet) -> QuerySet:
+        """
+        Load only the columns of the response and join only the
+        relations they come from.
+        """
+        columns = dict.fromkeys(
+            lookup
+            for lookup in (
+                *self.get_serializer_mapper().lookups,
+                *self.get_version_fields(),
+            )
+            if lookup not in queryset.query.annotations
+        )
+        relations = {
+            column.rsplit("__", 1)[0] for column in columns if "__" in column
+        }
+        return queryset.select_related(None).select_related(
+            *relations
+        ).only(*columns)
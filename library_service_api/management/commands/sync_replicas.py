@@ -0,0 +1,52 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary database into every read replica of "
+        "DATABASE_REPLICA_PATHS, with SQLite's online backup. Stands in "
+        "for the replication of a real database server when running "
+        "replicas locally."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "replicas",
+            nargs="*",
+            help="Replica aliases to refresh (default: all of them)."
+        )
+
+    def handle(self, *args, **options) -> None:
+        aliases = options["replicas"] or settings.DATABASE_REPLICAS
+        unknown = set(aliases) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError(
+                f"Unknown replicas: {', '.join(sorted(unknown))}."
+            )
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError(
+                "Only SQLite databases are copied, other databases are "
+                "replicated by their server."
+            )
+
+        primary.ensure_connection()
+        for alias in aliases:
+            started = time.perf_counter()
+            target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Copied the primary into {alias} in "
+                    f"{time.perf_counter() - started:.2f}s"
+                )
+            )
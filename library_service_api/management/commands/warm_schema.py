@@ -0,0 +1,45 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from library_service_api import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema of the current code version in every "
+        "format into SCHEMA_CACHE_DIR, so no request has to generate it. "
+        "Run it at deploy time; schemas of other versions are removed."
+    )
+
+    def handle(self, *args, **options) -> None:
+        version = schema.code_version()
+        renderers = {
+            renderer.format: renderer
+            for renderer in (
+                renderer_class()
+                for renderer_class in
+                schema.CachedSpectacularAPIView.renderer_classes
+            )
+        }
+
+        for renderer in renderers.values():
+            started = time.perf_counter()
+            path = schema.schema_path(version, renderer)
+            schema.write_schema(path, schema.generate_schema(renderer))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Generated {path.name} in "
+                    f"{time.perf_counter() - started:.2f}s"
+                )
+            )
+
+        current = {
+            schema.schema_path(version, renderer)
+            for renderer in renderers.values()
+        }
+        for path in Path(settings.SCHEMA_CACHE_DIR).glob("openapi-*"):
+            if path not in current:
+                path.unlink()
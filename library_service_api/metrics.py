@@ -0,0 +1,240 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+Every worker process keeps its own aggregates: a histogram is a fixed
+list of bucket counters behind a lock, so recording an observation is a
+dictionary lookup, a bisect and a few integer increments. Prometheus
+scrapes each process and sums them up, nothing is shared between
+workers.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, **extra: str) -> str:
+    pairs = labels + tuple(extra.items())
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str],
+        buckets: Iterable[float]
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, label_values: tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (the last one is +Inf), sum and count.
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1), 0, 0
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), total, count)
+                for labels, (counts, total, count) in self._series.items()
+            ]
+
+        lines = []
+        for label_values, counts, total, count in sorted(snapshot):
+            labels = tuple(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(
+                self.buckets + (float("inf"),), counts
+            ):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(labels, le=le)} "
+                    f"{cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(labels)} "
+                f"{_format_value(total)}"
+            )
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values."""
+
+    kind = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Iterable[str]
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], int] = {}
+
+    def inc(self, label_values: tuple[str, ...], amount: int = 1) -> None:
+        with self._lock:
+            self._series[label_values] = (
+                self._series.get(label_values, 0) + amount
+            )
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        return [
+            f"{self.name}"
+            f"{_format_labels(tuple(zip(self.label_names, values)))} {count}"
+            for values, count in snapshot
+        ]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+VIEW_LABELS = ("view", "action")
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Total time spent handling the request.",
+    VIEW_LABELS,
+    LATENCY_BUCKETS
+)
+db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing database queries.",
+    VIEW_LABELS,
+    LATENCY_BUCKETS
+)
+db_queries = Histogram(
+    "http_request_db_queries",
+    "Number of database queries executed.",
+    VIEW_LABELS,
+    QUERY_COUNT_BUCKETS
+)
+serialization_duration = Histogram(
+    "http_request_serialization_duration_seconds",
+    "Time spent turning rows and instances into response data.",
+    VIEW_LABELS,
+    LATENCY_BUCKETS
+)
+render_duration = Histogram(
+    "http_request_render_duration_seconds",
+    "Time spent rendering the response body.",
+    VIEW_LABELS,
+    LATENCY_BUCKETS
+)
+responses = Counter(
+    "http_responses_total",
+    "Responses sent, by status code.",
+    VIEW_LABELS + ("status",)
+)
+
+REGISTRY = (
+    request_duration,
+    db_duration,
+    db_queries,
+    serialization_duration,
+    render_duration,
+    responses,
+)
+
+
+def observe_request(
+    view: str,
+    action: str,
+    status: int,
+    total: float,
+    db_time: float,
+    query_count: int,
+    serialization_time: float,
+    render_time: float
+) -> None:
+    labels = (view, action)
+    request_duration.observe(labels, total)
+    db_duration.observe(labels, db_time)
+    db_queries.observe(labels, query_count)
+    serialization_duration.observe(labels, serialization_time)
+    render_duration.observe(labels, render_time)
+    responses.inc(labels + (str(status),))
+
+
+@contextmanager
+def time_serialization(request: Any) -> Iterator[None]:
+    """
+    Add the time spent in the block to the serialization time of
+    ``request``, which RequestMetricsMiddleware reports.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(request, "_metrics_serialization", None)
+        if timings is not None:
+            timings[0] += time.perf_counter() - start
+
+
+def render_metrics(extra: Iterable[tuple[str, str, str, float]] = ()) -> str:
+    """
+    Render the registry in the Prometheus text exposition format.
+
+    ``extra`` adds gauges that are read at scrape time, as
+    ``(name, kind, documentation, value)`` tuples.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.collect())
+    for name, kind, documentation, value in extra:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    for metric in REGISTRY:
+        metric.reset()
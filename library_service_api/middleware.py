@@ -0,0 +1,212 @@
+import time
+from contextlib import ExitStack
+from typing import Any, Callable
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async
+)
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+from library_service_api import metrics, replicas
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their duration."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(
+        self,
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict
+    ) -> Any:
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the query count, database time, serialization time, render
+    time and total latency of every request.
+
+    Serialization is the time the views spend turning rows and instances
+    into response data (see ``metrics.time_serialization``), rendering
+    the time the renderer spends encoding that data.
+
+    The figures are sent back in a ``Server-Timing`` header and
+    aggregated per view and action (``BookViewSet``/``list``,
+    ``BorrowingViewSet``/``borrowing_return``, ...) into the histograms
+    served by the metrics endpoint. Requests that don't resolve to a
+    view share a single label so unknown URLs can't grow the series.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self.start(request)
+        timer = QueryTimer()
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            self.wrap_connections(stack, timer)
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        return self.finish(request, response, timer, total)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        self.start(request)
+        timer = QueryTimer()
+
+        start = time.perf_counter()
+        stack = ExitStack()
+        # Queries of async views run on the request's sync thread, whose
+        # connections aren't the ones of the event loop.
+        await sync_to_async(self.wrap_connections)(stack, timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        total = time.perf_counter() - start
+
+        return self.finish(request, response, timer, total)
+
+    @staticmethod
+    def start(request: HttpRequest) -> None:
+        request._metrics_view = ("unresolved", "none")
+        request._metrics_render = [0.0, 0.0]
+        request._metrics_serialization = [0.0]
+
+    @staticmethod
+    def wrap_connections(stack: ExitStack, timer: QueryTimer) -> None:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+
+    @staticmethod
+    def finish(
+        request: HttpRequest,
+        response: HttpResponse,
+        timer: QueryTimer,
+        total: float
+    ) -> HttpResponse:
+        render_start, render_end = request._metrics_render
+        render = max(render_end - render_start, 0.0)
+        serialization = request._metrics_serialization[0]
+
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={timer.duration * 1000:.2f};desc="{timer.count} queries"',
+            f"serialize;dur={serialization * 1000:.2f}",
+            f"render;dur={render * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+
+        view, action = request._metrics_view
+        metrics.observe_request(
+            view,
+            action,
+            response.status_code,
+            total,
+            timer.duration,
+            timer.count,
+            serialization,
+            render
+        )
+        return response
+
+    def process_view(
+        self,
+        request: HttpRequest,
+        view_func: Callable,
+        view_args: tuple,
+        view_kwargs: dict
+    ) -> None:
+        view_class = getattr(view_func, "cls", None) or getattr(
+            view_func, "view_class", None
+        )
+        method = request.method.lower()
+
+        if view_class is None:
+            view = f"{view_func.__module__}.{view_func.__name__}"
+        else:
+            view = view_class.__name__
+
+        actions = getattr(view_func, "actions", None) or {}
+        request._metrics_view = (view, actions.get(method, method))
+
+    def process_template_response(
+        self, request: HttpRequest, response: HttpResponse
+    ) -> HttpResponse:
+        timings = request._metrics_render
+        timings[0] = time.perf_counter()
+
+        def render_finished(rendered: HttpResponse) -> None:
+            timings[1] = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let the reads of GET, HEAD and OPTIONS requests go to a read replica
+    and pin the reads of a user whose write just succeeded to the
+    primary (see ``library_service_api.replicas``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = replicas.start_request(request.method)
+        try:
+            response = self.get_response(request)
+            self.finish(request, response)
+        finally:
+            replicas.end_request(token)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        token = replicas.start_request(request.method)
+        try:
+            response = await self.get_response(request)
+            self.finish(request, response)
+        finally:
+            replicas.end_request(token)
+        return response
+
+    @staticmethod
+    def finish(request: HttpRequest, response: HttpResponse) -> None:
+        if (
+            request.method not in replicas.SAFE_METHODS
+            and response.status_code < 400
+        ):
+            replicas.pin_current_user()
@@ -0,0 +1,19 @@
+"""
+Extensions of the OpenAPI schema generation.
+
+Nothing imports this module at startup: it is loaded through the
+DEFAULT_GENERATOR_CLASS of SPECTACULAR_SETTINGS, wherever the schema is
+generated.
+"""
+from drf_spectacular import generators
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class AsyncJWTScheme(SimpleJWTScheme):
+    """The bearer token scheme of the project's JWT authenticators."""
+    target_class = "users.authentication.AsyncJWTAuthentication"
+    match_subclasses = True
+
+
+class SchemaGenerator(generators.SchemaGenerator):
+    """drf-spectacular's generator, with the extensions above."""
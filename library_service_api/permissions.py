@@ -0,0 +1,34 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.views import View
+from rest_framework import permissions
+
+
+class IsAdminOrMetricsScraper(permissions.BasePermission):
+    """
+    Staff users, or a scraper sending METRICS_TOKEN as a bearer token in
+    the Authorization header, or one connecting from an address of
+    METRICS_ALLOWED_ADDRESSES.
+
+    Nothing is allowed by address by default: behind a reverse proxy on
+    the same host every client would come from 127.0.0.1.
+    """
+
+    def has_permission(self, request: HttpRequest, view: View) -> bool:
+        if request.user and request.user.is_staff:
+            return True
+
+        if settings.METRICS_TOKEN:
+            authorization = request.META.get("HTTP_AUTHORIZATION", "")
+            if hmac.compare_digest(
+                authorization.encode(),
+                f"Bearer {settings.METRICS_TOKEN}".encode()
+            ):
+                return True
+
+        return (
+            request.META.get("REMOTE_ADDR")
+            in settings.METRICS_ALLOWED_ADDRESSES
+        )
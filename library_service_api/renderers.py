@@ -0,0 +1,46 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson.
+
+    The output is byte for byte the one of JSONRenderer for strings,
+    integers, booleans, None, lists and dicts, which is all RowMapper
+    builds, and the types orjson doesn't know go through the same
+    encoder. Floats are formatted by orjson (``1e-5`` rather than
+    ``1e-05``), so it is only used for responses without any. Indented
+    or non-compact output, and data orjson can't encode, are left to
+    JSONRenderer.
+    """
+
+    def render(
+        self,
+        data,
+        accepted_media_type: str | None = None,
+        renderer_context: dict | None = None
+    ) -> bytes:
+        if (
+            data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=ORJSON_OPTIONS
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escaped like JSONRenderer does, as they are not valid JavaScript.
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
@@ -0,0 +1,130 @@
+"""
+Read replica routing.
+
+Reads of GET, HEAD and OPTIONS requests go to one of the
+DATABASE_REPLICAS, picked once per request, everything else to the
+primary (``default``). ``ReplicaRoutingMiddleware`` marks the requests
+that may read from a replica, the authenticator tells the router whose
+request it is, and a user's successful writes pin their reads to the
+primary for REPLICA_STICKY_SECONDS, so a borrow or a return is visible
+in their next requests even before it has reached the replicas.
+
+Pins are kept in the default cache, which must be shared by the
+workers for the stickiness to hold across them.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+@dataclass
+class RoutingState:
+    """How the database reads of the current request are routed."""
+
+    replica: str | None
+    user_id: Any = None
+
+
+_state: ContextVar[RoutingState | None] = ContextVar(
+    "replica_routing", default=None
+)
+
+
+def _pin_key(user_id: Any) -> str:
+    return f"db:pinned:{user_id}"
+
+
+def start_request(method: str) -> Token:
+    """Route the reads of a request made with ``method``."""
+    replicas = settings.DATABASE_REPLICAS
+    return _state.set(
+        RoutingState(
+            replica=(
+                random.choice(replicas)
+                if replicas and method in SAFE_METHODS else None
+            )
+        )
+    )
+
+
+def end_request(token: Token) -> None:
+    _state.reset(token)
+
+
+def set_user(user_id: Any) -> None:
+    """
+    Record the user of the current request, moving its reads to the
+    primary if their writes pinned it.
+    """
+    state = _state.get()
+    if state is None:
+        return
+
+    state.user_id = user_id
+    if state.replica is not None and cache.get(_pin_key(user_id)):
+        state.replica = None
+
+
+@contextmanager
+def use_primary() -> Iterator[None]:
+    """Read from the primary inside the block."""
+    state = _state.get()
+    token = _state.set(
+        RoutingState(
+            replica=None, user_id=state.user_id if state else None
+        )
+    )
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def pin_user(user_id: Any) -> None:
+    """Read from the primary for the next REPLICA_STICKY_SECONDS."""
+    if settings.DATABASE_REPLICAS and settings.REPLICA_STICKY_SECONDS > 0:
+        cache.set(_pin_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def pin_current_user() -> None:
+    """Pin the user of the current request, if it is known."""
+    state = _state.get()
+    if state is not None and state.user_id is not None:
+        pin_user(state.user_id)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send writes and migrations to the primary and the reads of the
+    requests marked by ``ReplicaRoutingMiddleware`` to their replica.
+
+    Reads inside a transaction of the primary stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        state = _state.get()
+        if (
+            state is None
+            or state.replica is None
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Every database holds the same rows.
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> bool:
+        return db not in settings.DATABASE_REPLICAS
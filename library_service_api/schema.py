@@ -0,0 +1,193 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer of the API.
+``CachedSpectacularAPIView`` does it once per code version and format:
+the rendered document is kept in memory and in SCHEMA_CACHE_DIR, filled
+either at deploy time by "manage.py warm_schema" or by the first
+request, and served with a strong ETag and a Cache-Control max-age of
+SCHEMA_CACHE_MAX_AGE.
+
+The code version is CODE_VERSION when it is set (e.g. the deployed git
+commit), otherwise a hash of the project's sources, of the versions of
+the libraries the schema is generated with and of SPECTACULAR_SETTINGS,
+so a deploy of different code never serves the schema of the previous
+one.
+"""
+import functools
+import hashlib
+import importlib.metadata
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.renderers import BaseRenderer
+
+SCHEMA_PACKAGES = (
+    "django",
+    "djangorestframework",
+    "djangorestframework-simplejwt",
+    "drf-spectacular",
+)
+
+
+@dataclass(frozen=True)
+class RenderedSchema:
+    content: bytes
+    etag: str
+
+    @classmethod
+    def of(cls, content: bytes) -> "RenderedSchema":
+        return cls(
+            content=content,
+            etag=f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+        )
+
+
+_schemas: dict[tuple[str, str], RenderedSchema] = {}
+_lock = threading.Lock()
+
+
+def code_version() -> str:
+    return settings.CODE_VERSION or _source_version()
+
+
+@functools.cache
+def _source_version() -> str:
+    digest = hashlib.sha256()
+    for package in SCHEMA_PACKAGES:
+        digest.update(
+            f"{package}=={importlib.metadata.version(package)}\0".encode()
+        )
+    digest.update(repr(sorted(settings.SPECTACULAR_SETTINGS.items())).encode())
+
+    base_dir = Path(settings.BASE_DIR)
+    directories = {
+        Path(app.path)
+        for app in apps.get_app_configs()
+        if Path(app.path).is_relative_to(base_dir)
+    }
+    directories.add(Path(__file__).parent)
+    for directory in sorted(directories):
+        for path in sorted(directory.rglob("*.py")):
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(b"\0")
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(version: str, renderer: BaseRenderer) -> Path:
+    return Path(settings.SCHEMA_CACHE_DIR) / (
+        f"openapi-{version}.{renderer.format}"
+    )
+
+
+def generate_schema(renderer: BaseRenderer) -> bytes:
+    """Generate and render the schema, as SpectacularAPIView does."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return renderer.render(
+        generator.get_schema(request=None, public=True),
+        renderer.media_type,
+        {}
+    )
+
+
+def write_schema(path: Path, content: bytes) -> None:
+    """Write ``content`` to ``path`` atomically."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent)
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temporary, path)
+    except BaseException:
+        Path(temporary).unlink(missing_ok=True)
+        raise
+
+
+def get_schema(renderer: BaseRenderer) -> RenderedSchema:
+    """
+    The schema rendered by ``renderer`` for the current code version,
+    read from SCHEMA_CACHE_DIR or generated (and written there) the
+    first time it is asked for.
+    """
+    version = code_version()
+    key = (version, renderer.format)
+    schema = _schemas.get(key)
+    if schema is not None:
+        return schema
+
+    with _lock:
+        schema = _schemas.get(key)
+        if schema is not None:
+            return schema
+
+        path = schema_path(version, renderer)
+        try:
+            schema = RenderedSchema.of(path.read_bytes())
+        except FileNotFoundError:
+            schema = RenderedSchema.of(generate_schema(renderer))
+            try:
+                write_schema(path, schema.content)
+            except OSError:
+                # A read-only deploy still serves it from memory.
+                pass
+        _schemas[key] = schema
+    return schema
+
+
+def clear_schemas() -> None:
+    """Forget the schemas loaded in this process."""
+    _schemas.clear()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    ``SpectacularAPIView`` serving the precomputed schema, answering
+    If-None-Match with 304 Not Modified.
+
+    Requests for another API version or language than the default are
+    generated as usual.
+    """
+
+    def _get_schema_response(self, request: HttpRequest) -> HttpResponse:
+        if (
+            self.api_version
+            or self.urlconf
+            or self.patterns
+            or self.custom_settings
+            or request.version
+            or self._get_version_parameter(request)
+            or request.GET.get("lang")
+        ):
+            return super()._get_schema_response(request)
+
+        renderer = request.accepted_renderer
+        schema = get_schema(renderer)
+        response = get_conditional_response(request, etag=schema.etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f"; charset={renderer.charset}"
+            filename = self._get_filename(request, None)
+            response = HttpResponse(
+                schema.content,
+                content_type=content_type,
+                headers={
+                    "Content-Disposition": f'inline; filename="{filename}"'
+                }
+            )
+        response.headers["ETag"] = schema.etag
+        response.headers["Cache-Control"] = (
+            f"public, max-age={settings.SCHEMA_CACHE_MAX_AGE}"
+        )
+        patch_vary_headers(response, ("Accept",))
+        return response
@@ -13,6 +13,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from library_service_api import sqlite
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -27,6 +29,13 @@ DEBUG = os.environ.get("DJANGO_DEBUG", False).lower() in ("t", "true", "1")
 
 ALLOWED_HOSTS = ["127.0.0.1"]
 
+# The schema, Swagger UI and ReDoc endpoints. Their views are only
+# imported on their first request; turned off, they aren't routed and
+# drf_spectacular isn't loaded as an app, keeping worker startup short.
+API_DOCS_ENABLED = os.environ.get(
+    "API_DOCS_ENABLED", "true"
+).lower() in ("t", "true", "1")
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -38,13 +47,17 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "rest_framework_simplejwt",
-    "drf_spectacular",
+    *(("drf_spectacular",) if API_DOCS_ENABLED else ()),
+    # Project-wide management commands (warm_schema, sync_replicas).
+    "library_service_api",
     "users",
     "books",
     "borrowings",
 ]
 
 MIDDLEWARE = [
+    "library_service_api.middleware.RequestMetricsMiddleware",
+    "library_service_api.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -75,16 +88,85 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "library_service_api.wsgi.application"
 
+# Serve the hot read endpoints with async views. Only worth it under
+# ASGI, asgi.py turns it on unless DJANGO_ASYNC_VIEWS says otherwise.
+ASYNC_VIEWS = os.environ.get(
+    "DJANGO_ASYNC_VIEWS", "false"
+).lower() in ("t", "true", "1")
+
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("DATABASE_PATH", BASE_DIR / "db.sqlite3"),
+    }
+}
+
+# "production" tunes SQLite for concurrent requests: WAL journaling,
+# busy timeout, cache and mmap pragmas, BEGIN IMMEDIATE transactions and
+# persistent connections (see library_service_api.sqlite).
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "default")
+
+if SQLITE_PROFILE == "production":
+    DATABASES["default"].update(
+        sqlite.production_profile(
+            busy_timeout_ms=int(
+                os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5_000)
+            ),
+            conn_max_age=int(os.environ.get("DATABASE_CONN_MAX_AGE", 600))
+        )
+    )
+
+# Read replicas, as comma separated SQLite files kept up to date with
+# "manage.py sync_replicas" (or by any other replication of the primary).
+# Safe requests read from one of them, a user's writes pin their reads to
+# the primary for REPLICA_STICKY_SECONDS.
+DATABASE_REPLICAS = []
+for index, path in enumerate(
+    filter(None, os.environ.get("DATABASE_REPLICA_PATHS", "").split(",")),
+    start=1
+):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "NAME": path.strip(),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica_{index}")
+
+DATABASE_ROUTERS = ["library_service_api.replicas.PrimaryReplicaRouter"]
+
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 10))
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", LOCMEM_CACHE)
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get("CACHE_LOCATION", "library-service-api"),
+        "OPTIONS": (
+            {"MAX_ENTRIES": 10_000}
+            if CACHE_BACKEND == LOCMEM_CACHE
+            or CACHE_BACKEND.endswith(".FileBasedCache")
+            else {}
+        ),
     }
 }
 
+# The book cache versions live in the cache too: with a per-process
+# cache a write is only seen by the worker that made it, the others
+# serve their copy until it expires.
+BOOK_CACHE_TIMEOUT = int(
+    os.environ.get(
+        "BOOK_CACHE_TIMEOUT", 30 if CACHE_BACKEND == LOCMEM_CACHE else 300
+    )
+)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -127,18 +209,38 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
 
+# "database" loads the user row on every request, "stateless" trusts the
+# signed token claims and re-checks them against a locally cached user at
+# most once per STATELESS_JWT_REVALIDATE_SECONDS (0 disables re-checks).
+JWT_AUTH_MODE = os.environ.get("JWT_AUTH_MODE", "database")
+
+STATELESS_JWT_REVALIDATE_SECONDS = int(
+    os.environ.get("STATELESS_JWT_REVALIDATE_SECONDS", 60)
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.StatelessJWTAuthentication"
+        if JWT_AUTH_MODE == "stateless"
+        else "users.authentication.AsyncJWTAuthentication",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# @extend_schema subclasses the schema class as the views are imported,
+# without docs DRF's own (already loaded) one saves loading drf_spectacular.
+if API_DOCS_ENABLED:
+    REST_FRAMEWORK["DEFAULT_SCHEMA_CLASS"] = (
+        "drf_spectacular.openapi.AutoSchema"
+    )
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZE",
+    "TOKEN_OBTAIN_SERIALIZER": (
+        "users.serializers.UserTokenObtainPairSerializer"
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -146,6 +248,7 @@ SPECTACULAR_SETTINGS = {
     "DESCRIPTION": "RESTful API for managing library books, users, and borrowings",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    "DEFAULT_GENERATOR_CLASS": "library_service_api.openapi.SchemaGenerator",
     "SWAGGER_UI_SETTINGS": {
         "deepLinking": True,
         "defaultModelRendering": "model",
@@ -153,3 +256,20 @@ SPECTACULAR_SETTINGS = {
         "defaultModelExpendDepth": 2,
     },
 }
+
+# The OpenAPI schema is generated once per code version (CODE_VERSION,
+# e.g. the deployed commit, or a hash of the sources when unset) and
+# kept in SCHEMA_CACHE_DIR; "manage.py warm_schema" fills it at deploy.
+CODE_VERSION = os.environ.get("CODE_VERSION")
+SCHEMA_CACHE_DIR = Path(
+    os.environ.get("SCHEMA_CACHE_DIR", BASE_DIR / ".schema")
+)
+SCHEMA_CACHE_MAX_AGE = int(os.environ.get("SCHEMA_CACHE_MAX_AGE", 3600))
+
+# Besides staff users, /api/v1/metrics/ answers scrapers sending
+# "Authorization: Bearer METRICS_TOKEN" or connecting from one of the
+# comma separated METRICS_ALLOWED_ADDRESSES.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+METRICS_ALLOWED_ADDRESSES = tuple(
+    filter(None, os.environ.get("METRICS_ALLOWED_ADDRESSES", "").split(","))
+)
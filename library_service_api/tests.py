@@ -0,0 +1,965 @@
+import datetime
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from typing import Callable
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from books.models import Book
+from books.serializers import BookSerializer
+from books.views import AsyncBookDetailView, AsyncBookListView, BookViewSet
+from borrowings.models import Borrowing
+from borrowings.serializers import (
+    BorrowingListSerializer,
+    BorrowingRetrieveSerializer
+)
+from borrowings.views import AsyncBorrowingDetailView, AsyncBorrowingListView
+from library_service_api.async_views import async_routes
+from library_service_api import replicas, schema
+from library_service_api.fastpath import RowMapper
+from library_service_api.metrics import reset_metrics
+from library_service_api.middleware import ReplicaRoutingMiddleware
+from library_service_api.renderers import FastJSONRenderer
+from library_service_api.sqlite import production_profile
+from users.authentication import (
+    AsyncJWTAuthentication,
+    StatelessJWTAuthentication
+)
+from users.views import AsyncManageUserView, ManageUserView
+
+METRICS_URL = reverse("metrics")
+REMOTE_ADDR = "203.0.113.7"
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self) -> None:
+        reset_metrics()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.book = Book.objects.create(
+            title="Test Book",
+            author="Test Author",
+            inventory=5,
+            daily_fee=1.00
+        )
+
+    def test_server_timing_header(self):
+        """Test responses report database, render and total timings"""
+        response = self.client.get(
+            reverse("books:book-detail", kwargs={"pk": self.book.id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r"serialize;dur=[\d.]+")
+        self.assertRegex(timing, r"render;dur=[\d.]+")
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+
+    def test_metrics_aggregated_per_view_and_action(self):
+        """Test requests are aggregated into per-action histograms"""
+        self.client.get(reverse("books:book-list"))
+        self.client.get(reverse("books:book-list"))
+        self.client.get(
+            reverse("books:book-detail", kwargs={"pk": self.book.id})
+        )
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count'
+            '{view="BookViewSet",action="list"} 2',
+            body
+        )
+        self.assertIn(
+            'http_responses_total'
+            '{view="BookViewSet",action="retrieve",status="200"} 1',
+            body
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket'
+            '{view="BookViewSet",action="retrieve",le="+Inf"} 1',
+            body
+        )
+        self.assertIn(
+            'http_request_serialization_duration_seconds_count'
+            '{view="BookViewSet",action="list"} 2',
+            body
+        )
+        self.assertIn("# TYPE books_cache_hits_total counter", body)
+
+    def test_serialization_is_timed_apart_from_rendering(self):
+        """Test the time spent building response data is its own metric"""
+        cache.clear()
+        to_representation = BookSerializer.to_representation
+
+        def slow_representation(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        with patch.object(
+            BookSerializer, "to_representation", slow_representation
+        ):
+            response = self.client.get(
+                reverse("books:book-detail", kwargs={"pk": self.book.id})
+            )
+
+        timing = dict(
+            re.findall(r"(\w+);dur=([\d.]+)", response["Server-Timing"])
+        )
+        self.assertGreaterEqual(float(timing["serialize"]), 50)
+        self.assertLess(float(timing["render"]), 50)
+
+    def test_metrics_staff_or_scraper_only(self):
+        """Test the metrics need staff, the scraper token or an address"""
+        for address in ("127.0.0.1", REMOTE_ADDR):
+            response = self.client.get(METRICS_URL, REMOTE_ADDR=address)
+            self.assertEqual(
+                response.status_code, status.HTTP_401_UNAUTHORIZED
+            )
+
+        with self.settings(METRICS_ALLOWED_ADDRESSES=(REMOTE_ADDR,)):
+            response = self.client.get(METRICS_URL, REMOTE_ADDR=REMOTE_ADDR)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.settings(METRICS_TOKEN="scrape"):
+            response = self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer scrape"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION="Bearer other"
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_401_UNAUTHORIZED
+            )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(METRICS_URL, REMOTE_ADDR=REMOTE_ADDR)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.staff_user)
+        response = self.client.get(METRICS_URL, REMOTE_ADDR=REMOTE_ADDR)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Every endpoint is requested against a small and a large dataset: the
+    number of queries must not grow with the number of rows (no N+1) and
+    must stay within the endpoint's budget below.
+
+    Requests authenticate with a real access token, so the budgets
+    include the user lookup of the authentication backend.
+    """
+    SIZES = (5, 50)
+    BUDGETS = {
+        "books-list": 1,
+        "books-detail": 1,
+        "borrowings-list": 2,
+        "borrowings-list-staff": 2,
+        "borrowings-detail": 2,
+        "borrowings-create": 7,
+        "borrowings-return": 7,
+        "users-me": 1,
+        "users-token": 1,
+    }
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.seeded = 0
+
+    def seed(self, size: int) -> None:
+        """Grow the dataset to ``size`` books, users and borrowings."""
+        start, self.seeded = self.seeded, size
+        due = timezone.now().date() + datetime.timedelta(days=7)
+
+        books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {index}",
+                author=f"Author {index}",
+                inventory=10,
+                daily_fee=1.00
+            )
+            for index in range(start, size)
+        )
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(email=f"reader{index}@test.com")
+            for index in range(start, size)
+        )
+        Borrowing.objects.bulk_create(
+            Borrowing(
+                book=book,
+                user=user if index % 2 else self.user,
+                expected_return_date=due
+            )
+            for index, (book, user) in enumerate(zip(books, users), start)
+        )
+
+    def authenticate(self, user) -> None:
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZE=f"Bearer {token}")
+
+    def assertQueryBudget(
+        self,
+        endpoint: str,
+        method: str,
+        get_url: Callable[[], str],
+        data: Callable[[], dict] | None = None
+    ) -> None:
+        """
+        Request ``get_url()`` at every dataset size. The URL and payload
+        are built before the queries are captured.
+        """
+        counts = []
+        for size in self.SIZES:
+            self.seed(size)
+            cache.clear()
+            url = get_url()
+            payload = data() if data else None
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(
+                    url, payload, format="json"
+                )
+            self.assertLess(
+                response.status_code, 300, (endpoint, response.data)
+            )
+            counts.append(len(queries))
+
+        self.assertEqual(
+            len(set(counts)),
+            1,
+            f"{endpoint} query count grows with the dataset: {counts}"
+        )
+        self.assertLessEqual(
+            counts[0],
+            self.BUDGETS[endpoint],
+            f"{endpoint} exceeds its query budget"
+        )
+
+    def latest_active_borrowing(self) -> int:
+        return Borrowing.objects.filter(
+            user=self.user, actual_return_date__isnull=True
+        ).latest("id").id
+
+    def test_books_list(self):
+        self.assertQueryBudget(
+            "books-list", "get", lambda: reverse("books:book-list")
+        )
+
+    def test_books_detail(self):
+        self.assertQueryBudget(
+            "books-detail",
+            "get",
+            lambda: reverse(
+                "books:book-detail",
+                kwargs={"pk": Book.objects.latest("id").id}
+            )
+        )
+
+    def test_borrowings_list(self):
+        self.authenticate(self.user)
+        self.assertQueryBudget(
+            "borrowings-list",
+            "get",
+            lambda: reverse("borrowings:borrowings-list") + "?page_size=100"
+        )
+
+    def test_borrowings_list_staff(self):
+        self.authenticate(self.staff_user)
+        self.assertQueryBudget(
+            "borrowings-list-staff",
+            "get",
+            lambda: reverse("borrowings:borrowings-list") + "?page_size=100"
+        )
+
+    def test_borrowings_detail(self):
+        self.authenticate(self.user)
+        self.assertQueryBudget(
+            "borrowings-detail",
+            "get",
+            lambda: reverse(
+                "borrowings:borrowings-detail",
+                kwargs={"pk": self.latest_active_borrowing()}
+            )
+        )
+
+    def test_borrowings_create(self):
+        self.authenticate(self.user)
+        self.assertQueryBudget(
+            "borrowings-create",
+            "post",
+            lambda: reverse("borrowings:borrowings-list"),
+            lambda: {
+                "book": Book.objects.latest("id").id,
+                "expected_return_date": (
+                    timezone.now().date() + datetime.timedelta(days=7)
+                ),
+            }
+        )
+
+    def test_borrowings_return(self):
+        self.authenticate(self.user)
+        self.assertQueryBudget(
+            "borrowings-return",
+            "post",
+            lambda: reverse(
+                "borrowings:borrowings-borrowing-return",
+                kwargs={"pk": self.latest_active_borrowing()}
+            )
+        )
+
+    def test_users_me(self):
+        self.authenticate(self.user)
+        self.assertQueryBudget(
+            "users-me", "get", lambda: reverse("users:manage_user")
+        )
+
+    def test_users_token(self):
+        self.assertQueryBudget(
+            "users-token",
+            "post",
+            lambda: reverse("users:token_obtain_pair"),
+            lambda: {"email": "user@test.com", "password": "testpass123"}
+        )
+
+
+class AsyncViewTests(APITestCase):
+    """The async read views answer exactly like the sync ones."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+        self.books = Book.objects.bulk_create(
+            Book(
+                title=f"Book {index}",
+                author="Test Author",
+                inventory=5,
+                daily_fee=1.50
+            )
+            for index in range(3)
+        )
+        today = timezone.now().date()
+        self.borrowings = Borrowing.objects.bulk_create(
+            Borrowing(
+                book=book,
+                user=self.user,
+                expected_return_date=today - datetime.timedelta(days=2)
+            )
+            for book in self.books
+        )
+
+    def token(self, user) -> str:
+        return f"Bearer {RefreshToken.for_user(user).access_token}"
+
+    def assertSameResponse(
+        self, view: Callable, url: str, user=None, **kwargs
+    ) -> None:
+        headers = {"Authorize": self.token(user)} if user else {}
+        expected = self.client.get(url, headers=headers)
+
+        request = self.factory.get(url, headers=headers)
+        response = async_to_sync(view)(request, **kwargs)
+        response.render()
+
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_books(self):
+        """Test the async book list and detail match BookViewSet"""
+        self.assertSameResponse(
+            AsyncBookListView.as_view(), reverse("books:book-list")
+        )
+        book_id = self.books[0].id
+        self.assertSameResponse(
+            AsyncBookDetailView.as_view(),
+            reverse("books:book-detail", kwargs={"pk": book_id}),
+            pk=str(book_id)
+        )
+        self.assertSameResponse(
+            AsyncBookDetailView.as_view(),
+            reverse("books:book-detail", kwargs={"pk": 0}),
+            pk="0"
+        )
+
+    def test_borrowings(self):
+        """Test the async borrowing list and detail match BorrowingViewSet"""
+        url = reverse("borrowings:borrowings-list")
+        view = AsyncBorrowingListView.as_view()
+        for user in (self.user, self.staff_user):
+            self.assertSameResponse(view, url, user)
+        self.assertSameResponse(view, f"{url}?page_size=2", self.user)
+
+        borrowing_id = self.borrowings[0].id
+        self.assertSameResponse(
+            AsyncBorrowingDetailView.as_view(),
+            reverse(
+                "borrowings:borrowings-detail", kwargs={"pk": borrowing_id}
+            ),
+            self.user,
+            pk=str(borrowing_id)
+        )
+
+    def test_users_me(self):
+        """Test the async profile matches ManageUserView"""
+        url = reverse("users:manage_user")
+        self.assertSameResponse(AsyncManageUserView.as_view(), url, self.user)
+        self.assertSameResponse(AsyncManageUserView.as_view(), url)
+
+    @patch.object(
+        APIView, "authentication_classes", (StatelessJWTAuthentication,)
+    )
+    def test_stateless_authentication(self):
+        """Test the async views authenticate stateless tokens"""
+        self.assertSameResponse(
+            AsyncManageUserView.as_view(),
+            reverse("users:manage_user"),
+            self.staff_user
+        )
+
+    def test_conditional_get(self):
+        """Test the async views answer 304 to a matching If-None-Match"""
+        url = reverse("borrowings:borrowings-list")
+        etag = self.client.get(
+            url, HTTP_AUTHORIZE=self.token(self.user)
+        )["ETag"]
+
+        request = self.factory.get(
+            url,
+            headers={"Authorize": self.token(self.user), "If-None-Match": etag}
+        )
+        response = async_to_sync(AsyncBorrowingListView.as_view())(request)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_other_methods_use_sync_view(self):
+        """Test writes and searches are handed to the sync view"""
+        view = AsyncBookListView.as_view(
+            sync_view=BookViewSet.as_view({"get": "list", "post": "create"})
+        )
+        url = reverse("books:book-list")
+
+        request = self.factory.post(
+            url,
+            {
+                "title": "New Book",
+                "author": "New Author",
+                "cover": "HARD",
+                "inventory": 1,
+                "daily_fee": "2.00",
+            },
+            content_type="application/json",
+            headers={"Authorize": self.token(self.staff_user)}
+        )
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = async_to_sync(view)(
+            self.factory.get(url, {"search": "new"})
+        )
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_async_routes(self):
+        """Test async_routes only swaps the views when ASYNC_VIEWS is on"""
+        patterns = [path("me/", ManageUserView.as_view(), name="me")]
+        views = {"me": AsyncManageUserView}
+
+        with self.settings(ASYNC_VIEWS=False):
+            self.assertEqual(async_routes(patterns, views), patterns)
+
+        with self.settings(ASYNC_VIEWS=True):
+            callback = async_routes(patterns, views)[0].callback
+        self.assertTrue(iscoroutinefunction(callback))
+        self.assertIs(callback.view_class, AsyncManageUserView)
+        self.assertIs(callback.cls, ManageUserView)
+
+    def test_metrics_under_asgi(self):
+        """Test queries are counted when the middleware runs async"""
+        response = async_to_sync(AsyncClient().get)(
+            reverse("books:book-detail", kwargs={"pk": self.books[0].id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response["Server-Timing"], r'desc="[1-9]\d* queries"')
+
+
+class FastPathTests(APITestCase):
+    """The values() fast path renders exactly what the serializers do."""
+
+    def setUp(self) -> None:
+        user = get_user_model().objects.create_user(
+            email="user@test.com",
+            password="testpass123"
+        )
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    title="Plain",
+                    author="Test Author",
+                    inventory=5,
+                    daily_fee=Decimal("1.5")
+                ),
+                Book(
+                    title="Ünïcødé \u2028 \"quoted\" </script>",
+                    author="Auteur \u2029",
+                    cover="SOFT",
+                    inventory=0,
+                    daily_fee=Decimal("12.34")
+                ),
+            ]
+        )
+        today = timezone.now().date()
+        Borrowing.objects.bulk_create(
+            [
+                Borrowing(
+                    book=books[0],
+                    user=user,
+                    expected_return_date=today
+                ),
+                Borrowing(
+                    book=books[1],
+                    user=user,
+                    expected_return_date=today + datetime.timedelta(days=3),
+                    actual_return_date=today
+                ),
+            ]
+        )
+
+    def assertSameContent(
+        self, queryset, serializer_class, **options
+    ) -> None:
+        mapper = RowMapper.of(serializer_class, **options)
+        expected = JSONRenderer().render(
+            serializer_class(queryset, many=True, **options).data
+        )
+        content = FastJSONRenderer().render(
+            mapper(queryset.values(*mapper.lookups))
+        )
+        self.assertEqual(content, expected)
+
+    def test_books(self):
+        self.assertSameContent(Book.objects.order_by("id"), BookSerializer)
+
+    def test_borrowings(self):
+        self.assertSameContent(
+            Borrowing.objects.select_related("book", "user").order_by("id"),
+            BorrowingListSerializer
+        )
+
+    def test_nested_serializer(self):
+        queryset = Borrowing.objects.with_fees().order_by("id")
+        self.assertSameContent(queryset, BorrowingRetrieveSerializer)
+        self.assertSameContent(
+            queryset, BorrowingRetrieveSerializer, expand=("user",)
+        )
+
+    def test_unsupported_serializer(self):
+        class BookTitleSerializer(serializers.ModelSerializer):
+            title = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Book
+                fields = ("id", "title")
+
+        with self.assertRaises(ImproperlyConfigured):
+            RowMapper(BookTitleSerializer())
+
+    def test_renderer_falls_back_to_json_renderer(self):
+        data = {
+            "date": datetime.date(2024, 1, 2),
+            "fee": Decimal("1.50"),
+            "nested": [None, True, {"key": "\u2028"}],
+        }
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+        self.assertEqual(
+            FastJSONRenderer().render(
+                data, renderer_context={"indent": 2}
+            ),
+            JSONRenderer().render(data, renderer_context={"indent": 2})
+        )
+
+    def test_list_endpoints(self):
+        self.client.force_authenticate(get_user_model().objects.get())
+
+        response = self.client.get(reverse("books:book-list"))
+        self.assertEqual(
+            response.json(),
+            BookSerializer(Book.objects.order_by("id"), many=True).data
+        )
+
+        response = self.client.get(reverse("borrowings:borrowings-list"))
+        self.assertEqual(
+            response.json()["results"],
+            BorrowingListSerializer(
+                Borrowing.objects.order_by("-id"), many=True
+            ).data
+        )
+
+
+@override_settings(
+    DATABASE_REPLICAS=["replica_1", "replica_2"], REPLICA_STICKY_SECONDS=10
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Safe requests read from a replica unless their user just wrote."""
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = replicas.PrimaryReplicaRouter()
+
+    def route(
+        self, method: str, user_id: int | None = None, status_code=200
+    ) -> str:
+        """The database a request's read goes to through the middleware."""
+        routed = []
+
+        def view(request):
+            if user_id is not None:
+                replicas.set_user(user_id)
+            routed.append(self.router.db_for_read(Book))
+            return HttpResponse(status=status_code)
+
+        ReplicaRoutingMiddleware(view)(self.factory.generic(method, "/"))
+        return routed[0]
+
+    def test_reads_of_safe_requests_go_to_a_replica(self):
+        self.assertIn(self.route("GET"), ("replica_1", "replica_2"))
+        self.assertIn(
+            self.route("HEAD", user_id=1), ("replica_1", "replica_2")
+        )
+        self.assertEqual(self.route("POST"), "default")
+        self.assertEqual(self.router.db_for_write(Book), "default")
+        self.assertEqual(self.router.db_for_read(Book), "default")
+
+    def test_writes_pin_their_user_to_the_primary(self):
+        self.route("POST", user_id=1, status_code=400)
+        self.assertNotEqual(self.route("GET", user_id=1), "default")
+
+        self.route("POST", user_id=1, status_code=201)
+        self.assertEqual(self.route("GET", user_id=1), "default")
+        self.assertNotEqual(self.route("GET", user_id=2), "default")
+        self.assertNotEqual(self.route("GET"), "default")
+
+    def test_transactions_and_cache_fills_read_the_primary(self):
+        token = replicas.start_request("GET")
+        try:
+            self.assertNotEqual(self.router.db_for_read(Book), "default")
+            with patch.object(connection, "in_atomic_block", True):
+                self.assertEqual(self.router.db_for_read(Book), "default")
+            with replicas.use_primary():
+                self.assertEqual(self.router.db_for_read(Book), "default")
+        finally:
+            replicas.end_request(token)
+
+    def test_authentication_identifies_the_user(self):
+        replicas.pin_user(7)
+        raw_token = str(
+            RefreshToken.for_user(get_user_model()(id=7)).access_token
+        ).encode()
+
+        token = replicas.start_request("GET")
+        try:
+            AsyncJWTAuthentication().get_validated_token(raw_token)
+            self.assertEqual(self.router.db_for_read(Book), "default")
+        finally:
+            replicas.end_request(token)
+
+    def test_migrations_skip_replicas(self):
+        self.assertTrue(self.router.allow_migrate("default", "books"))
+        self.assertFalse(self.router.allow_migrate("replica_1", "books"))
+
+
+class SyncReplicasTests(TransactionTestCase):
+    def test_sync_replicas(self):
+        """Test the primary is copied into the replica files"""
+        Book.objects.create(
+            title="Dune", author="Frank Herbert", inventory=1, daily_fee=1
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "replica.sqlite3"
+            with override_settings(
+                DATABASES={
+                    **settings.DATABASES,
+                    "replica_1": {
+                        **settings.DATABASES["default"], "NAME": path
+                    },
+                },
+                DATABASE_REPLICAS=["replica_1"]
+            ):
+                call_command("sync_replicas", stdout=StringIO())
+
+            replica = sqlite3.connect(path)
+            try:
+                titles = replica.execute(
+                    "SELECT title FROM books_book"
+                ).fetchall()
+            finally:
+                replica.close()
+
+        self.assertEqual(titles, [("Dune",)])
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    def test_production_profile(self):
+        """Test the production profile's pragmas and transaction mode"""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(
+                {
+                    **connection.settings_dict,
+                    **production_profile(busy_timeout_ms=1_000),
+                    "NAME": Path(directory) / "production.sqlite3",
+                },
+                alias="production"
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {
+                        name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in ("journal_mode", "busy_timeout")
+                    }
+            finally:
+                wrapper.close()
+
+        self.assertEqual(
+            pragmas, {"journal_mode": "wal", "busy_timeout": 1000}
+        )
+        self.assertEqual(wrapper.transaction_mode, "IMMEDIATE")
+        self.assertEqual(wrapper.settings_dict["CONN_MAX_AGE"], 600)
+
+
+class SchemaCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(
+            SCHEMA_CACHE_DIR=self.directory, CODE_VERSION="1"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema.clear_schemas()
+        self.addCleanup(schema.clear_schemas)
+        self.url = reverse("schema")
+
+    def get(self, **headers):
+        return self.client.get(
+            self.url, {"format": "json"}, headers=headers
+        )
+
+    def test_schema_is_generated_once(self):
+        """Test the schema is generated once and revalidated by ETag"""
+        with patch.object(
+            schema, "generate_schema", wraps=schema.generate_schema
+        ) as generate:
+            first = self.get()
+            second = self.get()
+            not_modified = self.get(**{"If-None-Match": first["ETag"]})
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertEqual(first["Cache-Control"], "public, max-age=3600")
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(
+            json.loads(first.content)["info"]["title"],
+            "Library Service API"
+        )
+        self.assertEqual(
+            (self.directory / "openapi-1.json").read_bytes(), first.content
+        )
+
+    def test_schema_matches_generated_schema(self):
+        """Test the cached schema is the one SpectacularAPIView renders"""
+        request = RequestFactory().get(self.url, {"format": "json"})
+        expected = SpectacularAPIView.as_view()(request).render()
+
+        self.assertEqual(self.get().content, expected.content)
+
+    def test_new_code_version_invalidates_schema(self):
+        """Test a new code version generates the schema again"""
+        with patch.object(
+            schema, "generate_schema", return_value=b"{}"
+        ) as generate:
+            first = self.get()
+            with override_settings(CODE_VERSION="2"):
+                generate.return_value = b'{"openapi": "3.0.3"}'
+                second = self.get()
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertNotEqual(first["ETag"], second["ETag"])
+        self.assertEqual(second.content, b'{"openapi": "3.0.3"}')
+
+    def test_warm_schema(self):
+        """Test warm_schema writes every format and prunes old versions"""
+        stale = self.directory / "openapi-0.json"
+        stale.write_bytes(b"{}")
+
+        with patch.object(
+            schema, "generate_schema", return_value=b"{}"
+        ) as generate:
+            call_command("warm_schema", stdout=StringIO())
+            schema.clear_schemas()
+            self.get()
+
+        self.assertEqual(generate.call_count, 2)
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            ["openapi-1.json", "openapi-1.yaml"]
+        )
+
+
+class ColdStartTests(SimpleTestCase):
+    STARTUP = """
+import json
+import sys
+
+from django.urls import get_resolver
+
+from library_service_api.wsgi import application
+
+routes = [
+    name for name in get_resolver().reverse_dict if isinstance(name, str)
+]
+print(json.dumps({"modules": sorted(sys.modules), "routes": sorted(routes)}))
+"""
+
+    def start(self, **environ) -> dict:
+        """Modules and route names of a freshly started WSGI worker"""
+        completed = subprocess.run(
+            (sys.executable, "-c", self.STARTUP),
+            cwd=settings.BASE_DIR,
+            env={
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "library_service_api.settings",
+                "SECRET_KEY": "cold-start",
+                **environ,
+            },
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    @unittest.skipUnless(
+        os.environ.get("COLD_START_CHECK", "").lower() in ("t", "true", "1"),
+        "wall-clock budget, set COLD_START_CHECK=true to run it"
+    )
+    def test_within_cold_start_budget(self):
+        """Test workers and commands start within the cold-start budget"""
+        completed = subprocess.run(
+            (
+                sys.executable, "-m", "benchmarks.cold_start",
+                "--runs", "3", "--check",
+            ),
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True
+        )
+
+        self.assertEqual(
+            completed.returncode, 0, completed.stdout + completed.stderr
+        )
+
+    def test_docs_views_are_loaded_lazily(self):
+        """Test the docs are routed without importing their views"""
+        started = self.start(API_DOCS_ENABLED="true")
+
+        self.assertIn("schema", started["routes"])
+        self.assertIn("swagger-ui", started["routes"])
+        for module in (
+            "drf_spectacular.views",
+            "drf_spectacular.generators",
+            "library_service_api.schema",
+        ):
+            self.assertNotIn(module, started["modules"])
+
+    def test_disabled_docs_skip_drf_spectacular(self):
+        """Test workers without docs don't load drf_spectacular's schema"""
+        started = self.start(API_DOCS_ENABLED="false")
+
+        self.assertNotIn("schema", started["routes"])
+        self.assertNotIn("redoc", started["routes"])
+        # Only the @extend_schema annotations are left.
+        self.assertEqual(
+            [
+                module
+                for module in started["modules"]
+                if module.startswith("drf_spectacular.")
+            ],
+            [
+                "drf_spectacular.drainage",
+                "drf_spectacular.types",
+                "drf_spectacular.utils",
+            ]
+        )
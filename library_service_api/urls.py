@@ -15,28 +15,41 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView
-)
+
+from library_service_api.views import MetricsView, lazy_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/users/", include("users.urls", namespace="users")),
     path("api/v1/", include("books.urls", namespace="books")),
     path("api/v1/", include("borrowings.urls", namespace="borrowings")),
-    path("api/v1/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path(
-        "api/v1/doc/swagger/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
-        name="swagger-ui",
-    ),
-    path(
-        "api/v1/doc/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
-    ),
+    path("api/v1/metrics/", MetricsView.as_view(), name="metrics"),
 ]
+
+if settings.API_DOCS_ENABLED:
+    urlpatterns += [
+        path(
+            "api/v1/schema/",
+            lazy_view("library_service_api.schema.CachedSpectacularAPIView"),
+            name="schema",
+        ),
+        path(
+            "api/v1/doc/swagger/",
+            lazy_view(
+                "drf_spectacular.views.SpectacularSwaggerView",
+                url_name="schema"
+            ),
+            name="swagger-ui",
+        ),
+        path(
+            "api/v1/doc/redoc/",
+            lazy_view(
+                "drf_spectacular.views.SpectacularRedocView",
+                url_name="schema"
+            ),
+            name="redoc",
+        ),
+    ]
@@ -0,0 +1,58 @@
+import functools
+from typing import Callable
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+
+from books import cache as book_cache
+from library_service_api.metrics import render_metrics
+from library_service_api.permissions import IsAdminOrMetricsScraper
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsView(APIView):
+    """Prometheus scrape target with the request and cache metrics."""
+    permission_classes = (IsAdminOrMetricsScraper,)
+
+    @extend_schema(exclude=True)
+    def get(self, request: HttpRequest) -> HttpResponse:
+        body = render_metrics((
+            (
+                "books_cache_hits_total",
+                "counter",
+                "Book cache lookups answered from the cache.",
+                book_cache.stats.hits
+            ),
+            (
+                "books_cache_misses_total",
+                "counter",
+                "Book cache lookups that had to be computed.",
+                book_cache.stats.misses
+            ),
+        ))
+        return HttpResponse(body, content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def lazy_view(view_path: str, **initkwargs) -> Callable:
+    """
+    The ``as_view(**initkwargs)`` of the class based view at
+    ``view_path``, imported on its first request rather than with the URL
+    configuration.
+    """
+    module, name = view_path.rsplit(".", 1)
+
+    @functools.cache
+    def load() -> Callable:
+        return import_string(view_path).as_view(**initkwargs)
+
+    def view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        return load()(request, *args, **kwargs)
+
+    # Named after the view it stands in for, as in URL lookups.
+    view.__module__ = module
+    view.__name__ = view.__qualname__ = name
+    return csrf_exempt(view)
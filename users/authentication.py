@@ -0,0 +1,195 @@
+from functools import cached_property
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from library_service_api import replicas
+
+
+def _user_cache_key(user_id: int) -> str:
+    return f"users:user:{user_id}"
+
+
+def get_cached_user(user_id: int) -> get_user_model() | None:
+    """
+    Return the user from the local cache, loading it at most once per
+    STATELESS_JWT_REVALIDATE_SECONDS.
+    """
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, settings.STATELESS_JWT_REVALIDATE_SECONDS)
+
+    return user
+
+
+async def aget_cached_user(user_id: int) -> get_user_model() | None:
+    """Async version of ``get_cached_user``."""
+    key = _user_cache_key(user_id)
+    user = await cache.aget(key)
+
+    if user is None:
+        user = await get_user_model().objects.filter(pk=user_id).afirst()
+        if user is not None:
+            await cache.aset(
+                key, user, settings.STATELESS_JWT_REVALIDATE_SECONDS
+            )
+
+    return user
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    cache.delete(_user_cache_key(user_id))
+
+
+def get_full_user(user) -> get_user_model():
+    """Return a model instance for a possibly lightweight request user."""
+    if isinstance(user, TokenUser):
+        return get_cached_user(user.pk)
+    return user
+
+
+async def aget_full_user(user) -> get_user_model():
+    """Async version of ``get_full_user``."""
+    if isinstance(user, TokenUser):
+        return await aget_cached_user(user.pk)
+    return user
+
+
+def check_user(user, validated_token: Token) -> None:
+    """
+    Reject the token of a missing or inactive user, or of a user whose
+    password changed since it was issued.
+    """
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(
+            _("User is inactive"), code="user_inactive"
+        )
+
+    if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+        api_settings.REVOKE_TOKEN_CLAIM
+    ) != get_md5_hash_password(user.password):
+        raise AuthenticationFailed(
+            _("The user's password has been changed."),
+            code="password_changed"
+        )
+
+
+def get_user_id(validated_token: Token) -> Any:
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(
+            _("Token contained no recognizable user identification")
+        )
+
+
+class AsyncJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that can also run on the event loop.
+
+    ``authenticate`` is inherited unchanged, ``aauthenticate`` is used by
+    the async views instead and only differs in loading the user with
+    the async ORM.
+    """
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        validated_token = super().get_validated_token(raw_token)
+        # Known before the user is loaded, so that read can already go
+        # to the primary for a user pinned to it.
+        replicas.set_user(validated_token.get(api_settings.USER_ID_CLAIM))
+        return validated_token
+
+    async def aauthenticate(
+        self, request: Request
+    ) -> tuple[get_user_model(), Token] | None:
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token: Token) -> get_user_model():
+        user = await self.user_model.objects.filter(
+            **{api_settings.USER_ID_FIELD: get_user_id(validated_token)}
+        ).afirst()
+        check_user(user, validated_token)
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """A request user built from the access token claims."""
+
+    @cached_property
+    def email(self) -> str:
+        return self.token.get("email", "")
+
+
+class StatelessJWTAuthentication(AsyncJWTAuthentication):
+    """
+    Authenticate with a JWT without loading the user row on every request.
+
+    The user id, email and staff flag come from the signed token claims.
+    When STATELESS_JWT_REVALIDATE_SECONDS is positive, the claims are
+    checked against a locally cached copy of the user that is re-read at
+    most once per that window, so deactivation, staff demotion and (with
+    CHECK_REVOKE_TOKEN) password changes take effect within it. With 0
+    the token is trusted as is until it expires.
+    """
+
+    def get_user(self, validated_token: Token) -> ClaimsUser:
+        get_user_id(validated_token)
+        user = ClaimsUser(validated_token)
+
+        if settings.STATELESS_JWT_REVALIDATE_SECONDS > 0:
+            self.revalidate(
+                user, validated_token, get_cached_user(user.pk)
+            )
+
+        return user
+
+    async def aget_user(self, validated_token: Token) -> ClaimsUser:
+        get_user_id(validated_token)
+        user = ClaimsUser(validated_token)
+
+        if settings.STATELESS_JWT_REVALIDATE_SECONDS > 0:
+            self.revalidate(
+                user, validated_token, await aget_cached_user(user.pk)
+            )
+
+        return user
+
+    @staticmethod
+    def revalidate(
+        user: ClaimsUser,
+        validated_token: Token,
+        stored_user: get_user_model() | None
+    ) -> None:
+        check_user(stored_user, validated_token)
+
+        user.is_staff = stored_user.is_staff
+        user.is_superuser = stored_user.is_superuser
+        user.email = stored_user.email
@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.views import APIView
+
+from users.authentication import StatelessJWTAuthentication
+
+
+@mock.patch.object(
+    APIView, "authentication_classes", (StatelessJWTAuthentication,)
+)
+class StatelessJWTAuthenticationTests(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.staff_user = get_user_model().objects.create_user(
+            email="staff@test.com",
+            password="testpass123",
+            is_staff=True
+        )
+
+        response = self.client.post(
+            reverse("users:token_obtain_pair"),
+            {"email": "staff@test.com", "password": "testpass123"}
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZE=f"Bearer {response.data['access']}"
+        )
+
+    def test_authenticated_requests_skip_user_query(self):
+        """Test the user row is read once per revalidation window"""
+        url = reverse("borrowings:borrowings-list")
+        self.client.get(url)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(STATELESS_JWT_REVALIDATE_SECONDS=0)
+    def test_claims_are_trusted_without_revalidation(self):
+        """Test is_staff and email come from the token claims"""
+        get_user_model().objects.filter(pk=self.staff_user.pk).delete()
+
+        response = self.client.post(
+            reverse("books:book-list"),
+            {
+                "title": "Dune",
+                "author": "Frank Herbert",
+                "inventory": 1,
+                "daily_fee": "1.00",
+            }
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_staff_demotion_is_honored(self):
+        """Test a demoted user loses staff access despite the token claim"""
+        url = reverse("books:book-list")
+        data = {
+            "title": "Dune",
+            "author": "Frank Herbert",
+            "inventory": 1,
+            "daily_fee": "1.00",
+        }
+        self.client.get(url)
+
+        self.staff_user.is_staff = False
+        self.staff_user.save()
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_manage_user_returns_full_profile(self):
+        """Test /users/me/ works with the lightweight request user"""
+        response = self.client.get(reverse("users:manage_user"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["email"], "staff@test.com")
+
+        response = self.client.patch(
+            reverse("users:manage_user"), {"first_name": "Ada"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.staff_user.refresh_from_db()
+        self.assertEqual(self.staff_user.first_name, "Ada")
@@ -5,14 +5,15 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView
 )
 
-from users.views import CreateUserView, ManageUserView
+from library_service_api.async_views import async_routes
+from users.views import AsyncManageUserView, CreateUserView, ManageUserView
 
-urlpatterns = [
+urlpatterns = async_routes([
     path("", CreateUserView.as_view(), name="register_user"),
     path("me/", ManageUserView.as_view(), name="manage_user"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("token/verify/", TokenVerifyView.as_view(), name="token_verify"),
-]
+], {"manage_user": AsyncManageUserView})
 
 app_name = "users"
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
-from rest_framework import generics
+from rest_framework import generics, permissions
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
+from library_service_api.async_views import AsyncGenericAPIView
+from users.authentication import aget_full_user, get_full_user
 from users.serializers import UserSerializer
 
 
@@ -28,7 +31,9 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated,)
 
     def get_object(self) -> get_user_model():
-        return self.request.user
+        if self.request.method in permissions.SAFE_METHODS:
+            return get_full_user(self.request.user)
+        return get_user_model().objects.get(pk=self.request.user.pk)
 
     def get(self, request, *args, **kwargs):
         """
@@ -58,3 +63,13 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         that need to be modified should be included in the request.
         """
         return super().patch(request, *args, **kwargs)
+
+
+class AsyncManageUserView(AsyncGenericAPIView):
+    """Async version of the profile read of ManageUserView."""
+    serializer_class = UserSerializer
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request, *args, **kwargs):
+        user = await aget_full_user(request.user)
+        return Response(self.get_serializer(user).data)